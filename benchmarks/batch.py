@@ -0,0 +1,66 @@
+"""
+Measures how the throughput of data.batch.solveBatch scales with the number of worker processes.
+
+Run from the repository root, for example:
+    python -m benchmarks.batch --size 300x300 --queries 2000 --workers 1 2 4 8
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+import sys
+
+import numpy as np
+
+from data.grid import Grid
+from data.generators import GENERATORS
+from data.batch import solveBatch
+from benchmarks.pathfinding import parseSize
+import data.algorithms as algs
+
+
+def randomQueries(walls, count, rng):
+    """
+    Returns count (start, end) pairs of random open cells of the walls
+    """
+
+    openCells = np.argwhere(~walls)
+    pairs = openCells[rng.integers(len(openCells), size=(count, 2))]
+    return [(tuple(map(int, start)), tuple(map(int, end))) for start, end in pairs]
+
+
+def parseArgs(argv=None):
+    parser = ArgumentParser(description='Measures the throughput of batch queries for different numbers of workers')
+    parser.add_argument('--size', type=parseSize, default=(200, 200), help='grid size as ROWSxCOLS (default: 200x200)')
+    parser.add_argument('--layout', choices=list(GENERATORS), default='Random', help='default: %(default)s')
+    parser.add_argument('--queries', type=int, default=500, help='default: %(default)s')
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4], help='default: 1 2 4')
+    parser.add_argument('--algorithm', choices=list(algs.ALGORITHMS), default='A*', help='default: %(default)s')
+    parser.add_argument('--chunk-size', type=int, default=16, help='queries sent to a worker at once')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parseArgs(argv)
+
+    rng = np.random.default_rng(args.seed)
+    walls = GENERATORS[args.layout](*args.size, rng)
+    grid = Grid.fromWalls(walls)
+    queries = randomQueries(walls, args.queries, rng)
+
+    baseline = None
+    for workers in args.workers:
+        startTime = perf_counter()
+        found = sum(result.path is not None for _, result in solveBatch(grid, queries, args.algorithm,
+                                                                        workers=workers, chunkSize=args.chunk_size))
+        elapsed = perf_counter() - startTime
+
+        baseline = baseline or elapsed
+        print(f'{workers} workers: {len(queries) / elapsed:.0f} queries/s, {found} paths found, '
+              f'{baseline / elapsed:.2f}x', file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""
+Benchmarks every registered algorithm and heuristic on generated grids, without Qt.
+
+Run from the repository root, for example:
+    python -m benchmarks.pathfinding --sizes 100x100 500x500 --layouts Random Maze --output results.csv
+    python -m benchmarks.pathfinding --save-baseline baseline.json
+    python -m benchmarks.pathfinding --baseline baseline.json --tolerance .5
+    python -m benchmarks.pathfinding --maps saved.grid arena.map
+"""
+
+from argparse import ArgumentParser
+from itertools import product
+from heapq import heappush, heappop
+from time import perf_counter
+import csv
+import gc
+import json
+import sys
+import os
+
+import numpy as np
+
+from data.grid import Grid
+from data.generators import GENERATORS, cornerPoints
+from data.mapfile import loadGrid
+from data.profiling import profileSearch
+import data.algorithms as algs
+
+
+FIELDS = ['layout', 'rows', 'cols', 'density', 'seed', 'diagonals', 'algorithm', 'heuristic',
+          'found', 'length', 'cost', 'expanded', 'pushed', 'peakOpen', 'reopened', 'timeMs', 'coldMs', 'referenceMs',
+          'peakKb']
+
+# The fields that identify a run, used to match runs with the baseline
+KEY_FIELDS = FIELDS[:8]
+
+
+def makeGrid(layout, rows, cols, density, seed):
+    """
+    Generates the walls of a grid with a fixed seed, and picks start and end points in opposite corners.
+    Returns the Grid, whose start and end are set, or None if it doesn't have two open cells
+    """
+
+    rng = np.random.default_rng(seed)
+    options = {'density': density} if layout == 'Random' else {}
+    walls = GENERATORS[layout](rows, cols, rng, **options)
+
+    points = cornerPoints(walls)
+    if points is None:
+        return None
+
+    grid = Grid.fromWalls(walls)
+    grid.start, grid.end = points
+    return grid
+
+
+def loadMap(path):
+    """
+    Loads a saved grid or MovingAI map, keeping its start and end points or else picking them in opposite corners.
+    Returns the Grid, or None if it doesn't have two open cells
+    """
+
+    grid = loadGrid(path, mapped=True)
+    if grid.start is None or grid.end is None:
+        points = cornerPoints(grid.wallView())
+        if points is None:
+            return None
+        grid.start, grid.end = points
+    return grid
+
+
+def grids(args):
+    """
+    Yields (layout, density, seed, Grid) for every grid asked for, generated or loaded. Loaded maps are named after
+    their file and have no density or seed
+    """
+
+    for layout in args.layouts:
+        # Only the Random layout has a density, the others are made once per size and seed
+        densities = args.densities if layout == 'Random' else [None]
+        for size, density, seed in product(args.sizes, densities, args.seeds):
+            grid = makeGrid(layout, *size, density, seed)
+            if grid is not None:
+                yield layout, density, seed, grid
+
+    for path in args.maps:
+        grid = loadMap(path)
+        if grid is not None:
+            yield os.path.basename(path), None, None, grid
+
+
+def referenceTime():
+    """
+    Returns the seconds a fixed piece of work took, pushing and popping a heap and filling a dict much like the
+    searches do. Times are compared relative to it, so that they don't depend on how busy the machine was
+    """
+
+    started = perf_counter()
+    heap, seen = [], {}
+    for i in range(5000):
+        heappush(heap, (i * 7919 % 5003, i))
+        seen[i] = i
+    while heap:
+        heappop(heap)
+    return perf_counter() - started
+
+
+def runOnce(algorithm, grid, heuristic, repeat, measureMemory):
+    """
+    Runs an algorithm once untimed, then repeat times, each right after referenceTime(). Returns the result with the
+    lowest time, the seconds the first run took, the lowest reference time, and the peak memory allocated during an
+    extra run, in KB (None if memory isn't measured).
+    The first run also makes what the algorithm precomputes and keeps with the grid, such as HPA*'s clusters or ALT's
+    landmark tables, and warms up caches, so only the timed runs are comparable with each other
+    """
+
+    cold = algorithm(grid, grid.start, grid.end, heuristic).time
+
+    # The garbage collector runs whenever enough objects were made since it last did, so it would stop searches at
+    #  times that depend on everything that ran before them
+    best, reference = None, float('inf')
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            reference = min(reference, referenceTime())
+            result = algorithm(grid, grid.start, grid.end, heuristic)
+            if best is None or result.time < best.time:
+                best = result
+    finally:
+        gc.enable()
+
+    peak = None
+    if measureMemory:
+        # Tracing slows the search down, so it gets its own run
+        peak = profileSearch(algorithm, grid, grid.start, grid.end, heuristic, cpu=False).peakMemory / 1024
+
+    return best, cold, reference, peak
+
+
+def runAll(args, baseline=None):
+    """
+    Runs every combination of grid, neighbor model, algorithm and heuristic asked for, yielding a dict per run.
+    Runs slower than their run in the baseline, a list of runs, are timed again up to args.retries times, since the
+    machine may just have been busy for a while: the fastest time relative to the reference time is kept
+    """
+
+    baseRuns = {runKey(run): run for run in baseline or []}
+    keys = set()  # Of the runs so far, which must differ for the baseline to tell them apart
+
+    algorithms = {name: data for name, data in algs.ALGORITHMS.items()
+                  if not args.algorithms or name in args.algorithms}
+
+    for layout, density, seed, grid in grids(args):
+        for diagonals in args.diagonals:
+            grid.diagonals = diagonals
+
+            for name, data in algorithms.items():
+                heuristics = [h for h in data['heuristics'] if not args.heuristics or h in args.heuristics]
+
+                for heuristic in heuristics or [None]:
+                    result, cold, reference, peak = runOnce(data['algorithm'], grid, algs.HEURISTICS.get(heuristic),
+                                                            args.repeat, not args.no_memory)
+                    run = {
+                        'layout': layout, 'rows': grid.rows, 'cols': grid.cols, 'density': density, 'seed': seed,
+                        'diagonals': diagonals, 'algorithm': name, 'heuristic': heuristic,
+                        'found': result.path is not None, 'length': result.length, 'cost': result.cost,
+                        'expanded': result.expanded, 'pushed': result.pushed, 'peakOpen': result.peakOpen,
+                        'reopened': result.reopened,
+                        'timeMs': result.time * 1000,
+                        'coldMs': cold * 1000,
+                        'referenceMs': reference * 1000,
+                        'peakKb': peak,
+                    }
+
+                    key = runKey(run)
+                    assert key not in keys, f'Ran {key} twice'
+                    keys.add(key)
+
+                    base = baseRuns.get(key)
+                    for _ in range(args.retries if base else 0):
+                        if not slower(run, base, args.tolerance, args.noise):
+                            break
+                        retry, _, reference, _ = runOnce(data['algorithm'], grid, algs.HEURISTICS.get(heuristic),
+                                                         args.repeat, False)
+                        if retry.time / reference < run['timeMs'] / run['referenceMs']:
+                            run['timeMs'], run['referenceMs'] = retry.time * 1000, reference * 1000
+
+                    yield run
+
+
+def writeResults(results, output, fmt):
+    """
+    Writes the results as CSV or JSON to the output file, or to stdout if it's None
+    """
+
+    out = open(output, 'w', newline='') if output else sys.stdout
+    try:
+        if fmt == 'json':
+            json.dump(results, out, indent=1)
+            out.write('\n')
+        else:
+            writer = csv.DictWriter(out, FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+    finally:
+        if output:
+            out.close()
+
+
+def runKey(run):
+    return tuple(run[field] for field in KEY_FIELDS)
+
+
+def expectedMs(run, base):
+    """
+    Returns the time the baseline run would have taken on the machine as fast as it was for run, from how long
+    referenceTime() took for each. Baselines saved without reference times are taken as they are
+    """
+
+    if not base.get('referenceMs'):
+        return base['timeMs']
+    return base['timeMs'] * run['referenceMs'] / base['referenceMs']
+
+
+def slower(run, base, tolerance, noiseMs=1):
+    """
+    Returns whether a run took longer than expectedMs() by more than the tolerance and by more than noiseMs
+    """
+
+    expected = expectedMs(run, base)
+    return run['timeMs'] > expected * (1 + tolerance) and run['timeMs'] - expected > noiseMs
+
+
+def compare(results, baseline, tolerance, noiseMs=1):
+    """
+    Compares results with the runs of a baseline. Returns a list of messages describing every regression: slower by
+    more than the tolerance (and by more than noiseMs, since short runs vary a lot), more nodes expanded, a higher
+    path cost or a path no longer found
+    """
+
+    baseRuns = {runKey(run): run for run in baseline}
+    regressions = []
+
+    for run in results:
+        base = baseRuns.get(runKey(run))
+        if base is None:
+            continue
+
+        name = ', '.join(f'{field}={run[field]}' for field in KEY_FIELDS if run[field] is not None)
+
+        if base['found'] and not run['found']:
+            regressions.append(f'{name}: path no longer found')
+        elif run['found'] and base['cost'] is not None and run['cost'] > base['cost'] + 1e-9:
+            regressions.append(f'{name}: cost {run["cost"]:.3f} > {base["cost"]:.3f}')
+
+        if run['expanded'] > base['expanded']:
+            regressions.append(f'{name}: expanded {run["expanded"]} > {base["expanded"]}')
+
+        if slower(run, base, tolerance, noiseMs):
+            regressions.append(f'{name}: time {run["timeMs"]:.2f} ms > {expectedMs(run, base):.2f} ms')
+
+    return regressions
+
+
+def parseSize(text):
+    rows, _, cols = text.lower().partition('x')
+    return int(rows), int(cols or rows)
+
+
+def parseArgs(argv=None):
+    parser = ArgumentParser(description='Benchmarks the pathfinding algorithms on generated grids')
+    parser.add_argument('--sizes', nargs='+', type=parseSize, default=[(100, 100), (300, 300)],
+                        help='grid sizes as ROWSxCOLS (default: 100x100 300x300)')
+    parser.add_argument('--layouts', nargs='*', choices=list(GENERATORS), default=list(GENERATORS),
+                        help='how walls are generated (default: all, none if given without any, e.g. with --maps)')
+    parser.add_argument('--maps', nargs='+', default=[], metavar='FILE',
+                        help='also run on saved grids or MovingAI .map files, from their start to end if they have '
+                             'them, else between opposite corners')
+    parser.add_argument('--densities', nargs='+', type=float, default=[.2],
+                        help='wall densities of the Random layout (default: %(default)s)')
+    parser.add_argument('--seeds', nargs='+', type=int, default=[0], help='seeds of the generated grids')
+    parser.add_argument('--diagonals', nargs='+', type=lambda text: text.lower() in ('1', 'true', 'yes', 'on'),
+                        default=[True, False], help='neighbor models to run, as true/false (default: both)')
+    parser.add_argument('--algorithms', nargs='+', choices=list(algs.ALGORITHMS), help='default: all')
+    parser.add_argument('--heuristics', nargs='+', choices=list(algs.HEURISTICS), help='default: all')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='timed runs per search, after an untimed one, the fastest is kept (default: %(default)s)')
+    parser.add_argument('--no-memory', action='store_true', help="don't measure peak memory, which needs a run")
+    parser.add_argument('--output', help='file to write the results to (default: stdout)')
+    parser.add_argument('--format', choices=['csv', 'json'],
+                        help='format of the results (default: from the output extension, else csv)')
+    parser.add_argument('--save-baseline', metavar='FILE', help='also save the results as a JSON baseline')
+    parser.add_argument('--baseline', metavar='FILE', help='compare the results with a JSON baseline, exiting with '
+                                                           'status 1 if anything regressed')
+    parser.add_argument('--tolerance', type=float, default=.75,
+                        help='fraction by which a run can be slower than its baseline (default: %(default)s)')
+    parser.add_argument('--noise', type=float, default=1, metavar='MS',
+                        help='time differences smaller than this are never regressions (default: %(default)s)')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='times a run slower than its baseline is timed again (default: %(default)s)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parseArgs(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    results = []
+    for run in runAll(args, baseline):
+        results.append(run)
+        print(f'{run["layout"]} {run["rows"]}x{run["cols"]} seed {run["seed"]} '
+              f'{"8" if run["diagonals"] else "4"}-connected {run["algorithm"]} {run["heuristic"] or ""}: '
+              f'{run["timeMs"]:.2f} ms, {run["expanded"]} expanded', file=sys.stderr)
+        if run['coldMs'] - run['timeMs'] > args.noise:
+            print(f'    first run {run["coldMs"]:.2f} ms, with precomputation', file=sys.stderr)
+
+    fmt = args.format or ('json' if args.output and args.output.endswith('.json') else 'csv')
+    if args.output or not args.baseline:
+        writeResults(results, args.output, fmt)
+
+    if args.save_baseline:
+        writeResults(results, args.save_baseline, 'json')
+
+    if args.baseline:
+        regressions = compare(results, baseline, args.tolerance, args.noise)
+
+        for message in regressions:
+            print(f'REGRESSION {message}', file=sys.stderr)
+        print(f'{len(regressions)} regressions against {args.baseline}', file=sys.stderr)
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
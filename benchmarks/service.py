@@ -0,0 +1,186 @@
+"""
+Load-tests the path service (data.service) with many concurrent clients, and reports its throughput and latency.
+
+Run from the repository root, for example:
+    python -m benchmarks.service --size 300x300 --clients 1 8 32 --queries 2000
+    python -m benchmarks.service --connect 127.0.0.1:8765 --grid arena --queries 500
+
+Without --connect, a service is started in this process on a free port, with a generated grid. Queries are drawn
+from a pool of --distinct ones, so that some of them are asked while the same query is being solved and get
+coalesced.
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+import asyncio
+import json
+import sys
+
+import numpy as np
+
+from data.generators import GENERATORS
+from data.service import PathService
+from benchmarks.pathfinding import parseSize
+from benchmarks.batch import randomQueries
+import data.algorithms as algs
+
+
+class Client:
+    """
+    A connection to the service, which sends requests and waits for their responses, matching them by id since they
+    can come back in any order
+    """
+
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self._waiting = {}  # Futures of the responses, by request id
+        self._nextId = 0
+        self._reading = asyncio.create_task(self._read())
+
+    @classmethod
+    async def connect(cls, address):
+        # address is a Unix socket path, or HOST:PORT
+        if ':' in address:
+            host, port = address.rsplit(':', 1)
+            reader, writer = await asyncio.open_connection(host, int(port), limit=2 ** 24)
+        else:
+            reader, writer = await asyncio.open_unix_connection(address, limit=2 ** 24)
+        return cls(reader, writer)
+
+    async def send(self, op, **fields):
+        # Returns the response even if it's an error, request() raises it instead
+        self._nextId += 1
+        future = self._waiting[self._nextId] = asyncio.get_running_loop().create_future()
+        self.writer.write(json.dumps({'op': op, 'id': self._nextId, **fields}).encode() + b'\n')
+        await self.writer.drain()
+        return await future
+
+    async def request(self, op, **fields):
+        response = await self.send(op, **fields)
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response
+
+    async def _read(self):
+        while line := await self.reader.readline():
+            response = json.loads(line)
+            self._waiting.pop(response['id']).set_result(response)
+
+    async def close(self):
+        # The service answers what it was sent and closes its end, which ends _read()
+        self.writer.write_eof()
+        await self._reading
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def loadTest(address, grid, queries, clients, algorithm):
+    """
+    Sends every query as a path request from clients connections at once, each sending its next query as soon as
+    the last one is answered. Returns the seconds it took and the latency of every query
+    """
+
+    connections = [await Client.connect(address) for _ in range(clients)]
+    latencies = []
+    remaining = iter(queries)
+
+    async def run(client):
+        for start, end in remaining:
+            sent = perf_counter()
+            await client.request('path', grid=grid, start=start, end=end, algorithm=algorithm)
+            latencies.append(perf_counter() - sent)
+
+    startTime = perf_counter()
+    await asyncio.gather(*(run(client) for client in connections))
+    elapsed = perf_counter() - startTime
+
+    for client in connections:
+        await client.close()
+    return elapsed, np.array(latencies)
+
+
+async def openCells(client, grid, count, rng):
+    """
+    Finds open cells of the grid of a running service, whose walls aren't known, by asking for the path from each
+    of count random cells to itself, which fails on walls. Returns walls that are True everywhere but on the open
+    cells found
+    """
+
+    info = (await client.request('grids'))['grids'][grid]
+    rows, cols = info['rows'], info['cols']
+    cells = [[int(x), int(y)] for x, y in zip(rng.integers(rows, size=count), rng.integers(cols, size=count))]
+    responses = await asyncio.gather(*(client.send('path', grid=grid, start=cell, end=cell) for cell in cells))
+
+    walls = np.ones((rows, cols), dtype=bool)
+    for (x, y), response in zip(cells, responses):
+        if 'error' not in response:
+            walls[x, y] = False
+    if walls.all():
+        raise RuntimeError(f'None of {count} random cells of {grid} is open')
+    return walls
+
+
+def parseArgs(argv=None):
+    parser = ArgumentParser(description='Measures the throughput and latency of the path service')
+    parser.add_argument('--connect', metavar='ADDRESS', help='HOST:PORT or Unix socket of a running service')
+    parser.add_argument('--grid', default='bench', help='name of the grid to query (default: %(default)s)')
+    parser.add_argument('--size', type=parseSize, default=(200, 200), help='grid size as ROWSxCOLS (default: 200x200)')
+    parser.add_argument('--layout', choices=list(GENERATORS), default='Random', help='default: %(default)s')
+    parser.add_argument('--queries', type=int, default=1000, help='default: %(default)s')
+    parser.add_argument('--distinct', type=int, default=250,
+                        help='distinct queries the queries are drawn from (default: %(default)s)')
+    parser.add_argument('--clients', nargs='+', type=int, default=[1, 8, 32], help='default: 1 8 32')
+    parser.add_argument('--workers', type=int, help='worker processes of the service started here')
+    parser.add_argument('--algorithm', choices=list(algs.ALGORITHMS), default='A*', help='default: %(default)s')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+
+async def benchmark(args):
+    service = server = None
+    address = args.connect
+    if address is None:
+        service = PathService(args.workers)
+        server = await service.start(port=0)
+        host, port = server.sockets[0].getsockname()[:2]
+        address = f'{host}:{port}'
+
+    control = await Client.connect(address)
+    try:
+        rows, cols = args.size
+        walls = None
+        if service is not None:
+            walls = GENERATORS[args.layout](rows, cols, np.random.default_rng(args.seed))
+            await control.request('generate', name=args.grid, layout=args.layout, rows=rows, cols=cols,
+                                  seed=args.seed)
+
+        rng = np.random.default_rng(args.seed)
+        if walls is None:
+            walls = await openCells(control, args.grid, 2 * args.distinct, rng)
+        distinct = randomQueries(walls, args.distinct, rng)
+        queries = [distinct[i] for i in rng.integers(len(distinct), size=args.queries)]
+
+        for clients in args.clients:
+            before = await control.request('stats')
+            elapsed, latencies = await loadTest(address, args.grid, queries, clients, args.algorithm)
+            after = await control.request('stats')
+
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+            print(f'{clients} clients: {len(queries) / elapsed:.0f} queries/s, latency p50 {p50:.1f} ms, '
+                  f'p95 {p95:.1f} ms, p99 {p99:.1f} ms, {after["solved"] - before["solved"]} solved, '
+                  f'{after["coalesced"] - before["coalesced"]} coalesced', file=sys.stderr)
+    finally:
+        await control.close()
+        if service is not None:
+            server.close()
+            await server.wait_closed()
+            service.close()
+
+
+def main(argv=None):
+    asyncio.run(benchmark(parseArgs(argv)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Measures how long the visualizer takes from a cold launch to its first paint of the grid.
+
+Run from the repository root, for example:
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --open maps/arena.map --offscreen
+
+Every run launches the visualizer in a new Python process, as visualizer.py does, and times each step of its startup:
+starting the interpreter, importing the modules, building and showing the window, and painting the grid. The first
+run is reported apart, since the files it reads may not be in the OS's cache yet.
+"""
+
+from argparse import ArgumentParser, SUPPRESS
+from statistics import median
+import subprocess
+import json
+import time
+import sys
+import os
+
+
+PHASES = ['interpreter', 'imports', 'window', 'first paint', 'total']
+
+
+def launchTimes(launched, visualizerArgs):
+    """
+    Launches the visualizer in this process, and returns when each step of its startup ended, as seconds since the
+    epoch. launched is when the process was started, by the clock of the process that started it
+    """
+
+    started = time.time()
+    import visualizer  # Importing is part of the startup being measured
+    imported = time.time()
+
+    app, window = visualizer.launch(visualizer.parseArgs(visualizerArgs))
+    shown = time.time()
+
+    # The event loop stops once the grid was painted the first time
+    painted = []
+    paintEvent = window.canvas.paintEvent
+
+    def firstPaint(event):
+        paintEvent(event)
+        if not painted:
+            painted.append(time.time())
+            app.quit()
+
+    window.canvas.paintEvent = firstPaint
+    app.exec_()
+
+    return {'launched': launched, 'started': started, 'imported': imported, 'shown': shown, 'painted': painted[0]}
+
+
+def phases(times):
+    """
+    Returns the seconds each phase of a startup took, by name, from the times given by launchTimes()
+    """
+
+    return {'interpreter': times['started'] - times['launched'], 'imports': times['imported'] - times['started'],
+            'window': times['shown'] - times['imported'], 'first paint': times['painted'] - times['shown'],
+            'total': times['painted'] - times['launched']}
+
+
+def runOnce(visualizerArgs, offscreen=False):
+    """
+    Launches the visualizer in a new process and returns the seconds each phase of its startup took
+    """
+
+    environment = dict(os.environ)
+    if offscreen:
+        environment['QT_QPA_PLATFORM'] = 'offscreen'
+
+    launched = time.time()
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.startup', '--child', repr(launched), *visualizerArgs],
+                            env=environment, stdout=subprocess.PIPE, check=True, text=True).stdout
+
+    # The times are on the last line, anything before it was printed by Qt or the visualizer
+    return phases(json.loads(output.strip().splitlines()[-1]))
+
+
+def parseArgs(argv=None):
+    parser = ArgumentParser(description='Measures the time from launching the visualizer to its first paint')
+    parser.add_argument('--runs', type=int, default=5, help='default: %(default)s')
+    parser.add_argument('--rows', type=int, default=29, help='rows of the grid shown (default: %(default)s)')
+    parser.add_argument('--cols', type=int, default=60, help='columns of the grid shown (default: %(default)s)')
+    parser.add_argument('--open', metavar='FILE', help='saved grid or MovingAI .map file to show instead')
+    parser.add_argument('--offscreen', action='store_true', help="don't show the window, e.g. without a display")
+    parser.add_argument('--child', type=float, help=SUPPRESS)  # When the launched process was started
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parseArgs(argv)
+
+    visualizerArgs = ['--rows', str(args.rows), '--cols', str(args.cols)]
+    if args.open:
+        visualizerArgs += ['--open', args.open]
+
+    # Run by runOnce(), in the launched process
+    if args.child is not None:
+        print(json.dumps(launchTimes(args.child, visualizerArgs)))
+        return 0
+
+    runs = [runOnce(visualizerArgs, args.offscreen) for _ in range(args.runs)]
+
+    print(f'{"":<12} {"first run":>10} {"median":>10} {"best":>10}', file=sys.stderr)
+    for phase in PHASES:
+        seconds = [run[phase] for run in runs]
+        print(f'{phase:<12} {runs[0][phase] * 1000:>8.0f}ms {median(seconds) * 1000:>8.0f}ms '
+              f'{min(seconds) * 1000:>8.0f}ms', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
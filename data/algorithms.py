@@ -1,89 +1,734 @@
-from PySide2.QtCore import QEventLoop, QTimer
-from PySide2.QtGui import QPixmap
-from PySide2.QtWidgets import QApplication
-from time import sleep
+from heapq import heappush, heappop
+from itertools import count
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+from math import hypot
 
+import numpy as np
 
-slowdown = 0
+from data.grid import DIAGONAL_COST
 
+
+# Kinds of events reported while an algorithm runs. Each event is passed to onEvent as a (kind, x, y) tuple
+SEARCHED = 'searched'  # A node was taken off the open list and expanded
+IN_LIST = 'inList'  # A node was added to the open list
+IN_PATH = 'inPath'  # A node is part of the final path, reported in order from start to end
+
+INF = float('inf')
+
+
+def _manhattan(x, y, endX, endY):
+    return abs(x - endX) + abs(y - endY)
+
+
+def _euclidean(x, y, endX, endY):
+    return hypot(x - endX, y - endY)
+
+
+def _octile(x, y, endX, endY):
+    # Exact distance on an open grid with diagonals: as many diagonal steps as possible, then straight ones
+    dx, dy = abs(x - endX), abs(y - endY)
+    return dx + dy + (DIAGONAL_COST - 2) * min(dx, dy)
+
+
+def _chebyshev(x, y, endX, endY):
+    return max(abs(x - endX), abs(y - endY))
+
+
+def weighted(heuristic, weight: float):
+    """
+    Returns the heuristic multiplied by weight. Searching with it expands fewer nodes, and when the heuristic is
+    admissible the path found is at most weight times longer than the shortest one
+    """
+    return lambda x, y, endX, endY: weight * heuristic(x, y, endX, endY)
+
+
+# Heuristics take the (x, y) of a node and of the end node
 HEURISTICS = {
-    'Manhattan': lambda node, endNode: abs(node.x - endNode.x) + abs(node.y - endNode.y)
+    'Manhattan': _manhattan,
+    'Euclidean': _euclidean,
+    'Octile': _octile,
+    'Chebyshev': _chebyshev,
+    'Weighted Manhattan (ε = 1.5)': weighted(_manhattan, 1.5),
+    'Weighted Octile (ε = 1.5)': weighted(_octile, 1.5),
+    'Weighted Octile (ε = 3)': weighted(_octile, 3),
 }
 
+# Names of the heuristics that never overestimate the cost to the end, without and with diagonal neighbors.
+#  Manhattan overestimates with diagonals, since a diagonal step costs less than the two steps it counts
+ADMISSIBLE = {
+    False: {'Manhattan', 'Euclidean', 'Octile', 'Chebyshev'},
+    True: {'Euclidean', 'Octile', 'Chebyshev'},
+}
+
+# Base heuristic and weight of the weighted heuristics
+WEIGHTED = {
+    'Weighted Manhattan (ε = 1.5)': ('Manhattan', 1.5),
+    'Weighted Octile (ε = 1.5)': ('Octile', 1.5),
+    'Weighted Octile (ε = 3)': ('Octile', 3),
+}
+
+
+def defaultHeuristic(diagonals: bool):
+    """
+    Returns the name of the tightest admissible heuristic for the neighbor model
+    """
+    return 'Octile' if diagonals else 'Manhattan'
+
+
+def suboptimality(heuristic: str, diagonals: bool):
+    """
+    Returns how many times longer than the shortest path the path found by A* with the named heuristic can be,
+    for the neighbor model: 1 for admissible heuristics, their weight for weighted admissible heuristics, or None if
+    there is no bound
+    """
+
+    if heuristic in ADMISSIBLE[diagonals]:
+        return 1
+
+    base, weight = WEIGHTED.get(heuristic, (None, None))
+    if base in ADMISSIBLE[diagonals]:
+        return weight
+
+    return None
+
+
+# The registered algorithms, by name, in the form:
+#  { 'algorithm': algorithmFunction, 'heuristics': [h1Name, h2Name, ...], 'prepare': prepareFunction or None }
+# Every algorithm is called as algorithm(grid, start, end, heuristic, onEvent=None) and returns a SearchResult.
+#  Algorithms that don't use a heuristic have no heuristics listed and are passed None. See register() for prepare
+ALGORITHMS = {}
+
+
+class SearchResult:
+    """
+    What an algorithm found, and what it took to find it. Counters an algorithm doesn't keep are None
+    """
+
+    def __init__(self, path, expanded: int, pushed: int = None, peakOpen: int = None, reopened: int = None):
+        self.path = path  # List of (x, y) tuples from start to end, or None if no path was found
+        self.expanded = expanded  # Number of nodes taken off the open list
+        self.pushed = pushed  # Number of nodes added to the open list, counting every time a node is added again
+        self.peakOpen = peakOpen  # Largest size of the open list, including entries left from adding nodes again
+        self.reopened = reopened  # Times a node already reached was added again, having found a shorter path to it
+
+        self.cost = None  # Cost of the path on the grid it was found on, with its weights, set by register()
+        self.time = 0  # Seconds the search took, set by register()
+        self.eventTime = 0  # Seconds of that spent in onEvent, e.g. sending events to the GUI, set by register()
+
+        # Set by profileSearch(), see data.profiling
+        self.profile = None  # Report of the functions the search spent the most time in
+        self.peakMemory = None  # Bytes
+
+    @property
+    def length(self):
+        # Number of nodes on the path, None without a path
+        return len(self.path) if self.path is not None else None
+
+    @property
+    def searchTime(self):
+        # Seconds spent searching, without onEvent
+        return self.time - self.eventTime
+
+    def stats(self):
+        """
+        Returns every measurement of the search as a dict, by name
+        """
+
+        return {
+            'found': self.path is not None, 'length': self.length, 'cost': self.cost,
+            'expanded': self.expanded, 'pushed': self.pushed, 'peakOpen': self.peakOpen, 'reopened': self.reopened,
+            'time': self.time, 'searchTime': self.searchTime, 'eventTime': self.eventTime,
+            'peakMemory': self.peakMemory,
+        }
+
+    def __repr__(self):
+        return f'SearchResult(length={self.length}, expanded={self.expanded}, time={self.time:.6f})'
+
+
+def register(name: str, heuristics=(), prepare=None):
+    """
+    Decorator that adds an algorithm to ALGORITHMS under name, and times every run of it, along with the time spent
+    in its onEvent. The cost of the path found is set on the result too.
+    prepare, if given, is called as prepare(grid, start, end, onProgress) to make what the algorithm precomputes and
+    keeps in grid.derived before a search, calling onProgress() between its steps, which may raise to stop it. The
+    algorithm makes whatever wasn't prepared itself
+    """
+
+    def decorator(algorithm):
+
+        @wraps(algorithm)
+        def timed(grid, start, end, heuristic=None, onEvent=None):
+            eventTime = 0
+
+            if onEvent is not None:
+                report = onEvent
+
+                def onEvent(event):
+                    nonlocal eventTime
+                    eventStart = perf_counter()
+                    report(event)
+                    eventTime += perf_counter() - eventStart
+
+            startTime = perf_counter()
+            result = algorithm(grid, start, end, heuristic, onEvent)
+            result.time = perf_counter() - startTime
+            result.eventTime = eventTime
+            result.cost = pathCost(result.path, grid)
+            return result
+
+        ALGORITHMS[name] = {'algorithm': timed, 'heuristics': list(heuristics), 'prepare': prepare}
+        return timed
+
+    return decorator
+
+
+def pathCost(path, grid=None):
+    """
+    Returns the cost of a path given as a list of (x, y) tuples: 1 per adjacent step and DIAGONAL_COST per diagonal
+    step, times the mean weight of the step's two cells if the grid is given. Returns None if there is no path
+    """
+
+    if path is None:
+        return None
+
+    if grid is None or not grid.weighted:
+        return sum(DIAGONAL_COST if x != nextX and y != nextY else 1 for (x, y), (nextX, nextY) in zip(path, path[1:]))
+
+    weights = grid.weightView()
+    return sum((DIAGONAL_COST if x != nextX and y != nextY else 1) * (int(weights[x, y]) + int(weights[nextX, nextY]))
+               / 2 for (x, y), (nextX, nextY) in zip(path, path[1:]))
+
+
+class SearchState:
+    """
+    The per-cell arrays of a search, reused by the next search on the grid instead of being allocated and filled
+    every time. Every search takes a new generation, and a cell's values only count if its stamp is that generation,
+    so the values left by earlier searches are ignored without being cleared. Starting a search costs nothing however
+    big the grid is. See searchState()
+    """
+
+    def __init__(self):
+        self.generation = 0
+        self.size = 0
+        self.g = self.previous = self.reached = self.closed = None
+
+    def begin(self, size: int):
+        """
+        Starts a new generation for a search on a grid with arrays of the given size
+        """
+
+        if size > self.size:
+            self.size = size
+            self.g = np.empty(size)  # Cost of the best path found to the cell
+            self.previous = np.empty(size, dtype=np.int32)  # Cell that path comes from
+            self.reached = np.zeros(size, dtype=np.uint32)  # Generation the cell's g and previous were set in
+            self.closed = np.zeros(size, dtype=np.uint32)  # Generation the cell was expanded in
+            self.generation = 0
+
+        self.generation += 1
+        if self.generation == 2 ** 32:
+            # Stamps from 4 billion searches ago would look new again
+            self.reached[:] = self.closed[:] = 0
+            self.generation = 1
+
+
+@contextmanager
+def searchState(grid):
+    """
+    Lends a SearchState of the grid, with a new generation, for the length of a with block. States are kept in
+    grid.derived and given back afterwards, so searches running at the same time, on other threads or within each
+    other, get states of their own. They take 20 bytes per cell for as long as the grid is kept, remove them from
+    grid.derived to free them
+    """
+
+    states = grid.derived.setdefault('searchStates', [])
+    try:
+        state = states.pop()
+    except IndexError:
+        state = SearchState()
+
+    state.begin(grid.size)
+    try:
+        yield state
+    finally:
+        states.append(state)
+
+
+def _buildPath(grid, previous, startIndex, endIndex, onEvent):
+    """
+    Follows the previous indices back from the end to the start, reporting the path if onEvent is given.
+    Returns the path as a list of (x, y) tuples from start to end
+    """
+
+    path = [grid.coords(endIndex)]
+    while endIndex != startIndex:
+        endIndex = previous[endIndex]
+        path.append(grid.coords(endIndex))
+    path.reverse()
+
+    if onEvent:
+        for x, y in path:
+            onEvent((IN_PATH, x, y))
+
+    return path
+
+
+def _bestFirst(grid, start, end, priority, onEvent):
+    """
+    Searches the grid, always expanding the open node with the lowest priority(g, x, y) first, where g is the cost
+    of the best path to x, y found so far. Priorities can be anything comparable, ties are expanded in the order
+    they were added.
+    Returns a SearchResult
+    """
+
+    with searchState(grid) as state:
+        return _bestFirstIn(state, grid, start, end, priority, onEvent)
 
-def aStar(startNode, endNode, heuristic):
+
+def _bestFirstIn(state, grid, start, end, priority, onEvent):
+    # _bestFirst(), with the arrays of a SearchState
+
+    stride = grid.stride
+    startIndex, endIndex = grid.index(*start), grid.index(*end)
+
+    # A step costs its length times the mean weight of its two cells, i.e. half its length times their sum
+    steps = [(offset, length / 2) for offset, length in grid.neighborSteps()]
+
+    walls, weights = memoryview(grid.walls), memoryview(grid.weights)
+    gScores, previous = memoryview(state.g), memoryview(state.previous)
+    reached, closed, generation = memoryview(state.reached), memoryview(state.closed), state.generation
+
+    # Binary heap of (priority, order, index) with lazy deletion of entries for nodes that were since closed
+    gScores[startIndex], reached[startIndex] = 0, generation
+    openHeap, order, expanded = [(0, 0, startIndex)], count(1), 0
+    pushed, peakOpen, reopened = 1, 1, 0
+
+    while openHeap:
+        _, _, cur = heappop(openHeap)
+        if closed[cur] == generation:
+            continue
+
+        closed[cur] = generation
+        expanded += 1
+        if onEvent:
+            x, y = divmod(cur, stride)
+            onEvent((SEARCHED, x - 1, y - 1))
+
+        if cur == endIndex:
+            path = _buildPath(grid, previous, startIndex, endIndex, onEvent)
+            return SearchResult(path, expanded, pushed, peakOpen, reopened)
+
+        curG, curWeight = gScores[cur], weights[cur]
+        for offset, halfLength in steps:
+            node = cur + offset
+            if walls[node] or closed[node] == generation:
+                continue
+
+            g = curG + halfLength * (curWeight + weights[node])
+            isNew = reached[node] != generation
+            if isNew or g < gScores[node]:
+                reached[node] = generation
+                gScores[node] = g
+                previous[node] = cur
+
+                x, y = divmod(node, stride)
+                heappush(openHeap, (priority(g, x - 1, y - 1), next(order), node))
+                pushed += 1
+
+                if not isNew:
+                    reopened += 1
+                elif onEvent:
+                    onEvent((IN_LIST, x - 1, y - 1))
+
+        if len(openHeap) > peakOpen:
+            peakOpen = len(openHeap)
+
+    return SearchResult(None, expanded, pushed, peakOpen, reopened)
+
+
+@register('A*', heuristics=list(HEURISTICS))
+def aStar(grid, start, end, heuristic, onEvent=None):
+    """
+    Runs an A Star algorithm to find the shortest path between the start and end points of the grid.
+    The grid is a Grid and start and end are (x, y) tuples. No state is kept on the grid, so any number of searches
+    can run on the same grid. The path is only guaranteed to be the shortest if the heuristic is admissible for the
+    grid's neighbors, see suboptimality().
+    If given, onEvent is called with a (kind, x, y) tuple for every node searched, added to the open list and in the
+    final path, in the order it happened.
+    Returns a SearchResult with the path as a list of (x, y) tuples from start to end, or None if no path was found
+    """
+
+    # Nodes with the same f are expanded closest to the end first, which avoids expanding every node of equally
+    #  short paths on open grids. f is rounded so that sums of diagonal costs that should be equal are
+    #  compared as equal, and their ties are broken by h
+    endX, endY = end
+
+    def priority(g, x, y):
+        h = heuristic(x, y, endX, endY)
+        return round(g + h, 9), h
+
+    return _bestFirst(grid, start, end, priority, onEvent)
+
+
+@register('Dijkstra')
+def dijkstra(grid, start, end, heuristic=None, onEvent=None):
+    """
+    Runs Dijkstra's algorithm, expanding nodes in order of their cost from the start.
+    The arguments and result are the same as aStar's, the heuristic is ignored
+    """
+    return _bestFirst(grid, start, end, lambda g, x, y: g, onEvent)
+
+
+@register('Greedy Best-First', heuristics=list(HEURISTICS))
+def greedyBestFirst(grid, start, end, heuristic, onEvent=None):
+    """
+    Runs a greedy best-first search, expanding the node that seems closest to the end according to the heuristic.
+    It is fast but the path it finds isn't always the shortest. The arguments and result are the same as aStar's
+    """
+
+    endX, endY = end
+    return _bestFirst(grid, start, end, lambda g, x, y: heuristic(x, y, endX, endY), onEvent)
+
+
+@register('Breadth-First')
+def breadthFirst(grid, start, end, heuristic=None, onEvent=None):
+    """
+    Runs a breadth-first search, which finds the path with the fewest steps, diagonal or not, whatever the weights.
+    The arguments and result are the same as aStar's, the heuristic is ignored
+    """
+
+    with searchState(grid) as state:
+        return _breadthFirstIn(state, grid, start, end, onEvent)
+
+
+def _breadthFirstIn(state, grid, start, end, onEvent):
+    # breadthFirst(), with the arrays of a SearchState
+
+    stride = grid.stride
+    startIndex, endIndex = grid.index(*start), grid.index(*end)
+    offsets = grid.neighborOffsets()
+
+    walls = memoryview(grid.walls)
+    previous = memoryview(state.previous)
+    seen, generation = memoryview(state.reached), state.generation
+
+    seen[startIndex] = generation
+    queue, expanded = deque([startIndex]), 0
+    pushed, peakOpen = 1, 1
+
+    while queue:
+        cur = queue.popleft()
+        expanded += 1
+        if onEvent:
+            x, y = divmod(cur, stride)
+            onEvent((SEARCHED, x - 1, y - 1))
+
+        if cur == endIndex:
+            path = _buildPath(grid, previous, startIndex, endIndex, onEvent)
+            return SearchResult(path, expanded, pushed, peakOpen, 0)
+
+        for offset in offsets:
+            node = cur + offset
+            if walls[node] or seen[node] == generation:
+                continue
+
+            seen[node] = generation
+            previous[node] = cur
+            queue.append(node)
+            pushed += 1
+
+            if onEvent:
+                x, y = divmod(node, stride)
+                onEvent((IN_LIST, x - 1, y - 1))
+
+        if len(queue) > peakOpen:
+            peakOpen = len(queue)
+
+    return SearchResult(None, expanded, pushed, peakOpen, 0)
+
+
+@register('Bidirectional A*', heuristics=['Manhattan', 'Euclidean', 'Octile', 'Chebyshev'])
+def bidirectionalAStar(grid, start, end, heuristic, onEvent=None):
+    """
+    Runs two A Star searches at once, one from the start towards the end and one from the end towards the start,
+    always expanding the side with the lowest f. It stops once neither side can find a shorter path than the best
+    one found where they met. The arguments and result are the same as aStar's
+    """
+
+    with searchState(grid) as forward, searchState(grid) as backward:
+        return _bidirectionalIn((forward, backward), grid, start, end, heuristic, onEvent)
+
+
+def _bidirectionalIn(states, grid, start, end, heuristic, onEvent):
+    # bidirectionalAStar(), with a SearchState per side
+
+    stride = grid.stride
+    startIndex, endIndex = grid.index(*start), grid.index(*end)
+    steps = [(offset, length / 2) for offset, length in grid.neighborSteps()]  # See _bestFirst()
+    walls, weights = memoryview(grid.walls), memoryview(grid.weights)
+
+    # Everything is kept per side: 0 searches from the start, 1 from the end
+    targets = (end, start)
+    gScores = [memoryview(state.g) for state in states]
+    previous = [memoryview(state.previous) for state in states]
+    reached = [memoryview(state.reached) for state in states]
+    closed = [memoryview(state.closed) for state in states]
+    generations = [state.generation for state in states]
+    openHeaps = [[(0, 0, startIndex)], [(0, 0, endIndex)]]
+    gScores[0][startIndex] = gScores[1][endIndex] = 0
+    reached[0][startIndex], reached[1][endIndex] = generations
+
+    order, expanded = count(1), 0
+    pushed, peakOpen, reopened = 2, 2, 0
+    best, meeting = INF, -1  # Cost of the shortest path found so far, and the node it goes through
+
+    while openHeaps[0] and openHeaps[1]:
+
+        # Any path shorter than the best one must have an f lower than the lowest f of both sides
+        if best <= max(openHeaps[0][0][0], openHeaps[1][0][0]):
+            break
+
+        side = 0 if openHeaps[0][0][0] <= openHeaps[1][0][0] else 1
+        _, _, cur = heappop(openHeaps[side])
+        generation, otherGeneration = generations[side], generations[1 - side]
+        if closed[side][cur] == generation:
+            continue
+
+        closed[side][cur] = generation
+        expanded += 1
+        if onEvent:
+            x, y = divmod(cur, stride)
+            onEvent((SEARCHED, x - 1, y - 1))
+
+        g, otherG = gScores[side], gScores[1 - side]
+        seen, otherSeen = reached[side], reached[1 - side]
+        targetX, targetY = targets[side]
+        curG, curWeight = g[cur], weights[cur]
+
+        for offset, halfLength in steps:
+            node = cur + offset
+            if walls[node] or closed[side][node] == generation:
+                continue
+
+            newG = curG + halfLength * (curWeight + weights[node])
+            isReached = seen[node] == generation
+            if not isReached or newG < g[node]:
+                if isReached:
+                    reopened += 1
+                otherReached = otherSeen[node] == otherGeneration
+                isNew = not isReached and not otherReached
+                seen[node] = generation
+                g[node] = newG
+                previous[side][node] = cur
+
+                x, y = divmod(node, stride)
+                heappush(openHeaps[side], (newG + heuristic(x - 1, y - 1, targetX, targetY), next(order), node))
+                pushed += 1
+
+                if isNew and onEvent:
+                    onEvent((IN_LIST, x - 1, y - 1))
+
+                # The sides met, check if that makes a shorter path
+                if otherReached and newG + otherG[node] < best:
+                    best, meeting = newG + otherG[node], node
+
+        if len(openHeaps[0]) + len(openHeaps[1]) > peakOpen:
+            peakOpen = len(openHeaps[0]) + len(openHeaps[1])
+
+    if startIndex == endIndex:
+        best, meeting = 0, startIndex
+    if best == INF:
+        return SearchResult(None, expanded, pushed, peakOpen, reopened)
+
+    # Join the path from the start to the meeting node with the path from there to the end
+    path = _buildPath(grid, previous[0], startIndex, meeting, None)
+    cur = meeting
+    while cur != endIndex:
+        cur = previous[1][cur]
+        path.append(grid.coords(cur))
+
+    if onEvent:
+        for x, y in path:
+            onEvent((IN_PATH, x, y))
+
+    return SearchResult(path, expanded, pushed, peakOpen, reopened)
+
+
+@register('Jump Point Search', heuristics=['Manhattan', 'Euclidean', 'Octile', 'Chebyshev'])
+def jumpPointSearch(grid, start, end, heuristic, onEvent=None):
     """
-    Runs an A Star algorithm to find the shortest path between the startNode and endNode.
-    Returns True if the path was found, otherwise returns False
+    Runs Jump Point Search, an A Star search that skips over the many equivalent paths of uniform-cost grids.
+    Instead of adding every neighbor to the open list, it jumps in straight lines (and diagonals) until it reaches the
+    end or a node where the path could turn, called a jump point, and only adds those.
+    Only jump points are reported as searched and added to the open list, but the path has every node on it.
+    Jumping skips over the cost of the cells in between, so on a weighted grid it runs A* instead.
+    The arguments and result are the same as aStar's
     """
 
-    # define the open and closed lists (open list starts with start node)
-    openList, closedList = [startNode], []
+    if grid.weighted:
+        return aStar(grid, start, end, heuristic, onEvent)
 
-    # Iterate until list is empty
-    while len(openList):
+    stride = grid.stride
+    startIndex, endIndex = grid.index(*start), grid.index(*end)
+    endX, endY = end
+    walls = memoryview(grid.walls)
+    diagonals = grid.diagonals
 
-        # Sort the open list to put nodes with lowest cost (f) at beginning
-        openList.sort(key=lambda n: n.f)
+    def jump(cur, dx, dy):
+        """
+        Moves from cur in the direction dx, dy until reaching a jump point, whose index is returned.
+        Returns -1 if a wall is hit first
+        """
 
-        # Get the lowest-cost node and add to closed list
-        closedList.append(curNode := openList.pop(0))
-        curNode.searched()
-        sleep(slowdown)
+        step = dx * stride + dy
+        while True:
+            cur += step
+            if walls[cur]:
+                return -1
+            if cur == endIndex:
+                return cur
 
-        # Refresh GUI (Called elsewhere too)
-        QApplication.processEvents()
+            if diagonals:
+                if dx and dy:
+                    # A wall behind either side makes the diagonal next to it a turn no other path takes
+                    if (walls[cur - dx * stride] and not walls[cur - dx * stride + dy]) or \
+                            (walls[cur - dy] and not walls[cur + dx * stride - dy]):
+                        return cur
 
-        # If we found the end node, draw the path and return True
-        if curNode is endNode:
-            path = []
+                    # Straight lines branching off the diagonal are searched as part of it
+                    if jump(cur, dx, 0) != -1 or jump(cur, 0, dy) != -1:
+                        return cur
 
-            while curNode is not startNode:  # Iterates back to the start node
-                path.append(curNode)
-                curNode = curNode.previous
-            path.append(startNode)
+                elif dx:
+                    if (walls[cur + 1] and not walls[cur + step + 1]) or (walls[cur - 1] and not walls[cur + step - 1]):
+                        return cur
+                else:
+                    if (walls[cur + stride] and not walls[cur + stride + dy]) or \
+                            (walls[cur - stride] and not walls[cur - stride + dy]):
+                        return cur
 
-            # Draw path with a delay to somewhat animate it
-            for node in reversed(path):
-                node.inPath()
-                QApplication.processEvents()
-                sleep(slowdown*3)
+            # Without diagonals, the path can only turn past the end of a wall running alongside it
+            elif dx:
+                if (not walls[cur + 1] and walls[cur - step + 1]) or (not walls[cur - 1] and walls[cur - step - 1]):
+                    return cur
 
-            return True
+                # Rows branching off the column are searched as part of it
+                if jump(cur, 0, 1) != -1 or jump(cur, 0, -1) != -1:
+                    return cur
+            else:
+                if (not walls[cur + stride] and walls[cur - step + stride]) or \
+                        (not walls[cur - stride] and walls[cur - step - stride]):
+                    return cur
 
-        # Now add the neighboring nodes if they aren't walls or already closed
-        for node in curNode.neighbors:
-            if node.wall or node in closedList:
+    def directions(cur, parent):
+        """
+        Returns the directions worth jumping in from cur, given the node it was reached from
+        """
+
+        if parent == -1:
+            return grid.neighborDirections()
+
+        x, y = divmod(cur, stride)
+        parentX, parentY = divmod(parent, stride)
+        dx, dy = (x > parentX) - (x < parentX), (y > parentY) - (y < parentY)
+
+        if not diagonals:
+            return [(dx, 0), (0, 1), (0, -1)] if dx else [(0, dy), (1, 0), (-1, 0)]
+
+        if dx and dy:
+            result = [(dx, 0), (0, dy), (dx, dy)]
+            if walls[cur - dx * stride]:
+                result.append((-dx, dy))
+            if walls[cur - dy]:
+                result.append((dx, -dy))
+        elif dx:
+            result = [(dx, 0)]
+            if walls[cur + 1]:
+                result.append((dx, 1))
+            if walls[cur - 1]:
+                result.append((dx, -1))
+        else:
+            result = [(0, dy)]
+            if walls[cur + stride]:
+                result.append((1, dy))
+            if walls[cur - stride]:
+                result.append((-1, dy))
+
+        return result
+
+    gScores = {startIndex: 0}
+    previous = {startIndex: -1}
+    closed = set()
+    openHeap, order, expanded = [(0, 0, startIndex)], count(1), 0
+    pushed, peakOpen, reopened = 1, 1, 0
+
+    while openHeap:
+        _, _, cur = heappop(openHeap)
+        if cur in closed:
+            continue
+
+        closed.add(cur)
+        expanded += 1
+        curX, curY = grid.coords(cur)
+        if onEvent:
+            onEvent((SEARCHED, curX, curY))
+
+        if cur == endIndex:
+            break
+
+        for dx, dy in directions(cur, previous[cur]):
+            node = jump(cur, dx, dy)
+            if node == -1 or node in closed:
                 continue
 
-            # Calculate g
-            g = curNode.g + 1 if curNode.g is not None else 0
+            # Jump points are in a straight line or diagonal from cur
+            x, y = grid.coords(node)
+            distX, distY = abs(x - curX), abs(y - curY)
+            g = gScores[cur] + max(distX, distY) + (DIAGONAL_COST - 1) * min(distX, distY)
+
+            if g < gScores.get(node, INF):
+                isNew = node not in gScores
+                gScores[node] = g
+                previous[node] = cur
+                heappush(openHeap, (g + heuristic(x, y, endX, endY), next(order), node))
+                pushed += 1
 
-            # Allows slight diagonal movement and a preference for adjacent nodes since 
-            if g >= 1 and (g == node.g or not node.g) and node.isAdjacentTo(curNode):
-                g -= .1
+                if not isNew:
+                    reopened += 1
+                elif onEvent:
+                    onEvent((IN_LIST, x, y))
 
-            # Calculate h using heuristic
-            h = heuristic(node, endNode)  # Manhattan Distance
+        if len(openHeap) > peakOpen:
+            peakOpen = len(openHeap)
+    else:
+        return SearchResult(None, expanded, pushed, peakOpen, reopened)
 
-            # Add to get f
-            f = g + h
+    # Fill in the nodes between consecutive jump points
+    jumpPoints = [endIndex]
+    while jumpPoints[-1] != startIndex:
+        jumpPoints.append(previous[jumpPoints[-1]])
+    jumpPoints.reverse()
 
-            # Check current f value of node. If higher than calculation, use new,
-            #  lower value to represent node and change previous node too
-            if node.f is None or f < node.f:
+    path = [start]
+    for fromIndex, toIndex in zip(jumpPoints, jumpPoints[1:]):
+        (x, y), (toX, toY) = grid.coords(fromIndex), grid.coords(toIndex)
+        dx, dy = (toX > x) - (toX < x), (toY > y) - (toY < y)
+        while (x, y) != (toX, toY):
+            x, y = x + dx, y + dy
+            path.append((x, y))
 
-                # Assign values to node
-                node.g, node.h, node.f = g, h, f
+    if onEvent:
+        for x, y in path:
+            onEvent((IN_PATH, x, y))
 
-                # Avoids circular loops
-                node.previous = curNode
+    return SearchResult(path, expanded, pushed, peakOpen, reopened)
 
-                # Add to open list only if it isn't there already
-                if node not in openList:
-                    openList.append(node)
-                    node.inList()
-                    QApplication.processEvents()
 
-    # If it gets here, no path was found
-    return False
+# Algorithms defined in their own modules register themselves when imported
+import data.incremental  # noqa: E402,F401
+import data.hierarchical  # noqa: E402,F401
+import data.fields  # noqa: E402,F401
+import data.landmarks  # noqa: E402,F401
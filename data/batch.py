@@ -0,0 +1,111 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+import os
+
+from data.grid import Grid
+import data.algorithms as algs
+
+
+# The grid each worker process searches, attached to the shared memory once when the process starts
+_workerGrid = None
+_workerMemory = None
+
+
+def _initWorker(memoryName, rows, cols, diagonals):
+    global _workerGrid, _workerMemory
+
+    # The memory has to stay open for as long as the grid uses it. It holds the walls, then the weights
+    _workerMemory = SharedMemory(name=memoryName)
+    size = (rows + 2) * (cols + 2)
+    _workerGrid = Grid.fromBuffer(rows, cols, _workerMemory.buf[:size], _workerMemory.buf[size:2 * size])
+    _workerGrid.diagonals = diagonals
+
+
+def _solveChunk(chunk, algorithmName, heuristicName):
+    """
+    Solves a list of (i, start, end) queries on the worker's grid, returning a list of (i, SearchResult)
+    """
+
+    algorithm = algs.ALGORITHMS[algorithmName]['algorithm']
+    heuristic = algs.HEURISTICS.get(heuristicName)
+    return [(i, algorithm(_workerGrid, start, end, heuristic)) for i, start, end in chunk]
+
+
+def _chunks(queries, size):
+    chunk = []
+    for i, (start, end) in enumerate(queries):
+        chunk.append((i, start, end))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _solveAll(grid, queries, algorithm, heuristic, workers, chunkSize):
+    """
+    Solves every query, yielding (i, SearchResult) as results come in
+    """
+
+    if workers == 1:
+        search = algs.ALGORITHMS[algorithm]['algorithm']
+        for i, (start, end) in enumerate(queries):
+            yield i, search(grid, start, end, algs.HEURISTICS.get(heuristic))
+        return
+
+    memory = SharedMemory(create=True, size=2 * grid.size)
+    try:
+        shared = Grid.fromBuffer(grid.rows, grid.cols, memory.buf[:grid.size], memory.buf[grid.size:])
+        shared.walls[:] = grid.walls
+        shared.weights[:] = grid.weights
+        del shared  # Nothing may use the memory once it's closed
+
+        with ProcessPoolExecutor(workers, initializer=_initWorker,
+                                 initargs=(memory.name, grid.rows, grid.cols, grid.diagonals)) as pool:
+            futures = [pool.submit(_solveChunk, chunk, algorithm, heuristic) for chunk in _chunks(queries, chunkSize)]
+            try:
+                for future in as_completed(futures):
+                    yield from future.result()
+            finally:
+                # Stops early when the caller stops iterating
+                for future in futures:
+                    future.cancel()
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def solveBatch(grid, queries, algorithm='A*', heuristic=None, workers=None, chunkSize=16, cache=None):
+    """
+    Solves many (start, end) queries on the same grid, spread over a pool of worker processes.
+    The walls and weights are copied once into shared memory that every worker reads from, instead of being sent with
+    each query, so later changes to the grid don't affect the batch. Queries are sent in chunks of chunkSize to keep
+    the overhead per query low, and a query asked more than once is only solved once.
+    algorithm and heuristic are names from ALGORITHMS and HEURISTICS, by default the heuristic is the default one for
+    the grid's neighbors. workers defaults to the number of CPUs, with 1 the queries are solved in this process.
+    If a PathCache of the grid is given, cached results are used and new ones are added to it.
+    Yields (i, SearchResult) as results come in, where i is the position of the query in queries. Results of a chunk
+    come together, but chunks can finish in any order
+    """
+
+    if algs.ALGORITHMS[algorithm]['heuristics'] and heuristic is None:
+        heuristic = algs.defaultHeuristic(grid.diagonals)
+
+    # Positions of each distinct query that isn't cached
+    pending = {}
+    for i, (start, end) in enumerate(queries):
+        result = cache.get(start, end, algorithm, heuristic) if cache is not None else None
+        if result is not None:
+            yield i, result
+        else:
+            pending.setdefault((start, end), []).append(i)
+
+    version = grid.version
+    unique = list(pending)
+    for j, result in _solveAll(grid, unique, algorithm, heuristic, workers or os.cpu_count() or 1, chunkSize):
+        start, end = unique[j]
+        if cache is not None:
+            cache.put(start, end, algorithm, heuristic, result, version)
+
+        for i in pending[start, end]:
+            yield i, result
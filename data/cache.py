@@ -0,0 +1,105 @@
+from collections import OrderedDict
+
+
+class PathCache:
+    """
+    Remembers the results of searches on a grid, so that asking for the same path again returns at once.
+
+    Results are kept by (start, end, algorithm, heuristic, diagonals), where algorithm and heuristic can be anything
+    that tells them apart, such as their names. The least recently used results are dropped once there are more than
+    maxEntries of them or their paths add up to more than maxCells cells.
+
+    The cache listens to the grid to stay up to date. A new wall, or a heavier cell, only drops the paths that go
+    through it, since every other path is still there and nothing can be shorter than before. Removing a wall,
+    lightening a cell, or any other change, can make shorter paths appear anywhere, so everything is dropped
+    """
+
+    def __init__(self, grid, maxEntries: int = 10000, maxCells: int = 1000000):
+        self.grid = grid
+        self.maxEntries = maxEntries
+        self.maxCells = maxCells
+
+        self._results = OrderedDict()  # SearchResults by key, least recently used first
+        self._byCell = {}  # Keys of the paths that go through each cell, by (x, y)
+        self._cells = 0  # Number of cells in all cached paths
+
+        self.hits = self.misses = 0
+
+        grid.addListener(self)
+
+    def key(self, start, end, algorithm, heuristic):
+        return start, end, algorithm, heuristic, self.grid.diagonals
+
+    def get(self, start, end, algorithm, heuristic):
+        """
+        Returns the cached SearchResult of the search, or None if there is none
+        """
+
+        key = self.key(start, end, algorithm, heuristic)
+        result = self._results.get(key)
+
+        if result is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._results.move_to_end(key)
+        return result
+
+    def put(self, start, end, algorithm, heuristic, result, version=None):
+        """
+        Caches the SearchResult of a search. If version is given, the result is only kept if the grid's version is
+        still the same, i.e. the search was started at that version and nothing changed while it ran
+        """
+
+        if version is not None and version != self.grid.version:
+            return
+
+        key = self.key(start, end, algorithm, heuristic)
+        if key in self._results:
+            self._remove(key)
+
+        self._results[key] = result
+        if result.path is not None:
+            self._cells += len(result.path)
+            for cell in result.path:
+                self._byCell.setdefault(cell, set()).add(key)
+
+        while self._results and (len(self._results) > self.maxEntries or self._cells > self.maxCells):
+            self._remove(next(iter(self._results)))
+
+    def clear(self):
+        self._results.clear()
+        self._byCell.clear()
+        self._cells = 0
+
+    def _remove(self, key):
+        result = self._results.pop(key)
+        if result.path is None:
+            return
+
+        self._cells -= len(result.path)
+        for cell in result.path:
+            keys = self._byCell[cell]
+            keys.discard(key)
+            if not keys:
+                del self._byCell[cell]
+
+    # -- Grid listener --
+
+    def wallChanged(self, x, y, wall: bool):
+        if not wall:
+            self.clear()
+            return
+
+        for key in list(self._byCell.get((x, y), ())):
+            self._remove(key)
+
+    def weightChanged(self, x, y, weight: int, oldWeight: int):
+        self.wallChanged(x, y, weight > oldWeight)
+
+    def gridChanged(self):
+        self.clear()
+
+    def __len__(self):
+        return len(self._results)
@@ -0,0 +1,267 @@
+from heapq import heappush, heappop
+from time import perf_counter
+
+import numpy as np
+
+from data.algorithms import SearchResult
+
+
+PROGRESS_EXPANSIONS = 1000  # Nodes a space-time search expands between calls to onProgress
+
+
+class ReservationTable:
+    """
+    The cells and moves taken by the agents planned so far, at every time step, so that the next agents plan around
+    them. Cells and moves are kept in sets of ints, so looking one up costs the same however many agents there are.
+
+    An agent that reached its goal stays there: its goal is taken for good from its arrival on
+    """
+
+    def __init__(self, size: int):
+        self.size = size  # Length of the grid's arrays, cells are their index in them
+
+        self._cells = set()  # time * size + cell, for every cell taken at every time
+        self._moves = set()  # (time * size + from) * size + to, for every move that ends at time
+        self._parked = {}  # Time from which each goal is taken for good, by cell
+        self._lastTaken = {}  # Last time each cell is taken by an agent that moves on, by cell
+
+    def reserve(self, cells):
+        """
+        Takes the cells of an agent's path, given as its cell at every time step, and its goal from then on
+        """
+
+        size = self.size
+        for time, cell in enumerate(cells):
+            self._cells.add(time * size + cell)
+            if time:
+                self._moves.add((time * size + cells[time - 1]) * size + cell)
+            if self._lastTaken.get(cell, -1) < time:
+                self._lastTaken[cell] = time
+
+        self._parked[cells[-1]] = len(cells) - 1
+
+    def canMove(self, fromCell, toCell, time):
+        """
+        Returns whether an agent can move from fromCell to toCell (the same cell to wait), arriving at time, without
+        running into another agent there or swapping places with one
+        """
+
+        size = self.size
+        if time * size + toCell in self._cells:
+            return False
+
+        parked = self._parked.get(toCell)
+        if parked is not None and time >= parked:
+            return False
+
+        return (time * size + fromCell) * size + toCell not in self._moves and \
+            (time * size + toCell) * size + fromCell not in self._moves
+
+    def canStay(self, cell, time):
+        """
+        Returns whether an agent can stop at cell for good from time on, without another agent passing through later
+        """
+        return self._lastTaken.get(cell, -1) <= time and cell not in self._parked
+
+    def freeFrom(self, cell):
+        """
+        Returns the first time from which an agent could stop at cell for good, None if another agent stops there
+        """
+        return self._lastTaken.get(cell, -1) + 1 if cell not in self._parked else None
+
+
+def stepsTo(grid, goal):
+    """
+    Returns the fewest steps from every cell to goal, diagonal or not, as an array laid out like grid.walls. Walls and
+    cells that can't reach the goal are -1. Found a whole ring of cells at a time
+    """
+
+    walls = grid.walls
+    steps = np.full(grid.size, -1, dtype=np.int64)
+    goalIndex = grid.index(*goal)
+    if walls[goalIndex]:
+        return steps
+
+    offsets = np.array(grid.neighborOffsets())
+    steps[goalIndex] = 0
+    ring, distance = np.array([goalIndex]), 0
+    while ring.size:
+        distance += 1
+        neighbors = np.unique((ring[:, None] + offsets).ravel())
+        ring = neighbors[~walls[neighbors] & (steps[neighbors] < 0)]
+        steps[ring] = distance
+
+    return steps
+
+
+def cooperativeAStar(grid, agents, maxTime: int = None, onProgress=None):
+    """
+    Plans paths for many agents on the same grid that never run into each other, with Cooperative A* (by Silver).
+    agents is a list of (start, end) tuples of (x, y). Agents are planned one at a time in that order, each with an
+    A* search through space and time that avoids the cells and moves taken by the ones before it, which are kept in a
+    ReservationTable. Two agents are never in the same cell at the same time, nor swap places with each other.
+    Every step, moving to a neighbor or waiting in place, takes one time step, whatever its length or the weights.
+    The heuristic is the exact number of steps to the goal when alone on the grid (see stepsTo()), so agents only
+    search further than their own shortest path where others are in the way.
+    An agent gives up once its search reaches maxTime steps past the length of its shortest path, by default as many
+    as the rows and columns of the grid, or if it can't reach its goal at all. It is then left without a path and
+    stays at its start, which no other agent goes through: agents planned before it that did are planned again.
+    onProgress, if given, is called before each agent is planned and every PROGRESS_EXPANSIONS nodes its search
+    expands, and can raise to stop planning.
+    Returns a SearchResult per agent, in the order of agents, whose path is the agent's cell at every time step from
+    0, so it repeats a cell wherever the agent waits, and whose cost is its number of time steps
+    """
+
+    walls = memoryview(grid.walls)
+    moves = grid.neighborOffsets() + [0]  # Waiting in place is a move too
+    stepsCache = {}  # Steps to each goal, by goal, for agents that share one
+    starts = [grid.index(*start) for start, _ in agents]
+
+    results = [None] * len(agents)
+    stuck = set()  # Agents that stay at their start, from an earlier pass
+    first = 0  # First agent planned in this pass, those before it keep their path
+
+    while True:
+        table = ReservationTable(grid.size)
+        for i in stuck:
+            table.reserve([starts[i]])
+        for result in results[:first]:
+            if result.path is not None:
+                table.reserve([grid.index(x, y) for x, y in result.path])
+
+        for i in range(first, len(agents)):
+            if i in stuck:
+                results[i] = SearchResult(None, 0, 0, 0, 0)
+                continue
+
+            if onProgress:
+                onProgress()
+
+            start, end = agents[i]
+            startTime = perf_counter()
+
+            if end not in stepsCache:
+                stepsCache[end] = memoryview(stepsTo(grid, end))
+            steps = stepsCache[end]
+
+            startIndex, endIndex = starts[i], grid.index(*end)
+            if walls[startIndex] or steps[startIndex] < 0:
+                result = SearchResult(None, 0, 0, 0, 0)
+            else:
+                horizon = steps[startIndex] + (maxTime if maxTime is not None else grid.rows + grid.cols)
+                result = _spaceTimeSearch(grid, startIndex, endIndex, steps, moves, walls, table, horizon, onProgress)
+
+            if result.path is not None:
+                table.reserve([grid.index(x, y) for x, y in result.path])
+                result.cost = len(result.path) - 1
+            else:
+                table.reserve([startIndex])  # The agent stays where it is, so later agents go around it
+            result.time = perf_counter() - startTime
+            results[i] = result
+
+        # Agents planned before one that got stuck could go through its start, those are planned again with it
+        #  taken from the beginning. The plans of the agents before the first of them are still the best ones
+        stuckStarts = {starts[i] for i, result in enumerate(results) if result.path is None and i not in stuck}
+        crossing = [i for i, result in enumerate(results)
+                    if result.path is not None and any(grid.index(x, y) in stuckStarts for x, y in result.path)]
+        if not crossing:
+            return results
+
+        stuck.update(i for i, result in enumerate(results) if result.path is None)
+        first = crossing[0]
+
+
+def _spaceTimeSearch(grid, startIndex, endIndex, steps, moves, walls, table, horizon, onProgress=None):
+    """
+    Searches for the fastest path from startIndex to endIndex through space and time, up to time horizon, that the
+    table lets through and that ends where the agent can stay. onProgress is called every PROGRESS_EXPANSIONS nodes
+    expanded. Returns a SearchResult
+    """
+
+    size = grid.size
+    expanded = pushed = reopened = 0
+
+    # The agent can't arrive for good before the last agent passing through its goal has left, which the bound takes
+    #  into account, or it would search every way to wait for it
+    arrival = table.freeFrom(endIndex)
+    if arrival is None:
+        return SearchResult(None, expanded, pushed, 0, reopened)
+
+    # States are time * size + cell. Every step takes one time step, so the first path found to a state is the
+    #  fastest, and states are never reached again
+    previous = {startIndex: None}
+    openHeap = [(max(steps[startIndex], arrival), steps[startIndex], 0, startIndex)]  # f, h, time, cell
+    peakOpen = 1
+
+    while openHeap:
+        _, _, time, cur = heappop(openHeap)
+        expanded += 1
+        if onProgress and not expanded % PROGRESS_EXPANSIONS:
+            onProgress()
+
+        if cur == endIndex and table.canStay(cur, time):
+            state, path = time * size + cur, []
+            while state is not None:
+                path.append(grid.coords(state % size))
+                state = previous[state]
+            return SearchResult(path[::-1], expanded, pushed, peakOpen, reopened)
+
+        if time == horizon:
+            continue
+
+        nextTime = time + 1
+        for move in moves:
+            node = cur + move
+            h = steps[node]
+            f = nextTime + h if nextTime + h > arrival else arrival
+            if walls[node] or h < 0 or f > horizon:
+                continue
+
+            state = nextTime * size + node
+            if state in previous or not table.canMove(cur, node, nextTime):
+                continue
+
+            previous[state] = time * size + cur
+            heappush(openHeap, (f, h, nextTime, node))
+            pushed += 1
+
+        if len(openHeap) > peakOpen:
+            peakOpen = len(openHeap)
+
+    return SearchResult(None, expanded, pushed, peakOpen, reopened)
+
+
+def conflicts(paths, starts=None):
+    """
+    Returns the collisions between paths given as the cell of each agent at every time step, as a list of (time, i,
+    j) where agents i and j are in the same cell at time, or swap places while going to time. Agents stay at the end
+    of their path afterwards. Agents without a path (None) stay at their start if starts are given, and are left out
+    otherwise
+    """
+
+    if starts is not None:
+        paths = [path if path is not None else [start] for path, start in zip(paths, starts)]
+
+    found = []
+    length = max((len(path) for path in paths if path is not None), default=0)
+    agents = [i for i, path in enumerate(paths) if path is not None]
+
+    def at(i, time):
+        path = paths[i]
+        return path[min(time, len(path) - 1)]
+
+    for time in range(length):
+        taken = {}
+        for i in agents:
+            cell = at(i, time)
+            if cell in taken:
+                found.append((time, taken[cell], i))
+            taken[cell] = i
+
+        if time:
+            for i in agents:
+                j = taken.get(at(i, time - 1))
+                if j is not None and j != i and at(j, time - 1) == at(i, time) and i < j:
+                    found.append((time, i, j))
+
+    return found
@@ -0,0 +1,195 @@
+import numpy as np
+
+from data.algorithms import SearchResult, register, SEARCHED, IN_LIST, IN_PATH, INF
+
+
+def relax(distances, weights, steps, onProgress=None):
+    """
+    Lowers distances in place until they are the shortest distances to their sources, where sources are the cells
+    already at 0. Any number of independent fields can be relaxed at once, along the leading axes.
+    distances has a border one cell wide that is left untouched, it should be INF. weights are the weights of the
+    cells, INF for walls, laid out like distances (border included) or broadcasting against them. steps are the
+    (dx, dy, length) of the moves to a neighbor, which cost their length times the mean weight of their two cells.
+    Every pass moves the distances one step further, so it takes about as many passes as the longest path has steps.
+    onProgress, if given, is called after every pass. Best for many small fields, see distanceField() for a single
+    big one
+    """
+
+    rows, cols = distances.shape[-2] - 2, distances.shape[-1] - 2
+    inner = distances[..., 1:-1, 1:-1]
+
+    # The cost of the step from each neighbor into every cell
+    innerWeights = weights[..., 1:-1, 1:-1]
+    stepCosts = [(length * (innerWeights + weights[..., 1 - dx:rows + 1 - dx, 1 - dy:cols + 1 - dy]) / 2)
+                 .astype(distances.dtype) for dx, dy, length in steps]
+
+    for _ in range(rows * cols):
+        before = inner.copy()
+        for (dx, dy, _), stepCost in zip(steps, stepCosts):
+            neighbors = distances[..., 1 - dx:rows + 1 - dx, 1 - dy:cols + 1 - dy]
+            np.minimum(inner, neighbors + stepCost, out=inner)
+
+        if np.array_equal(before, inner):
+            break
+        if onProgress:
+            onProgress()
+
+
+def distanceField(grid, goal, stopAt=None, onEvent=None, onProgress=None):
+    """
+    Returns the cost of the shortest path from every cell of the grid to goal, as an array laid out like grid.walls
+    (see Grid.view()). Walls and cells that can't reach the goal are INF.
+    Works like Dijkstra's algorithm, but settles a whole band of distances at once: as no step costs less than 1,
+    every cell less than 1 further than the last band is final, and all their neighbors are updated together.
+    If stopAt is an (x, y), stops once its distance is known, leaving farther cells unfinished.
+    onEvent is called like the algorithms' onEvent, see aStar(), for every cell settled and reached. onProgress, if
+    given, is called after every band
+    """
+
+    walls = grid.walls
+    distances = np.full(grid.size, INF)
+    goalIndex = grid.index(*goal)
+    if walls[goalIndex]:
+        return distances
+
+    steps = grid.neighborSteps()
+    offsets = np.array([offset for offset, _ in steps])
+    lengths = np.array([length for _, length in steps])
+    # A step costs its length times the sum of these for its two cells, or just its length on an unweighted grid
+    halfWeights = grid.weights / 2 if grid.weighted else None
+    stopIndex = grid.index(*stopAt) if stopAt is not None else -1
+
+    distances[goalIndex] = 0
+    pending = np.array([goalIndex])  # Cells reached but not settled
+    bound = 1  # Cells closer than this are settled in the next band
+
+    while pending.size:
+        closer = distances[pending] < bound
+        settled, pending = pending[closer], pending[~closer]
+        bound += 1
+
+        if not settled.size:
+            # Skip the bands nothing is in
+            bound = np.floor(distances[pending].min()) + 1
+            continue
+
+        if onEvent:
+            for index in settled.tolist():
+                onEvent((SEARCHED, *grid.coords(index)))
+
+        if stopIndex in settled:
+            break
+
+        # Every neighbor that gets closer through a settled cell, keeping the closest when it's reached twice
+        neighbors = settled[:, None] + offsets
+        stepCosts = lengths
+        if halfWeights is not None:
+            stepCosts = lengths * (halfWeights[settled][:, None] + halfWeights[neighbors])
+        neighbors, newDistances = neighbors.ravel(), (distances[settled][:, None] + stepCosts).ravel()
+        closer = ~walls[neighbors] & (newDistances < distances[neighbors])
+        neighbors, newDistances = neighbors[closer], newDistances[closer]
+
+        if onEvent:
+            for index in np.unique(neighbors[distances[neighbors] == INF]).tolist():
+                onEvent((IN_LIST, *grid.coords(index)))
+
+        np.minimum.at(distances, neighbors, newDistances)
+        pending = np.union1d(pending, neighbors)
+
+        if onProgress:
+            onProgress()
+
+    return distances
+
+
+class FlowField:
+    """
+    The distance field towards a goal, and for every cell the direction of the next step towards it. Once made, the
+    path from any cell is found by following the directions, without searching. Useful when many agents go to the
+    same goal.
+    The field is made from the grid as it is when created, make a new one after the grid changes
+    """
+
+    def __init__(self, grid, goal):
+        self.grid = grid
+        self.goal = goal
+        self.distances = distanceField(grid, goal)
+        self.directions = self._directions()
+
+    def _directions(self):
+        """
+        Returns, for every cell, the position in grid.neighborSteps() of the step to the neighbor its shortest path
+        goes through, as an array laid out like grid.walls. It is -1 for the goal, walls and cells that can't reach
+        the goal
+        """
+
+        grid, distances = self.grid, self.distances
+        steps = grid.neighborSteps()
+        halfWeights = grid.weights / 2
+
+        # The distance through each neighbor, for every cell. Padding both ends by the largest offset keeps every
+        #  neighbor inside the array
+        pad = grid.stride + 1
+        padded = np.pad(distances, pad, constant_values=INF)
+        paddedWeights = np.pad(halfWeights, pad)
+        through = np.stack([padded[pad + offset:pad + offset + grid.size] +
+                            length * (halfWeights + paddedWeights[pad + offset:pad + offset + grid.size])
+                            for offset, length in steps])
+
+        directions = np.argmin(through, axis=0).astype(np.int8)
+        directions[(distances == INF) | (distances == 0)] = -1
+        return directions
+
+    def distanceAt(self, x, y):
+        return float(self.distances[self.grid.index(x, y)])
+
+    def pathFrom(self, start):
+        """
+        Returns the shortest path from start to the goal as a list of (x, y) tuples, or None if the goal can't be
+        reached from start
+        """
+
+        grid = self.grid
+        cur = grid.index(*start)
+        if self.distances[cur] == INF:
+            return None
+
+        offsets = [offset for offset, _ in grid.neighborSteps()]
+        directions = memoryview(self.directions)
+
+        path = [start]
+        while directions[cur] != -1:
+            cur += offsets[directions[cur]]
+            path.append(grid.coords(cur))
+        return path
+
+
+@register('Flow Field')
+def flowField(grid, start, end, heuristic=None, onEvent=None):
+    """
+    Makes the distance field from the end, a band of distances at a time, until the start is reached, then goes
+    down it from the start. The arguments and result are the same as aStar's, the heuristic is ignored
+    """
+
+    distances = distanceField(grid, end, stopAt=start, onEvent=onEvent)
+    startIndex, endIndex = grid.index(*start), grid.index(*end)
+    if distances[startIndex] == INF:
+        return SearchResult(None, int(np.count_nonzero(distances < INF)))
+
+    expanded = int(np.count_nonzero(distances <= distances[startIndex]))
+
+    # Cells left unsettled by stopping early are never closer than they should be, so the closest neighbor is
+    #  always one the shortest path goes through
+    walls, weights = memoryview(grid.walls), memoryview(grid.weights)
+    steps = [(offset, length / 2) for offset, length in grid.neighborSteps()]
+    path, cur = [start], startIndex
+    while cur != endIndex:
+        cur = min((distances[cur + offset] + halfLength * (weights[cur] + weights[cur + offset]), cur + offset)
+                  for offset, halfLength in steps if not walls[cur + offset])[1]
+        path.append(grid.coords(cur))
+
+    if onEvent:
+        for x, y in path:
+            onEvent((IN_PATH, x, y))
+
+    return SearchResult(path, expanded)
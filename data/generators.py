@@ -0,0 +1,288 @@
+import numpy as np
+
+
+# Generators make the walls of a grid. They are called as generator(rows, cols, rng, **options), where rng is a
+#  numpy Generator so that the same seed always makes the same walls, and return a (rows, cols) array of booleans
+#  that is True where there is a wall
+
+
+def randomNumbers(rng, batch=65536):
+    """
+    Yields random floats in [0, 1) from rng forever, drawing them a batch at a time. Generators that pick in a Python
+    loop take from here, asking rng for a single number costs much more than the pick itself
+    """
+
+    while True:
+        yield from rng.random(batch).tolist()
+
+
+def randomWalls(rows, cols, rng, density=.3):
+    """
+    Makes every cell a wall with the given probability
+    """
+    return rng.random((rows, cols)) < density
+
+
+def maze(rows, cols, rng):
+    """
+    Makes a maze with a randomized depth-first search. Cells at even coordinates are rooms, the walls between them
+    are knocked down as the search goes. Every room is reachable from every other through exactly one path
+    """
+
+    walls = np.ones((rows, cols), dtype=bool)
+    roomRows, roomCols = (rows + 1) // 2, (cols + 1) // 2
+
+    picks = randomNumbers(rng)
+    visited = np.zeros((roomRows, roomCols), dtype=bool)
+    stack = [(0, 0)]
+    visited[0, 0] = True
+    walls[0, 0] = False
+
+    while stack:
+        x, y = stack[-1]
+
+        # Rooms next to this one that weren't visited yet
+        options = [(x + dx, y + dy) for dx, dy in ((0, -1), (0, 1), (-1, 0), (1, 0))
+                   if 0 <= x + dx < roomRows and 0 <= y + dy < roomCols and not visited[x + dx, y + dy]]
+
+        if not options:
+            stack.pop()
+            continue
+
+        nx, ny = options[int(next(picks) * len(options))]
+        visited[nx, ny] = True
+        walls[2 * nx, 2 * ny] = walls[x + nx, y + ny] = False  # The room, and the wall between the two rooms
+        stack.append((nx, ny))
+
+    return walls
+
+
+def rooms(rows, cols, rng, numRooms=None):
+    """
+    Makes rectangular rooms joined by corridors. Every room is joined to the one made before it with an L-shaped
+    corridor, so every room is reachable
+    """
+
+    walls = np.ones((rows, cols), dtype=bool)
+    maxHeight, maxWidth = max(4, rows // 4), max(4, cols // 4)  # Room sides are from 3 up to these, excluded
+
+    # Rooms are placed anywhere and overlap, so they open about 1 - e^-(rooms' area / grid's area) of the grid. As
+    #  many rooms as half the grid's area over the mean area of a room leave about half to 60% of it walls, whatever
+    #  its size, where a fixed number of rooms per cell would open nearly all of a big grid
+    meanArea = (3 + maxHeight - 1) / 2 * (3 + maxWidth - 1) / 2
+    numRooms = numRooms or max(2, int(rows * cols / (2 * meanArea)))
+    centers = []
+
+    for _ in range(numRooms):
+        height = min(rows, rng.integers(3, maxHeight))
+        width = min(cols, rng.integers(3, maxWidth))
+        top, left = rng.integers(0, max(1, rows - height)), rng.integers(0, max(1, cols - width))
+        walls[top:top + height, left:left + width] = False
+
+        center = (top + height // 2, left + width // 2)
+        if centers:
+            (x0, y0), (x1, y1) = centers[-1], center
+            walls[min(x0, x1):max(x0, x1) + 1, y0] = False
+            walls[x1, min(y0, y1):max(y0, y1) + 1] = False
+        centers.append(center)
+
+    return walls
+
+
+def primMaze(rows, cols, rng):
+    """
+    Makes a maze with randomized Prim's algorithm, rooms at even coordinates like maze(). The maze grows from a random
+    room by opening a random wall between it and a room not in it yet, which makes many short dead ends
+    """
+
+    walls = np.ones((rows, cols), dtype=bool)
+    roomRows, roomCols = (rows + 1) // 2, (cols + 1) // 2
+    inMaze = np.zeros((roomRows, roomCols), dtype=bool)
+
+    picks = randomNumbers(rng)
+
+    def addRoom(x, y):
+        inMaze[x, y] = True
+        walls[2 * x, 2 * y] = False
+        frontier.extend((x, y, x + dx, y + dy) for dx, dy in ((0, -1), (0, 1), (-1, 0), (1, 0))
+                        if 0 <= x + dx < roomRows and 0 <= y + dy < roomCols and not inMaze[x + dx, y + dy])
+
+    # Walls between a room in the maze and one that may not be, as (x, y, nx, ny) of both rooms
+    frontier = []
+    addRoom(int(rng.integers(roomRows)), int(rng.integers(roomCols)))
+
+    while frontier:
+        # Take a random wall out, by moving the last one in its place
+        i = int(next(picks) * len(frontier))
+        frontier[i], frontier[-1] = frontier[-1], frontier[i]
+        x, y, nx, ny = frontier.pop()
+
+        if not inMaze[nx, ny]:
+            walls[x + nx, y + ny] = False
+            addRoom(nx, ny)
+
+    return walls
+
+
+def kruskalMaze(rows, cols, rng):
+    """
+    Makes a maze with randomized Kruskal's algorithm, rooms at even coordinates like maze(). Walls between rooms are
+    opened in a random order, unless the rooms are already joined, which makes a maze without any long corridors
+    """
+
+    walls = np.ones((rows, cols), dtype=bool)
+    walls[::2, ::2] = False
+    roomRows, roomCols = (rows + 1) // 2, (cols + 1) // 2
+
+    # Both rooms of every wall between two rooms, as room numbers, and the cell of the wall
+    rooms = np.arange(roomRows * roomCols).reshape(roomRows, roomCols)
+    fromRoom = np.concatenate((rooms[:, :-1].ravel(), rooms[:-1].ravel()))
+    toRoom = np.concatenate((rooms[:, 1:].ravel(), rooms[1:].ravel()))
+    wallX, wallY = fromRoom // roomCols + toRoom // roomCols, fromRoom % roomCols + toRoom % roomCols
+
+    # Union-find of the rooms joined so far
+    parent = list(range(roomRows * roomCols))
+
+    def find(room):
+        while parent[room] != room:
+            parent[room] = parent[parent[room]]
+            room = parent[room]
+        return room
+
+    opened = []
+    for i in rng.permutation(len(fromRoom)).tolist():
+        a, b = find(int(fromRoom[i])), find(int(toRoom[i]))
+        if a != b:
+            parent[a] = b
+            opened.append(i)
+
+    walls[wallX[opened], wallY[opened]] = False
+    return walls
+
+
+def recursiveDivision(rows, cols, rng):
+    """
+    Makes a maze by splitting the grid in two with a wall that has a single gap, then each half the same way, until
+    the parts are too small. Walls go on odd rows and columns and gaps on even ones, so no wall blocks a gap
+    """
+
+    picks = randomNumbers(rng)
+    walls = np.zeros((rows, cols), dtype=bool)
+    chambers = [(0, 0, rows, cols)]  # (top, left, bottom, right) of the parts left to split, bottom and right excluded
+
+    while chambers:
+        top, left, bottom, right = chambers.pop()
+
+        # Split across the longest side, at random when they're the same
+        options = [range(top + 1, bottom - 1, 2), range(left + 1, right - 1, 2)]  # Odd rows, then odd columns
+        horizontal = bottom - top > right - left if bottom - top != right - left else next(picks) < .5
+        if not options[not horizontal]:
+            horizontal = not horizontal
+            if not options[not horizontal]:
+                continue
+
+        lines = options[not horizontal]
+        line = lines[int(next(picks) * len(lines))]
+        if horizontal:
+            gap = left + 2 * int(next(picks) * ((right - left + 1) // 2))
+            walls[line, left:right] = True
+            walls[line, gap] = False
+            chambers += [(top, left, line, right), (line + 1, left, bottom, right)]
+        else:
+            gap = top + 2 * int(next(picks) * ((bottom - top + 1) // 2))
+            walls[top:bottom, line] = True
+            walls[gap, line] = False
+            chambers += [(top, left, bottom, line), (top, line + 1, bottom, right)]
+
+    return walls
+
+
+def caves(rows, cols, rng, density=.45, steps=4):
+    """
+    Makes caves by smoothing random walls with a cellular automaton: a wall stays one if at least 4 of the 8 cells
+    around it are walls, and any other cell becomes one if at least 5 are. Outside of the grid counts as walls.
+    Only the biggest cave is kept open
+    """
+
+    walls = rng.random((rows, cols)) < density
+
+    for _ in range(steps):
+        padded = np.pad(walls, 1, constant_values=True).astype(np.uint8)
+        around = sum(padded[1 + dx:rows + 1 + dx, 1 + dy:cols + 1 + dy]
+                     for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy)
+        walls = (around >= 5) | (walls & (around >= 4))
+
+    if walls.all():
+        return walls
+
+    regions = openRegions(walls)
+    biggest = np.argmax(np.bincount(regions[~walls]))
+    return regions != biggest
+
+
+def openRegions(walls):
+    """
+    Returns the region of every open cell of the walls as a (rows, cols) array, where cells that are joined through
+    adjacent (not diagonal) open cells share a region. Regions are numbered by one of their cells, -1 for walls
+    """
+
+    rows, cols = walls.shape
+    isOpen = ~walls.ravel()
+    cells = np.arange(rows * cols).reshape(rows, cols)
+
+    # Pairs of open cells next to each other
+    pairs = [(cells[:, :-1], cells[:, 1:]), (cells[:-1], cells[1:])]
+    fromCell = np.concatenate([a.ravel() for a, _ in pairs])
+    toCell = np.concatenate([b.ravel() for _, b in pairs])
+    joined = isOpen[fromCell] & isOpen[toCell]
+    fromCell, toCell = fromCell[joined], toCell[joined]
+
+    # Every cell points to a cell of its region with a lower number. Each round joins the regions of every pair by
+    #  pointing the higher region at the lower one, then points every cell straight at its region
+    parent = np.arange(rows * cols)
+    while True:
+        a, b = parent[fromCell], parent[toCell]
+        differ = a != b
+        if not differ.any():
+            break
+
+        np.minimum.at(parent, np.maximum(a, b)[differ], np.minimum(a, b)[differ])
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+    parent[~isOpen] = -1
+    return parent.reshape(rows, cols)
+
+
+GENERATORS = {
+    'Random': randomWalls,
+    'Maze': maze,
+    "Prim's Maze": primMaze,
+    "Kruskal's Maze": kruskalMaze,
+    'Recursive Division': recursiveDivision,
+    'Caves': caves,
+    'Rooms': rooms,
+}
+
+
+def cornerPoints(walls):
+    """
+    Returns the open cells closest to the top-left and bottom-right corners of the walls, which makes for long
+    searches. They are always two different cells, and None is returned if there are fewer than two open cells
+    """
+
+    openCells = np.argwhere(~walls)
+    if len(openCells) < 2:
+        return None
+
+    rows, cols = walls.shape
+    start = np.argmin(openCells.sum(axis=1))
+
+    # The start can be the closest cell to both corners too, e.g. with a single row
+    toEnd = (rows - 1 - openCells[:, 0]) + (cols - 1 - openCells[:, 1])
+    toEnd[start] = rows + cols
+    end = np.argmin(toEnd)
+    return tuple(map(int, openCells[start])), tuple(map(int, openCells[end]))
@@ -0,0 +1,280 @@
+import numpy as np
+
+from data.node import Node
+
+
+# Offsets of the neighbors of a cell as (dx, dy), in the order they are searched. The first 4 are directly adjacent
+ADJACENT = ((0, -1), (0, 1), (-1, 0), (1, 0))
+DIAGONAL = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+DIAGONAL_COST = 2 ** .5  # Length of a diagonal step, an adjacent step is 1 long
+
+MAX_WEIGHT = 255  # Weights are stored in a byte per cell
+
+
+class Grid:
+    """
+    The data representation of the grid, stored as flat arrays instead of an object per cell. Every grid is
+    independent, so any number of them can exist and be searched at once.
+
+    The arrays have a border of walls one cell wide around the actual grid, so a cell's neighbors are always found at
+    fixed offsets from its index and never need bounds checks. Use index() and coords() to convert between (x, y)
+    coordinates of the grid and indices into the arrays.
+
+    Every cell also has a weight from 1 to MAX_WEIGHT, 1 by default. A step costs its length times the mean weight of
+    the two cells it joins, so it costs the same both ways and searches from the end find the same paths. As no
+    weight is below 1, the heuristics stay admissible
+    """
+
+    def __init__(self, rows: int, cols: int):
+        self.rows = rows
+        self.cols = cols
+        self.stride = cols + 2  # Length of a padded row
+
+        # Whether each cell is a wall, including the border. The array is a view of a buffer that can be bigger than
+        #  needed, so that shrinking or growing back doesn't allocate
+        self._buffer = np.ones((rows + 2) * self.stride, dtype=bool)
+        self.walls = self._buffer
+        self.wallView()[:] = False
+
+        # Weight of each cell, laid out like the walls, in a buffer of the same length
+        self._weightBuffer = np.ones(len(self._buffer), dtype=np.uint8)
+        self.weights = self._weightBuffer
+        self._weighted = None  # Whether any cell weighs more than 1, None until looked at again after a change
+
+        self._diagonals = True
+        self.start = self.end = None  # (x, y) of the start and end points shown in the GUI
+
+        self._nodes = {}  # The Node views handed out so far, by index
+
+        # Goes up every time the walls, weights or neighbors change, so results can tell if they are out of date
+        self.version = 0
+
+        # Objects told about every change, see addListener()
+        self._listeners = []
+
+        # Data other modules derive from the grid and keep with it, such as planners, by name. They keep it up to
+        #  date themselves, as listeners
+        self.derived = {}
+
+    @classmethod
+    def fromWalls(cls, walls, weights=None):
+        """
+        Makes a grid from a (rows, cols) array-like of booleans, True where there is a wall, and optionally one of
+        the weights
+        """
+
+        walls = np.asarray(walls, dtype=bool)
+        grid = cls(*walls.shape)
+        grid.wallView()[:] = walls
+        if weights is not None:
+            grid.weightView()[:] = weights
+        return grid
+
+    @classmethod
+    def fromBuffer(cls, rows: int, cols: int, buffer, weights=None):
+        """
+        Makes a grid whose walls, border included, live in an existing buffer of (rows + 2) * (cols + 2) bytes, such
+        as shared memory, and the weights in another one of the same length if given. The buffers are used as they
+        are, not copied, so the grid can't be resized
+        """
+
+        grid = cls(0, 0)
+        grid.rows, grid.cols, grid.stride = rows, cols, cols + 2
+        size = (rows + 2) * grid.stride
+        grid._buffer = grid.walls = np.ndarray(size, dtype=bool, buffer=buffer)
+        if weights is not None:
+            grid._weightBuffer = grid.weights = np.ndarray(size, dtype=np.uint8, buffer=weights)
+        else:
+            grid._weightBuffer = grid.weights = np.ones(size, dtype=np.uint8)
+        return grid
+
+    @property
+    def diagonals(self):
+        # Whether diagonal cells are neighbors too
+        return self._diagonals
+
+    @diagonals.setter
+    def diagonals(self, diagonals: bool):
+        if diagonals != self._diagonals:
+            self._diagonals = diagonals
+            self.markChanged()
+
+    @property
+    def weighted(self):
+        # Whether any cell weighs more than 1, otherwise every step costs its length
+        if self._weighted is None:
+            self._weighted = bool(self.weights.max() > 1)
+        return self._weighted
+
+    @property
+    def size(self):
+        # Length of the arrays, including the border
+        return len(self.walls)
+
+    def index(self, x, y):
+        return (x + 1) * self.stride + y + 1
+
+    def coords(self, index):
+        x, y = divmod(index, self.stride)
+        return x - 1, y - 1
+
+    def wallView(self):
+        """
+        Returns a (rows, cols) view of the walls, without the border
+        """
+        return self.view(self.walls)
+
+    def weightView(self):
+        """
+        Returns a (rows, cols) view of the weights, without the border
+        """
+        return self.view(self.weights)
+
+    def view(self, array):
+        """
+        Returns a (rows, cols) view of an array laid out like the walls, without the border
+        """
+        return array.reshape(self.rows + 2, self.stride)[1:-1, 1:-1]
+
+    def resize(self, rows: int, cols: int):
+        """
+        Changes the size of the grid in place, keeping the walls and weights of the cells that are still in it.
+        Start and end points that fall outside of the grid are dropped
+        """
+
+        kept = self.wallView()[:rows, :cols].copy()
+        keptWeights = self.weightView()[:rows, :cols].copy()
+
+        # Only allocate when the buffer is too small
+        size = (rows + 2) * (cols + 2)
+        if size > len(self._buffer):
+            self._buffer = np.empty(size, dtype=bool)
+            self._weightBuffer = np.empty(size, dtype=np.uint8)
+
+        self.rows, self.cols, self.stride = rows, cols, cols + 2
+        self.walls = self._buffer[:size]
+        self.walls[:] = True
+        view = self.wallView()
+        view[:] = False
+        view[:kept.shape[0], :kept.shape[1]] = kept
+
+        self.weights = self._weightBuffer[:size]
+        self.weights[:] = 1
+        self.weightView()[:keptWeights.shape[0], :keptWeights.shape[1]] = keptWeights
+
+        # Node views keep their coordinates, but their index changes with the row length
+        self._nodes = {self.index(n.x, n.y): n for n in self._nodes.values() if (n.x, n.y) in self}
+
+        if self.start is not None and self.start not in self:
+            self.start = None
+        if self.end is not None and self.end not in self:
+            self.end = None
+
+        self.markChanged()
+
+    def setWall(self, x, y, wall: bool):
+        index = self.index(x, y)
+        if self.walls[index] == wall:
+            return
+
+        self.walls[index] = wall
+        self.version += 1
+        for listener in self._listeners:
+            listener.wallChanged(x, y, wall)
+
+    def setWeight(self, x, y, weight: int):
+        """
+        Sets the weight of the cell at x, y. Raises ValueError if it isn't from 1 to MAX_WEIGHT
+        """
+
+        if not 1 <= weight <= MAX_WEIGHT:
+            raise ValueError(f'Weights go from 1 to {MAX_WEIGHT}, not {weight}')
+
+        index = self.index(x, y)
+        oldWeight = int(self.weights[index])
+        if oldWeight == weight:
+            return
+
+        self.weights[index] = weight
+        self._weighted = True if weight > 1 else None
+        self.version += 1
+        for listener in self._listeners:
+            listener.weightChanged(x, y, weight, oldWeight)
+
+    def setWalls(self, walls):
+        """
+        Replaces every wall at once with a (rows, cols) array of booleans, or a single one for all of them, telling
+        listeners once instead of once per cell
+        """
+
+        self.wallView()[:] = walls
+        self.markChanged()
+
+    def setWeights(self, weights):
+        """
+        Replaces every weight at once with a (rows, cols) array of them, or a single one for all of them, telling
+        listeners once
+        """
+
+        self.weightView()[:] = weights
+        self.markChanged()
+
+    def markChanged(self):
+        """
+        Tells listeners that anything may have changed. Must be called after writing to the walls or weights directly,
+        e.g. through wallView()
+        """
+
+        self.version += 1
+        self._weighted = None
+        for listener in self._listeners:
+            listener.gridChanged()
+
+    def addListener(self, listener):
+        """
+        Adds an object to tell about changes to the grid. Its wallChanged(x, y, wall) method is called when a single
+        cell changes through setWall(), its weightChanged(x, y, weight, oldWeight) method when one does through
+        setWeight(), and its gridChanged() method when anything else does
+        """
+        self._listeners.append(listener)
+
+    def removeListener(self, listener):
+        self._listeners.remove(listener)
+
+    def neighborOffsets(self):
+        """
+        Returns the index offsets of a cell's neighbors, in search order. The first 4 are the adjacent neighbors
+        """
+        return [dx * self.stride + dy for dx, dy in self.neighborDirections()]
+
+    def neighborDirections(self):
+        """
+        Returns the (dx, dy) of a cell's neighbors, in search order
+        """
+        return list(ADJACENT + DIAGONAL if self.diagonals else ADJACENT)
+
+    def neighborSteps(self):
+        """
+        Returns the (index offset, length) of the steps to a cell's neighbors, in search order. On a weighted grid, a
+        step costs its length times the mean weight of its two cells
+        """
+
+        steps = [(dx * self.stride + dy, 1) for dx, dy in ADJACENT]
+        if self.diagonals:
+            steps += [(dx * self.stride + dy, DIAGONAL_COST) for dx, dy in DIAGONAL]
+        return steps
+
+    def node(self, x, y):
+        """
+        Returns the Node view of the cell at x, y. The same Node is returned every time
+        """
+
+        index = self.index(x, y)
+        if index not in self._nodes:
+            self._nodes[index] = Node(self, x, y)
+        return self._nodes[index]
+
+    def __contains__(self, point):
+        x, y = point
+        return 0 <= x < self.rows and 0 <= y < self.cols
@@ -0,0 +1,445 @@
+from heapq import heappush, heappop
+from itertools import count
+
+import numpy as np
+
+from data.grid import Grid, DIAGONAL_COST
+from data.algorithms import SearchResult, register, aStar, defaultHeuristic, SEARCHED, IN_LIST, IN_PATH, INF, \
+    HEURISTICS
+from data.fields import relax
+
+
+CLUSTER_SIZE = 16  # Rows and columns of a cluster, by default
+BLOCK_SIZE = 4  # Clusters are built in blocks of this many rows and columns of them, to build many at once
+SPLIT_LENGTH = 6  # Entrances at least this long get a transition at both ends, shorter ones only in the middle
+
+
+class HPAStar:
+    """
+    Finds near-shortest paths on big grids quickly with Hierarchical Pathfinding A* (by Botea, Müller and
+    Schaeffer).
+
+    The grid is split into square clusters. Wherever two clusters share open cells along their border, a few of
+    those cells are picked as transitions, and the distances between all transitions of a cluster (staying in the
+    cluster) are precomputed. Those make an abstract graph that is much smaller than the grid: a query searches it,
+    then only fills in the path one cluster at a time.
+
+    Clusters are built the first time a search reaches them, a block of neighboring ones at a time, and kept until
+    an edit reaches them. The planner listens to the grid, so walls and weights changed through setWall() and
+    setWeight() only drop the clusters next to them. Any other change drops every cluster
+    """
+
+    def __init__(self, grid, clusterSize: int = CLUSTER_SIZE):
+        self.grid = grid
+        self.clusterSize = clusterSize
+
+        # Transitions of each border, by key, as lists of (index, index, cost). Keys are ('h', r, c) for the border
+        #  below cluster r, c, ('v', r, c) for the one to its right and ('d', r, c) for the corner point at its top
+        #  left, which diagonal steps cross
+        self._borders = {}
+
+        # Built clusters, by (r, c), as dicts of the abstract edges from each of their transitions: {index: [(index,
+        #  cost), ...]}
+        self._clusters = {}
+        self._nodeEdges = {}  # The edges of every transition of the built clusters, by index
+
+        self.gridChanged()
+        grid.addListener(self)
+
+    def close(self):
+        """
+        Stops listening to the grid
+        """
+        self.grid.removeListener(self)
+
+    # -- Grid listener --
+
+    def wallChanged(self, x, y, wall: bool):
+        cs = self.clusterSize
+        dropped = {(x // cs, y // cs)}
+
+        # Borders and corners the cell is on, and the clusters on their other side
+        for bx in (x, x + 1):
+            if bx % cs == 0 and 0 < bx < self.grid.rows:
+                self._borders.pop(('h', bx // cs - 1, y // cs), None)
+                dropped.update({(bx // cs - 1, y // cs), (bx // cs, y // cs)})
+
+        for by in (y, y + 1):
+            if by % cs == 0 and 0 < by < self.grid.cols:
+                self._borders.pop(('v', x // cs, by // cs - 1), None)
+                dropped.update({(x // cs, by // cs - 1), (x // cs, by // cs)})
+
+        for bx in (x, x + 1):
+            for by in (y, y + 1):
+                if bx % cs == 0 and by % cs == 0 and 0 < bx < self.grid.rows and 0 < by < self.grid.cols:
+                    self._borders.pop(('d', bx // cs, by // cs), None)
+                    dropped.update((bx // cs - i, by // cs - j) for i in (0, 1) for j in (0, 1))
+
+        for cluster in dropped:
+            for node in self._clusters.pop(cluster, ()):
+                del self._nodeEdges[node]
+
+    def weightChanged(self, x, y, weight: int, oldWeight: int):
+        # The costs of the transitions on the cell and of the paths through it change, in the same clusters as for a
+        #  wall
+        self.wallChanged(x, y, False)
+
+    def gridChanged(self):
+        self._borders.clear()
+        self._clusters.clear()
+        self._nodeEdges.clear()
+        self.clusterRows = -(-self.grid.rows // self.clusterSize)
+        self.clusterCols = -(-self.grid.cols // self.clusterSize)
+
+    # -- Abstract graph --
+
+    def clusterOf(self, x, y):
+        return x // self.clusterSize, y // self.clusterSize
+
+    def build(self, onProgress=None):
+        """
+        Builds every cluster that isn't built yet. Searches build the clusters they need, this only saves them the
+        time. onProgress, if given, is called as the clusters are built, see _buildBlock()
+        """
+
+        for r in range(0, self.clusterRows, BLOCK_SIZE):
+            for c in range(0, self.clusterCols, BLOCK_SIZE):
+                self._buildBlock(r, c, onProgress)
+
+    def _bounds(self, r, c):
+        # Top, left, bottom and right of the cells of a cluster, bottom and right excluded
+        cs = self.clusterSize
+        return r * cs, c * cs, min((r + 1) * cs, self.grid.rows), min((c + 1) * cs, self.grid.cols)
+
+    def _transitions(self, key):
+        """
+        Returns the transitions of a border or corner, finding them the first time
+        """
+
+        if key in self._borders:
+            return self._borders[key]
+
+        grid, cs = self.grid, self.clusterSize
+        kind, r, c = key
+        view, weights = grid.wallView(), grid.weightView()
+        transitions = []
+
+        def transition(a, b, length):
+            # A step costs its length times the mean weight of its two cells
+            transitions.append((grid.index(*a), grid.index(*b), length * (int(weights[a]) + int(weights[b])) / 2))
+
+        if kind == 'd':
+            # Diagonal steps across the corner, in both directions
+            x, y = r * cs, c * cs
+            for a, b in (((x - 1, y - 1), (x, y)), ((x - 1, y), (x, y - 1))):
+                if not view[a] and not view[b]:
+                    transition(a, b, DIAGONAL_COST)
+        else:
+            top, left, bottom, right = self._bounds(r, c)
+            if kind == 'h':
+                cells = [((bottom - 1, y), (bottom, y)) for y in range(left, right)]
+            else:
+                cells = [((x, right - 1), (x, right)) for x in range(top, bottom)]
+
+            # Runs of cells open on both sides of the border
+            isOpen = [not view[a] and not view[b] for a, b in cells] + [False]
+            runStart = None
+            for i, cellOpen in enumerate(isOpen):
+                if cellOpen and runStart is None:
+                    runStart = i
+                elif not cellOpen and runStart is not None:
+                    length = i - runStart
+                    picks = {runStart, i - 1} if length >= SPLIT_LENGTH else {runStart + length // 2}
+                    for pick in sorted(picks):
+                        transition(*cells[pick], 1)
+                    runStart = None
+
+            # With diagonals, cells can also be joined only by a diagonal step across the border. Where either cell
+            #  is part of a run, the run's transitions already reach it
+            if grid.diagonals:
+                for i in range(len(cells) - 1):
+                    if isOpen[i] or isOpen[i + 1]:
+                        continue
+                    for a, b in ((cells[i][0], cells[i + 1][1]), (cells[i + 1][0], cells[i][1])):
+                        if not view[a] and not view[b]:
+                            transition(a, b, DIAGONAL_COST)
+
+        self._borders[key] = transitions
+        return transitions
+
+    def _clusterTransitions(self, r, c):
+        """
+        Returns the (index in the cluster, index outside of it, cost) of every transition of a cluster
+        """
+
+        keys = []
+        if r > 0:
+            keys.append((('h', r - 1, c), 1))
+        if r < self.clusterRows - 1:
+            keys.append((('h', r, c), 0))
+        if c > 0:
+            keys.append((('v', r, c - 1), 1))
+        if c < self.clusterCols - 1:
+            keys.append((('v', r, c), 0))
+
+        if self.grid.diagonals:
+            # Corners at the top left, top right, bottom left and bottom right of the cluster
+            for cr, cc in ((r, c), (r, c + 1), (r + 1, c), (r + 1, c + 1)):
+                if 0 < cr < self.clusterRows and 0 < cc < self.clusterCols:
+                    keys.append((('d', cr, cc), None))
+
+        result = []
+        for key, side in keys:
+            for a, b, cost in self._transitions(key):
+                if side is None:
+                    # Corner transitions have a cell in each of two diagonal clusters, keep the ones in this one
+                    if self.clusterOf(*self.grid.coords(a)) == (r, c):
+                        result.append((a, b, cost))
+                    elif self.clusterOf(*self.grid.coords(b)) == (r, c):
+                        result.append((b, a, cost))
+                else:
+                    result.append((a, b, cost) if side == 0 else (b, a, cost))
+
+        return result
+
+    def _weights(self, r, c):
+        """
+        Returns the weights of the cells of a cluster as a (clusterSize + 2, clusterSize + 2) array with a border one
+        cell wide, INF at walls, on the border and past the edges of the grid
+        """
+
+        cs = self.clusterSize
+        top, left, bottom, right = self._bounds(r, c)
+        weights = np.full((cs + 2, cs + 2), INF, dtype=np.float32)
+        inner = weights[1:bottom - top + 1, 1:right - left + 1]
+        inner[:] = self.grid.weightView()[top:bottom, left:right]
+        inner[self.grid.wallView()[top:bottom, left:right]] = INF
+        return weights
+
+    def _steps(self):
+        return [(dx, dy, DIAGONAL_COST if dx and dy else 1) for dx, dy in self.grid.neighborDirections()]
+
+    def _fields(self, clusters, sources, onProgress=None):
+        """
+        Returns the distances from each source to every cell of its cluster, staying in the cluster, as a list with
+        an array of (len(sources), clusterSize, clusterSize) per cluster. sources are lists of (x, y), one list per
+        cluster. onProgress is passed to relax()
+        """
+
+        cs = self.clusterSize
+        total = sum(len(points) for points in sources)
+        distances = np.full((total, cs + 2, cs + 2), INF, dtype=np.float32)
+        weights = np.empty((total, cs + 2, cs + 2), dtype=np.float32)
+
+        # Every source gets its own field, with the walls and weights of its cluster
+        field = 0
+        for (r, c), points in zip(clusters, sources):
+            weights[field:field + len(points)] = self._weights(r, c)
+            for x, y in points:
+                distances[field, x - r * cs + 1, y - c * cs + 1] = 0
+                field += 1
+
+        relax(distances, weights, self._steps(), onProgress)
+
+        fields, field = [], 0
+        for points in sources:
+            fields.append(distances[field:field + len(points), 1:-1, 1:-1])
+            field += len(points)
+        return fields
+
+    def _buildBlock(self, r, c, onProgress=None):
+        """
+        Builds the clusters that aren't built yet in the block that cluster r, c is in. onProgress, if given, is
+        called after every pass over their distances, and can raise to stop: the block is then left unbuilt
+        """
+
+        grid, cs = self.grid, self.clusterSize
+        top, left = r - r % BLOCK_SIZE, c - c % BLOCK_SIZE
+        clusters = [(cr, cc) for cr in range(top, min(top + BLOCK_SIZE, self.clusterRows))
+                    for cc in range(left, min(left + BLOCK_SIZE, self.clusterCols)) if (cr, cc) not in self._clusters]
+        if not clusters:
+            return
+
+        transitions = [self._clusterTransitions(*cluster) for cluster in clusters]
+        entrances = [sorted({a for a, _, _ in t}) for t in transitions]
+        fields = self._fields(clusters, [[grid.coords(a) for a in e] for e in entrances], onProgress)
+
+        for i, (r, c) in enumerate(clusters):
+            edges = {a: [] for a in entrances[i]}
+            for a, b, cost in transitions[i]:
+                edges[a].append((b, cost))
+
+            # Distances between every two transitions of the cluster
+            local = [grid.coords(a) for a in entrances[i]]
+            xs, ys = np.array(local, dtype=int).reshape(-1, 2).T
+            costs = fields[i][:, xs - r * cs, ys - c * cs].tolist()
+            for a, row in zip(entrances[i], costs):
+                for b, cost in zip(entrances[i], row):
+                    if a != b and cost != INF:
+                        edges[a].append((b, cost))
+
+            self._clusters[r, c] = edges
+            self._nodeEdges.update(edges)
+
+    def _edges(self, cluster):
+        if cluster not in self._clusters:
+            self._buildBlock(*cluster)
+        return self._clusters[cluster]
+
+    # -- Searching --
+
+    def findPath(self, start, end, heuristic=None, onEvent=None):
+        """
+        Finds a path from start to end, which is close to the shortest one but not always the shortest.
+        The heuristic guides the search of the abstract graph, by default it's the tightest admissible one.
+        Only transitions are reported as searched and added to the open list, but the path has every node on it.
+        Returns a SearchResult, where expanded counts the nodes of the abstract graph that were expanded
+        """
+
+        grid, cs = self.grid, self.clusterSize
+        heuristic = heuristic or HEURISTICS[defaultHeuristic(grid.diagonals)]
+        startIndex, endIndex = grid.index(*start), grid.index(*end)
+        if grid.walls[startIndex] or grid.walls[endIndex]:
+            return SearchResult(None, 0)
+
+        startCluster, endCluster = self.clusterOf(*start), self.clusterOf(*end)
+        startEdges, endEdges = self._edges(startCluster), self._edges(endCluster)
+
+        # Connect the start and the end to the transitions of their cluster
+        fields = self._fields([startCluster, endCluster], [[start], [end]])
+
+        def distanceIn(field, cluster, index):
+            x, y = grid.coords(index)
+            return float(field[x - cluster[0] * cs, y - cluster[1] * cs])
+
+        fromStart = [(a, distanceIn(fields[0][0], startCluster, a)) for a in startEdges]
+        if startCluster == endCluster:
+            fromStart.append((endIndex, distanceIn(fields[0][0], startCluster, endIndex)))
+        toEnd = {a: distanceIn(fields[1][0], endCluster, a) for a in endEdges}
+
+        # A* on the abstract graph
+        endX, endY = end
+        nodeEdges = self._nodeEdges
+        gScores, previous, hScores = {startIndex: 0}, {startIndex: -1}, {}
+        closed = set()
+        openHeap, order, expanded = [(0, 0, 0, startIndex)], count(1), 0
+        pushed, peakOpen, reopened = 1, 1, 0
+
+        while openHeap:
+            _, _, _, cur = heappop(openHeap)
+            if cur in closed:
+                continue
+
+            closed.add(cur)
+            expanded += 1
+            if onEvent:
+                onEvent((SEARCHED, *grid.coords(cur)))
+
+            if cur == endIndex:
+                break
+
+            edges = nodeEdges.get(cur)
+            if edges is None:
+                edges = self._edges(self.clusterOf(*grid.coords(cur))).get(cur, [])
+            if cur == startIndex:
+                edges = fromStart + edges
+            if cur in toEnd:
+                edges = edges + [(endIndex, toEnd[cur])]
+
+            curG = gScores[cur]
+            for node, cost in edges:
+                g = curG + cost
+                if node in closed or g >= gScores.get(node, INF):
+                    continue
+
+                h = hScores.get(node)
+                if h is None:
+                    x, y = grid.coords(node)
+                    h = hScores[node] = heuristic(x, y, endX, endY)
+                    if onEvent:
+                        onEvent((IN_LIST, x, y))
+                else:
+                    reopened += 1
+
+                gScores[node] = g
+                previous[node] = cur
+                heappush(openHeap, (round(g + h, 3), h, next(order), node))
+                pushed += 1
+
+            if len(openHeap) > peakOpen:
+                peakOpen = len(openHeap)
+
+        if endIndex not in closed:
+            return SearchResult(None, expanded, pushed, peakOpen, reopened)
+
+        abstractPath = [endIndex]
+        while abstractPath[-1] != startIndex:
+            abstractPath.append(previous[abstractPath[-1]])
+        abstractPath.reverse()
+
+        path = self._refine([grid.coords(node) for node in abstractPath])
+        if onEvent:
+            for x, y in path:
+                onEvent((IN_PATH, x, y))
+
+        return SearchResult(path, expanded, pushed, peakOpen, reopened)
+
+    def _refine(self, points):
+        """
+        Fills in the cells between consecutive points of a path through the abstract graph. Points in different
+        clusters are next to each other, others are joined with the shortest path that stays in their cluster
+        """
+
+        path = [points[0]]
+        grids = {}  # Grids of the clusters searched so far, by cluster
+
+        for (ax, ay), (bx, by) in zip(points, points[1:]):
+            cluster = self.clusterOf(ax, ay)
+            if cluster != self.clusterOf(bx, by):
+                path.append((bx, by))
+                continue
+
+            top, left, bottom, right = self._bounds(*cluster)
+            if cluster not in grids:
+                grids[cluster] = Grid.fromWalls(self.grid.wallView()[top:bottom, left:right],
+                                                self.grid.weightView()[top:bottom, left:right])
+                grids[cluster].diagonals = self.grid.diagonals
+
+            local = aStar(grids[cluster], (ax - top, ay - left), (bx - top, by - left),
+                          HEURISTICS[defaultHeuristic(self.grid.diagonals)])
+            path.extend((x + top, y + left) for x, y in local.path[1:])
+
+        return path
+
+
+def plannerOf(grid):
+    """
+    Returns the HPAStar planner of the grid, made the first time and kept in grid.derived
+    """
+
+    planner = grid.derived.get('hpa')
+    if planner is None:
+        planner = grid.derived['hpa'] = HPAStar(grid)
+    return planner
+
+
+def prepareHpaStar(grid, start, end, onProgress=None):
+    """
+    Builds the clusters around start and end, which a search from start to end builds before it expands any node.
+    Those it builds later, as it reaches them, are built between the nodes it expands
+    """
+
+    planner = plannerOf(grid)
+    for point in (start, end):
+        if point in grid:
+            planner._buildBlock(*planner.clusterOf(*point), onProgress)
+
+
+@register('HPA*', heuristics=['Manhattan', 'Euclidean', 'Octile', 'Chebyshev'], prepare=prepareHpaStar)
+def hpaStar(grid, start, end, heuristic, onEvent=None):
+    """
+    Runs Hierarchical Pathfinding A* with the HPAStar planner of the grid (see plannerOf()), so that the clusters it
+    built are reused by later searches. The path found is close to the shortest one but not always the shortest.
+    The arguments and result are the same as aStar's
+    """
+    return plannerOf(grid).findPath(start, end, heuristic, onEvent)
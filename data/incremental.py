@@ -0,0 +1,318 @@
+from heapq import heappush, heappop
+from itertools import count
+from time import perf_counter
+
+import numpy as np
+
+from data.algorithms import SearchResult, register, defaultHeuristic, pathCost, SEARCHED, IN_LIST, IN_PATH, INF, \
+    HEURISTICS
+
+
+class DStarLite:
+    """
+    Plans the shortest path between two points of a grid and keeps its search state between plans, so that after
+    walls change or the start moves, only the part of the search affected by the change is redone (D* Lite, by
+    Koenig and Likhachev).
+
+    The search goes backwards, from the end towards the start, and keeps for every cell its distance to the end (g)
+    and a one-step lookahead of it (rhs). A cell whose two values differ is inconsistent and on the open list. A wall
+    edit only makes the cells around it inconsistent, and plan() repairs them and whatever depends on them.
+    Moving the start is cheap, while moving the end or changing the neighbors starts over on the next plan.
+
+    The planner listens to the grid, so walls and weights changed through setWall() and setWeight() are picked up by
+    the next plan. Call updateCells() after writing to the walls or weights directly, and close() once the planner
+    isn't needed anymore.
+    The heuristic must be admissible for the grid's neighbors. By default the tightest one is used, which follows the
+    neighbors as they change
+    """
+
+    def __init__(self, grid, start, end, heuristic=None):
+        self.grid = grid
+        self.start = start
+        self.end = end
+        self.heuristic = heuristic
+
+        self._changed = set()  # Indices of cells whose wall or weight changed since the last plan
+        self._stale = True  # Whether the search has to start over on the next plan
+        self._pushed = self._peakOpen = self._reopened = 0  # Counted for the SearchResult of each plan
+
+        grid.addListener(self)
+
+    def close(self):
+        """
+        Stops listening to the grid
+        """
+        self.grid.removeListener(self)
+
+    @property
+    def stale(self):
+        """
+        Whether the next plan starts the search over, which takes as long as a search, rather than repairing it
+        """
+        return self._stale
+
+    def moveStart(self, start):
+        """
+        Sets the point the path goes from. The search is kept
+        """
+        self.start = start
+
+    def moveEnd(self, end):
+        """
+        Sets the point the path goes to. The search goes towards the end, so it starts over on the next plan
+        """
+
+        self.end = end
+        self._stale = True
+
+    def setHeuristic(self, heuristic):
+        self.heuristic = heuristic
+        self._stale = True
+
+    def updateCells(self, cells):
+        """
+        Tells the planner that the walls or weights of the given (x, y) cells may have changed
+        """
+        self._changed.update(self.grid.index(x, y) for x, y in cells)
+
+    def plan(self, onEvent=None):
+        """
+        Brings the search up to date with everything that changed since the last plan, and returns a SearchResult
+        with the shortest path from start to end. Only the nodes expanded by this plan are counted and reported.
+        onEvent is called like the algorithms' onEvent, see aStar(). If it raises, e.g. to cancel the plan, the search
+        is left half done and starts over on the next plan
+        """
+
+        startTime = perf_counter()
+        self._pushed = self._reopened = 0
+        self._peakOpen = len(self._heap) if not self._stale else 0
+
+        try:
+            if self._stale:
+                self._reset()
+            else:
+                # The keys of the open list were made with distances to the last start. Rather than recomputing them,
+                #  every new key is raised by how far the start moved, which keeps them in the same order
+                if self.start != self._last:
+                    self.km += self._heuristic(*self._last, *self.start)
+                    self._last = self.start
+
+                endIndex = self.grid.index(*self.end)
+                changed, self._changed = self._changed, set()
+                for cell in changed:
+                    for node in [cell] + [cell + offset for offset, _ in self._steps]:
+                        if node != endIndex:
+                            self._rhs[node] = self._lookahead(node)
+                            self._update(node, onEvent)
+
+            expanded = self._computeShortestPath(onEvent)
+            path = self._extractPath(onEvent)
+        except BaseException:
+            self._stale = True
+            raise
+
+        result = SearchResult(path, expanded, self._pushed, self._peakOpen, self._reopened)
+        result.time = perf_counter() - startTime
+        result.cost = pathCost(result.path, self.grid)
+        return result
+
+    # -- Grid listener --
+
+    def wallChanged(self, x, y, wall: bool):
+        self._changed.add(self.grid.index(x, y))
+
+    def weightChanged(self, x, y, weight: int, oldWeight: int):
+        # The costs of the steps to and from the cell changed, which is repaired like a wall edit
+        self._changed.add(self.grid.index(x, y))
+
+    def gridChanged(self):
+        self._stale = True
+
+    # -- Search --
+
+    def _reset(self):
+        """
+        Forgets the search, leaving only the end on the open list
+        """
+
+        grid = self.grid
+        self._heuristic = self.heuristic or HEURISTICS[defaultHeuristic(grid.diagonals)]
+        # A step costs its length times the mean weight of its two cells, i.e. half its length times their sum
+        self._steps = [(offset, length / 2) for offset, length in grid.neighborSteps()]
+        self._walls, self._weights = memoryview(grid.walls), memoryview(grid.weights)
+        self._g = memoryview(np.full(grid.size, INF))
+        self._rhs = memoryview(np.full(grid.size, INF))
+
+        # Binary heap of (key, order, index), with lazy deletion. A node is on the open list if it has a key in
+        #  _openKeys, heap entries with another key are left over from before it was last updated
+        self._heap = []
+        self._openKeys = {}
+        self._order = count()
+
+        self.km = 0  # How much the keys are raised by, from moving the start
+        self._last = self.start  # The start when the last plan was made
+
+        self._changed.clear()
+        self._stale = False
+
+        endIndex = grid.index(*self.end)
+        self._rhs[endIndex] = 0
+        self._update(endIndex, None)
+
+    def _key(self, node):
+        # Nodes are expanded lowest key first. It's the f of A*, with the best of g and rhs as g, then that g.
+        #  f is rounded so that sums of diagonal costs that should be equal are, as the search stops on a tie with
+        #  the start's key
+        distance = min(self._g[node], self._rhs[node])
+        x, y = self.grid.coords(node)
+        return round(distance + self._heuristic(x, y, *self.start) + self.km, 9), distance
+
+    def _lookahead(self, node):
+        """
+        Returns the rhs of node: the cost of its best path to the end through any of its neighbors
+        """
+
+        walls, weights, g = self._walls, self._weights, self._g
+        if walls[node]:
+            return INF
+
+        best, weight = INF, weights[node]
+        for offset, halfLength in self._steps:
+            neighbor = node + offset
+            if not walls[neighbor]:
+                distance = halfLength * (weight + weights[neighbor]) + g[neighbor]
+                if distance < best:
+                    best = distance
+        return best
+
+    def _update(self, node, onEvent):
+        """
+        Puts node on the open list with its current key if it is inconsistent, and takes it off otherwise
+        """
+
+        if self._g[node] == self._rhs[node]:
+            self._openKeys.pop(node, None)
+            return
+
+        key = self._key(node)
+        if node in self._openKeys:
+            self._reopened += 1
+        elif onEvent:
+            onEvent((IN_LIST, *self.grid.coords(node)))
+
+        self._openKeys[node] = key
+        heappush(self._heap, (key, next(self._order), node))
+        self._pushed += 1
+
+    def _computeShortestPath(self, onEvent):
+        """
+        Expands inconsistent nodes until the start's distance to the end is known. Returns the number expanded
+        """
+
+        grid, heap, openKeys = self.grid, self._heap, self._openKeys
+        walls, weights, g, rhs, steps = self._walls, self._weights, self._g, self._rhs, self._steps
+        startIndex, endIndex = grid.index(*self.start), grid.index(*self.end)
+        expanded = 0
+
+        while heap:
+            key, _, node = heap[0]
+            if openKeys.get(node) != key:
+                heappop(heap)
+                continue
+
+            if key >= self._key(startIndex) and rhs[startIndex] <= g[startIndex]:
+                break
+
+            # The key was made for an older start, put the node back with an up to date one
+            newKey = self._key(node)
+            if key < newKey:
+                heappop(heap)
+                openKeys[node] = newKey
+                heappush(heap, (newKey, next(self._order), node))
+                self._pushed += 1
+                continue
+
+            heappop(heap)
+            del openKeys[node]
+            expanded += 1
+            if onEvent:
+                onEvent((SEARCHED, *grid.coords(node)))
+
+            weight = weights[node]
+            if g[node] > rhs[node]:
+                # Its distance went down: neighbors may now have a shorter path through it
+                g[node] = rhs[node]
+                for offset, halfLength in steps:
+                    neighbor = node + offset
+                    if walls[neighbor] or neighbor == endIndex:
+                        continue
+
+                    distance = halfLength * (weights[neighbor] + weight) + g[node]
+                    if distance < rhs[neighbor]:
+                        rhs[neighbor] = distance
+                        self._update(neighbor, onEvent)
+            else:
+                # Its distance went up: it and the neighbors whose best path went through it need a new lookahead.
+                #  The cost is computed the same way as in _lookahead(), so that equal distances compare equal
+                oldG, g[node] = g[node], INF
+                for offset, halfLength in steps:
+                    neighbor = node + offset
+                    if walls[neighbor] or neighbor == endIndex:
+                        continue
+
+                    if rhs[neighbor] == halfLength * (weights[neighbor] + weight) + oldG:
+                        rhs[neighbor] = self._lookahead(neighbor)
+                        self._update(neighbor, onEvent)
+
+                if node != endIndex:
+                    rhs[node] = self._lookahead(node)
+                self._update(node, onEvent)
+
+            if len(heap) > self._peakOpen:
+                self._peakOpen = len(heap)
+
+        return expanded
+
+    def _extractPath(self, onEvent):
+        """
+        Follows the neighbors closest to the end from the start. Returns the path as a list of (x, y) tuples, or None
+        if the end can't be reached
+        """
+
+        grid, walls, weights, g = self.grid, self._walls, self._weights, self._g
+        cur, endIndex = grid.index(*self.start), grid.index(*self.end)
+
+        # The search stops as soon as the start's lookahead is known, its own distance may not be set yet
+        if self._rhs[cur] == INF:
+            return None
+
+        path = [self.start]
+        while cur != endIndex:
+            best, cur = min((halfLength * (weights[cur] + weights[cur + offset]) + g[cur + offset], cur + offset)
+                            for offset, halfLength in self._steps if not walls[cur + offset])
+
+            # Distances that don't lead to the end mean the search isn't consistent, which shouldn't happen
+            if best == INF or len(path) > grid.size:
+                return None
+
+            path.append(grid.coords(cur))
+
+        if onEvent:
+            for x, y in path:
+                onEvent((IN_PATH, x, y))
+
+        return path
+
+
+@register('D* Lite', heuristics=['Manhattan', 'Euclidean', 'Octile', 'Chebyshev'])
+def dStarLite(grid, start, end, heuristic, onEvent=None):
+    """
+    Plans once with a DStarLite planner, which searches from the end towards the start. Use the planner itself to
+    replan after changes. The arguments and result are the same as aStar's
+    """
+
+    planner = DStarLite(grid, start, end, heuristic)
+    try:
+        return planner.plan(onEvent)
+    finally:
+        planner.close()
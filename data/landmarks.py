@@ -0,0 +1,212 @@
+from math import isclose
+
+import numpy as np
+
+from data.algorithms import register, aStar, INF
+from data.fields import distanceField
+
+
+LANDMARK_COUNT = 8  # Landmarks of a grid, by default. Each takes a table of 8 bytes per cell
+ACTIVE_LANDMARKS = 4  # Landmarks a search uses, those that give the best bound from its start
+
+
+class Landmarks:
+    """
+    The distances from a few landmark cells to every cell of the grid, which give a lower bound of the cost between
+    any two cells: going from a to b can't cost less than |d(L, a) - d(L, b)| for any landmark L, or the path through
+    a would be a shortcut to b. A* with that bound (ALT, by Goldberg and Harrelson) expands far fewer nodes than with
+    a geometric heuristic on grids full of walls, such as mazes.
+
+    Landmarks are picked by farthest-point selection: each one is the open cell farthest from those picked so far, so
+    they end up spread around the edges of the grid, and in every region that can't reach the others.
+    Tables are made the first time they are needed and kept until an edit reaches them. The landmarks listen to the
+    grid: a wall or weight changed through setWall() or setWeight() only updates the distance of its own cell,
+    unless the distances of other cells change too, in which case only the tables of the landmarks they come from
+    are made again, at the next search. Any other change drops every table
+    """
+
+    def __init__(self, grid, count: int = LANDMARK_COUNT):
+        self.grid = grid
+        self.count = count  # Bounds the memory taken, count tables of 8 bytes per cell
+
+        self.points = []  # (x, y) of the landmarks
+        self.tables = []  # Distance from each landmark to every cell, laid out like grid.walls, None when out of date
+
+        grid.addListener(self)
+
+    @classmethod
+    def fromTables(cls, grid, points, tables):
+        """
+        Makes the landmarks of a grid from tables made before, e.g. saved with the grid, which are used as they are
+        """
+
+        landmarks = cls(grid, len(points))
+        landmarks.points = [tuple(point) for point in points]
+        landmarks.tables = list(tables)
+        return landmarks
+
+    def close(self):
+        """
+        Stops listening to the grid
+        """
+        self.grid.removeListener(self)
+
+    # -- Grid listener --
+
+    def wallChanged(self, x, y, wall: bool):
+        self._cellChanged(x, y, int(self.grid.weights[self.grid.index(x, y)]))
+
+    def weightChanged(self, x, y, weight: int, oldWeight: int):
+        self._cellChanged(x, y, oldWeight)
+
+    def gridChanged(self):
+        # The landmarks are kept if they are still open cells of the grid, see update()
+        self.tables = [None] * len(self.points)
+
+    def _cellChanged(self, x, y, oldWeight):
+        index = self.grid.index(x, y)
+        for i, (point, table) in enumerate(zip(self.points, self.tables)):
+            if table is not None and not self._repair(table, index, self.grid.index(*point), oldWeight):
+                self.tables[i] = None
+
+    def _repair(self, table, index, landmark, oldWeight):
+        """
+        Updates a table after the cell at index changed, when only the cell's own distance changes. Returns False
+        when the distance of a neighbor changes too, either because its shortest path went through the cell and now
+        costs more, or because going through the cell is now shorter. The table then has to be made again
+        """
+
+        walls, weights = memoryview(self.grid.walls), memoryview(self.grid.weights)
+        steps = [(index + offset, length / 2) for offset, length in self.grid.neighborSteps()]
+        weight, old = weights[index], table[index]
+
+        if walls[index]:
+            new = INF
+        elif index == landmark:
+            new = 0
+        else:
+            new = min((table[n] + halfLength * (weight + weights[n]) for n, halfLength in steps if not walls[n]),
+                      default=INF)
+
+        for n, halfLength in steps:
+            if walls[n]:
+                continue
+
+            before = old + halfLength * (oldWeight + weights[n])
+            after = new + halfLength * (weight + weights[n])
+            if after < table[n] and not isclose(after, table[n]):
+                return False
+            if isclose(before, table[n]) and after > table[n] and not isclose(after, table[n]):
+                return False
+
+        table[index] = new
+        return True
+
+    # -- Tables --
+
+    def update(self, onProgress=None):
+        """
+        Makes the tables that are out of date, and picks new landmarks for those that are no longer open cells until
+        there are count of them, or every open cell is one. onProgress, if given, is passed to distanceField() and can
+        raise to stop: the tables made until then are kept, the others are made at the next update
+        """
+
+        grid = self.grid
+        for i in reversed(range(len(self.points))):
+            point = self.points[i]
+            if i >= self.count or point not in grid or grid.walls[grid.index(*point)]:
+                del self.points[i], self.tables[i]
+
+        for i, table in enumerate(self.tables):
+            if table is None:
+                self.tables[i] = distanceField(grid, self.points[i], onProgress=onProgress)
+
+        # Distance from every cell to its closest landmark, -1 where no landmark may go
+        nearest = np.where(grid.walls, -1, np.min(self.tables, axis=0) if self.tables else INF)
+
+        while len(self.points) < self.count:
+            point = self._farthest(nearest, onProgress)
+            if point is None:
+                break
+
+            table = distanceField(grid, point, onProgress=onProgress)
+            self.points.append(point)
+            self.tables.append(table)
+            np.minimum(nearest, table, out=nearest, where=nearest >= 0)
+
+    def _farthest(self, nearest, onProgress=None):
+        """
+        Returns the (x, y) of the open cell farthest from every landmark, given their distances to each cell, or None
+        if every open cell is a landmark. onProgress is passed to distanceField()
+        """
+
+        if self.points:
+            index = int(np.argmax(nearest))
+            return self.grid.coords(index) if nearest[index] > 0 else None
+
+        # The first landmark is the cell farthest from any open cell, which is at one end of the grid
+        opened = np.flatnonzero(nearest >= 0)
+        if not opened.size:
+            return None
+
+        distances = distanceField(self.grid, self.grid.coords(opened[0]), onProgress=onProgress)
+        return self.grid.coords(int(np.argmax(np.where(distances < INF, distances, -1))))
+
+    def heuristic(self, start, end, base, active: int = ACTIVE_LANDMARKS):
+        """
+        Returns a heuristic for searches from start to end, which is the largest of the base heuristic, if any, and
+        the bounds given by the active landmarks that give the best bound at the start. More landmarks give a better
+        bound, but take longer to evaluate. Makes the tables that are out of date first. The result is admissible if
+        base is
+        """
+
+        self.update()
+
+        startIndex, endIndex = self.grid.index(*start), self.grid.index(*end)
+        stride = self.grid.stride
+
+        # Landmarks that can't reach the end give no bound
+        tables = [(memoryview(table), float(table[endIndex])) for table in self.tables if table[endIndex] < INF]
+        tables.sort(key=lambda pair: abs(pair[0][startIndex] - pair[1]), reverse=True)
+        tables = tables[:active]
+
+        def bound(x, y, endX, endY):
+            h = base(x, y, endX, endY) if base else 0
+            index = (x + 1) * stride + y + 1
+            for table, toEnd in tables:
+                difference = table[index] - toEnd
+                if difference > h:
+                    h = difference
+                elif -difference > h:
+                    h = -difference
+            return h
+
+        return bound
+
+
+def landmarksOf(grid):
+    """
+    Returns the Landmarks of the grid, made the first time and kept in grid.derived
+    """
+
+    landmarks = grid.derived.get('landmarks')
+    if landmarks is None:
+        landmarks = grid.derived['landmarks'] = Landmarks(grid)
+    return landmarks
+
+
+def prepareAlt(grid, start, end, onProgress=None):
+    """
+    Makes the tables of the grid's landmarks that are out of date, which ALT would make before searching
+    """
+    landmarksOf(grid).update(onProgress)
+
+
+@register('ALT', heuristics=['Manhattan', 'Euclidean', 'Octile', 'Chebyshev'], prepare=prepareAlt)
+def alt(grid, start, end, heuristic, onEvent=None):
+    """
+    Runs A* with the bounds of the grid's landmarks (see Landmarks) as its heuristic, along with the given one. The
+    first search makes the landmarks' tables, which takes about as long as a few Dijkstra searches of the whole grid,
+    and later ones reuse them. The arguments and result are the same as aStar's
+    """
+    return aStar(grid, start, end, landmarksOf(grid).heuristic(start, end, heuristic), onEvent)
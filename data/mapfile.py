@@ -0,0 +1,203 @@
+from mmap import mmap, ACCESS_COPY
+import struct
+
+import numpy as np
+
+from data.grid import Grid
+from data.landmarks import Landmarks
+
+
+# Grids are saved as a fixed header followed by the walls, either bit-packed (one bit per cell) or raw (one byte per
+#  cell, border included, exactly as Grid keeps them). Raw files are bigger, but can be memory-mapped and searched in
+#  place without reading or copying them. Weighted grids then have a byte per cell for the weights, without the border
+#  when packed and with it when raw. Grids saved with their landmarks end with the number of landmarks, their x, y,
+#  and their distance tables (see data.landmarks), as doubles laid out like raw walls and aligned to 8 bytes
+MAGIC = b'PFVG'
+VERSION = 1
+
+# Magic, version, flags, then rows, cols and the x, y of the start and end (-1 when not set). 32 bytes
+HEADER = struct.Struct('<4sBBxxIIiiii')
+
+# Flags
+DIAGONALS = 1  # Diagonal cells are neighbors
+PACKED = 2  # The walls are bit-packed, without the border
+WEIGHTS = 4  # The weights follow the walls
+LANDMARKS = 8  # The landmarks follow the walls and weights
+
+# Characters of the maps of the MovingAI benchmarks (https://movingai.com/benchmarks/) that can't be walked on: out of
+#  bounds, trees and water
+MOVINGAI_WALLS = b'@OTW'
+
+
+def saveGrid(grid, path, packed=True, landmarks=True):
+    """
+    Saves the walls, weights, size, start, end and neighbors of a grid to a binary file. Unless packed, the walls and
+    weights are saved raw so that loadGrid() can map them. Weights are only saved if the grid is weighted.
+    If landmarks and the grid has landmarks in grid.derived, they are saved too, after making the tables that are out
+    of date, so searches of the loaded grid don't have to make them again
+    """
+
+    start = grid.start if grid.start is not None else (-1, -1)
+    end = grid.end if grid.end is not None else (-1, -1)
+    weighted = grid.weighted
+    gridLandmarks = grid.derived.get('landmarks') if landmarks else None
+    flags = (DIAGONALS if grid.diagonals else 0) | (PACKED if packed else 0) | (WEIGHTS if weighted else 0) | \
+            (LANDMARKS if gridLandmarks is not None else 0)
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, flags, grid.rows, grid.cols, *start, *end))
+        file.write(np.packbits(grid.wallView()).tobytes() if packed else grid.walls.tobytes())
+        if weighted:
+            file.write(grid.weightView().tobytes() if packed else grid.weights.tobytes())
+
+        if gridLandmarks is not None:
+            gridLandmarks.update()
+            file.write(struct.pack('<I', len(gridLandmarks.points)))
+            file.write(np.array(gridLandmarks.points, dtype='<i4').reshape(-1, 2).tobytes())
+            file.write(bytes(-file.tell() % 8))
+            for table in gridLandmarks.tables:
+                file.write(table.astype('<f8').tobytes())
+
+
+def loadGrid(path, mapped=False):
+    """
+    Loads a grid saved by saveGrid(), or a MovingAI map if the file ends in .map.
+    If mapped, the file is memory-mapped instead of read. The walls of a raw file are then used from the mapping
+    as they are, copy on write: pages are only read from disk as cells are looked at, changes to the walls don't
+    reach the file, and the grid can't be resized. The same goes for the weights. Packed files are unpacked straight
+    from the mapping. Landmarks saved with the grid are put in grid.derived, with their tables mapped too if mapped.
+    Raises ValueError if the file isn't a valid grid
+    """
+
+    if str(path).lower().endswith('.map'):
+        return loadMovingAI(path)
+
+    with open(path, 'rb') as file:
+        if mapped:
+            data = mmap(file.fileno(), 0, access=ACCESS_COPY)
+        else:
+            data = file.read()
+
+    if len(data) < HEADER.size:
+        raise ValueError(f'{path} is too short to be a grid')
+
+    magic, version, flags, rows, cols, *points = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'{path} is not a grid file')
+
+    weighted = bool(flags & WEIGHTS)
+    if flags & PACKED:
+        size = rows * cols
+        packedSize = (size + 7) // 8
+        offset = HEADER.size + packedSize + (size if weighted else 0)  # End of the walls and weights
+        if len(data) < offset:
+            raise ValueError(f'{path} is truncated')
+
+        bits = np.frombuffer(data, dtype=np.uint8, count=packedSize, offset=HEADER.size)
+        grid = Grid(rows, cols)
+        grid.wallView()[:] = np.unpackbits(bits, count=size).reshape(rows, cols)
+        if weighted:
+            weights = np.frombuffer(data, dtype=np.uint8, count=size, offset=HEADER.size + packedSize)
+            grid.weightView()[:] = weights.reshape(rows, cols)
+    else:
+        size = (rows + 2) * (cols + 2)
+        offset = HEADER.size + size * (2 if weighted else 1)
+        if len(data) < offset:
+            raise ValueError(f'{path} is truncated')
+
+        if mapped:
+            view = memoryview(data)
+            weights = view[HEADER.size + size:HEADER.size + 2 * size] if weighted else None
+            grid = Grid.fromBuffer(rows, cols, view[HEADER.size:HEADER.size + size], weights)
+        else:
+            grid = Grid(rows, cols)
+            grid.walls[:] = np.frombuffer(data, dtype=bool, count=size, offset=HEADER.size)
+            if weighted:
+                grid.weights[:] = np.frombuffer(data, dtype=np.uint8, count=size, offset=HEADER.size + size)
+
+        # The searches rely on the border being walls
+        border = grid.walls.reshape(rows + 2, cols + 2)
+        if not (border[0].all() and border[-1].all() and border[:, 0].all() and border[:, -1].all()):
+            raise ValueError(f'{path} has cells outside of the grid that are not walls')
+
+    grid.diagonals = bool(flags & DIAGONALS)
+    if flags & LANDMARKS:
+        grid.derived['landmarks'] = _loadLandmarks(grid, data, offset, copy=not mapped, path=path)
+
+    startX, startY, endX, endY = points
+    grid.start = (startX, startY) if (startX, startY) in grid else None
+    grid.end = (endX, endY) if (endX, endY) in grid else None
+    return grid
+
+
+def _loadLandmarks(grid, data, offset, copy, path):
+    """
+    Reads the landmarks saved from offset on in the data of a grid file. Their tables are used from the data as they
+    are unless copy
+    """
+
+    if len(data) < offset + 4:
+        raise ValueError(f'{path} is truncated')
+    count, = struct.unpack_from('<I', data, offset)
+
+    points = np.frombuffer(data, dtype='<i4', count=2 * count, offset=offset + 4).reshape(-1, 2)
+    offset += 4 + points.nbytes
+    offset += -offset % 8
+    if len(data) < offset + count * grid.size * 8:
+        raise ValueError(f'{path} is truncated')
+
+    tables = [np.frombuffer(data, dtype='<f8', count=grid.size, offset=offset + i * grid.size * 8)
+              for i in range(count)]
+    return Landmarks.fromTables(grid, points.tolist(), [table.copy() for table in tables] if copy else tables)
+
+
+def loadMovingAI(path):
+    """
+    Loads a map in the format of the MovingAI benchmarks. Out of bounds cells, trees and water become walls, every
+    other terrain is open. The map has no start or end, see loadScenarios()
+    """
+
+    with open(path, 'rb') as file:
+        lines = file.read().splitlines()
+
+    header = {}
+    for i, line in enumerate(lines):
+        if line.strip().lower() == b'map':
+            break
+        key, _, value = line.decode().partition(' ')
+        header[key.lower()] = value.strip()
+    else:
+        raise ValueError(f'{path} is not a MovingAI map')
+
+    try:
+        rows, cols = int(header['height']), int(header['width'])
+    except (KeyError, ValueError):
+        raise ValueError(f'{path} has no valid height and width') from None
+
+    rowLines = [line[:cols] for line in lines[i + 1:i + 1 + rows]]
+    if len(rowLines) < rows or any(len(line) < cols for line in rowLines):
+        raise ValueError(f'{path} is smaller than its height and width')
+
+    cells = np.frombuffer(b''.join(rowLines), dtype=np.uint8).reshape(rows, cols)
+    return Grid.fromWalls(np.isin(cells, np.frombuffer(MOVINGAI_WALLS, dtype=np.uint8)))
+
+
+def loadScenarios(path):
+    """
+    Loads the queries of a MovingAI scenario file, as a list of (start, end, optimal length), where start and end are
+    (x, y) of the grid. The optimal lengths are the file's, found without cutting corners, so diagonal paths of this
+    grid can be shorter
+    """
+
+    scenarios = []
+    with open(path) as file:
+        for line in file:
+            fields = line.split('\t') if '\t' in line else line.split()
+            if len(fields) < 9 or fields[0].lower() == 'version':
+                continue
+
+            # Their x is the column and y the row, the other way around from the grid's
+            startCol, startRow, endCol, endRow = map(int, fields[4:8])
+            scenarios.append(((startRow, startCol), (endRow, endCol), float(fields[8])))
+
+    return scenarios
@@ -1,76 +1,39 @@
-from gui.cell import Cell
-
-
 class Node:
     """
-    The data representation of a node
+    A view of a single cell of a Grid, used by the GUI. All of the cell's data lives in the grid's arrays
     """
 
-    GRID = []
+    __slots__ = ('grid', 'x', 'y')
 
-    def __init__(self, x, y, previous=None):
+    def __init__(self, grid, x, y):
+        self.grid = grid
         self.x = x
         self.y = y
-        self.previous = previous
-        self.neighbors = []  # Gets populated once grid is fully populated too
-        self.isStart = self.isEnd = False
-        self.numTurns = 0  # Helps avoid unnecessary diagonals in some algorithms
-
-        # For A*
-        self.f = self.g = self.h = None
-
-        # Add to array
-        if len(Node.GRID) - 1 < x:
-            Node.GRID.append([])
-        Node.GRID[x].append(self)
-
-        self.wall = False  # Whether or not this node is a wall
-        self.cell = None  # The Cell tied to this Node
-
-    def setCell(self, cell):
-        self.cell = cell
-
-    def inPath(self):
-        # A pass-through to cell's inPath method
-        self.cell.inPath()
-
-    def inList(self):
-        self.cell.draw(Cell.IN_LIST)
-
-    def searched(self):
-        # A pass-through to cell's searched method
-        self.cell.searched()
-
-    def populateNeighbors(self, withDiagonals: bool):
-        """
-        Populates the neighbors variable with this node's neighbors.
-        """
-        self.neighbors = []
-
-        relativePositions = [(0, -1), (0, 1), (-1, 0), (1, 0)]  # The 4 Nodes directly adjacent to self
-
-        if withDiagonals:
-            relativePositions += [(-1, -1), (-1, 1), (1, -1), (1, 1)]  # The 4 diagonal Nodes
 
-        for relPos in relativePositions:
+    @property
+    def wall(self):
+        # Whether or not this node is a wall
+        return bool(self.grid.walls[self.grid.index(self.x, self.y)])
 
-            row = self.x + relPos[0]
-            col = self.y + relPos[1]
+    @wall.setter
+    def wall(self, wall: bool):
+        self.grid.setWall(self.x, self.y, wall)
 
-            # Check boundaries
-            if 0 <= row < len(Node.GRID) and 0 <= col < len(Node.GRID[0]):
-                self.neighbors.append(Node.GRID[row][col])
+    @property
+    def weight(self):
+        return int(self.grid.weights[self.grid.index(self.x, self.y)])
 
-    def isAdjacentTo(self, node):
-        """
-        Returns true if nodes are adjacent, otherwise false
-        """
+    @weight.setter
+    def weight(self, weight: int):
+        self.grid.setWeight(self.x, self.y, weight)
 
-        if node not in self.neighbors:
-            return False
+    @property
+    def isStart(self):
+        return self.grid.start == (self.x, self.y)
 
-        return (self.x == node.x and self.y == node.y + 1) or (self.x == node.x and self.y == node.y - 1) or \
-            (self.x == node.x + 1 and self.y == node.y) or (self.x == node.x - 1 and self.y == node.y)
+    @property
+    def isEnd(self):
+        return self.grid.end == (self.x, self.y)
 
     def __repr__(self):
         # Used for printing the node when debugging
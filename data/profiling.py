@@ -0,0 +1,41 @@
+from cProfile import Profile
+from io import StringIO
+import pstats
+import tracemalloc
+
+
+def profileSearch(algorithm, grid, start, end, heuristic, onEvent=None, cpu=True, memory=True, limit=25):
+    """
+    Runs a registered algorithm like it is normally called, while profiling it.
+    With cpu, the run is profiled with cProfile, and the limit functions it spent the most time in, counting the
+    functions they call, are reported in the result's profile as text. Only the calling thread is profiled.
+    With memory, the peak of the memory allocated while it ran is traced with tracemalloc and set as the result's
+    peakMemory, in bytes. If memory was already being traced, it's the peak since it was last reset.
+    Both slow the search down, its time is measured with them
+    """
+
+    tracing = memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+
+    profiler = Profile() if cpu else None
+    if profiler:
+        profiler.enable()
+
+    try:
+        result = algorithm(grid, start, end, heuristic, onEvent)
+    finally:
+        if profiler:
+            profiler.disable()
+
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+        if tracing:
+            tracemalloc.stop()
+
+    if profiler:
+        report = StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        result.profile = report.getvalue()
+
+    result.peakMemory = peak
+    return result
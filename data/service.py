@@ -0,0 +1,383 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from collections import OrderedDict
+import multiprocessing
+import asyncio
+import json
+import os
+
+import numpy as np
+
+from data.grid import Grid
+from data.generators import GENERATORS
+from data.mapfile import loadGrid
+import data.algorithms as algs
+
+
+CHUNK_SIZE = 16  # Queries of a batch sent to a worker at once
+MAX_LINE = 2 ** 24  # Longest request, in bytes
+MAX_WORKER_GRIDS = 8  # Grids a worker process keeps attached, the least recently used is dropped after that
+
+
+# The grids each worker process attached to so far, by the name of their shared memory, as (memory, grid), least
+#  recently used first
+_workerGrids = OrderedDict()
+
+
+def _attach(memoryName, rows, cols, diagonals):
+    """
+    Returns the worker's grid in the named shared memory, which holds the walls then the weights
+    """
+
+    if memoryName in _workerGrids:
+        _workerGrids.move_to_end(memoryName)
+        return _workerGrids[memoryName][1]
+
+    memory = SharedMemory(name=memoryName)
+    size = (rows + 2) * (cols + 2)
+    grid = Grid.fromBuffer(rows, cols, memory.buf[:size], memory.buf[size:2 * size])
+    grid.diagonals = diagonals
+    _workerGrids[memoryName] = (memory, grid)
+
+    while len(_workerGrids) > MAX_WORKER_GRIDS:
+        memory, grid = _workerGrids.popitem(last=False)[1]
+        for derived in grid.derived.values():
+            if hasattr(derived, 'close'):
+                derived.close()
+        del grid
+        try:
+            memory.close()
+        except BufferError:
+            pass  # Something still uses the grid, the memory is closed once it's collected
+
+    return _workerGrids[memoryName][1]
+
+
+def _solveChunk(shape, queries, algorithmName, heuristicName):
+    """
+    Solves a list of (start, end) queries on the grid of shape, the (memory name, rows, cols, diagonals) of a
+    SharedGrid, returning a list of SearchResults
+    """
+
+    grid = _attach(*shape)
+    algorithm = algs.ALGORITHMS[algorithmName]['algorithm']
+    heuristic = algs.HEURISTICS.get(heuristicName)
+    return [algorithm(grid, start, end, heuristic) for start, end in queries]
+
+
+class SharedGrid:
+    """
+    A grid of the service, copied into shared memory that the worker processes read from. The service never changes
+    it, loading a grid under the same name makes a new one. Once retired, the memory is freed as soon as no chunk of
+    queries is being solved on it
+    """
+
+    def __init__(self, grid):
+        self.rows, self.cols, self.diagonals = grid.rows, grid.cols, grid.diagonals
+        self.openCells = int(np.count_nonzero(~grid.wallView()))
+
+        self.solving = 0  # Chunks of queries sent to the workers and not solved yet
+        self.retired = False
+
+        self.memory = SharedMemory(create=True, size=2 * grid.size)
+        shared = Grid.fromBuffer(grid.rows, grid.cols, self.memory.buf[:grid.size], self.memory.buf[grid.size:])
+        shared.walls[:] = grid.walls
+        shared.weights[:] = grid.weights
+        del shared  # Nothing may use the memory once it's closed
+
+    @property
+    def shape(self):
+        # What workers need to attach to the grid, see _solveChunk()
+        return self.memory.name, self.rows, self.cols, self.diagonals
+
+    def info(self):
+        return {'rows': self.rows, 'cols': self.cols, 'diagonals': self.diagonals, 'openCells': self.openCells}
+
+    def isWall(self, x, y):
+        # The walls are the first half of the memory, laid out like Grid.walls
+        return bool(self.memory.buf[(x + 1) * (self.cols + 2) + y + 1])
+
+    def retire(self):
+        self.retired = True
+        if not self.solving:
+            self.close()
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+class PathService:
+    """
+    Solves path queries for other processes, without Qt, on named grids it keeps loaded.
+
+    Requests and responses are JSON objects, one per line, over TCP or a Unix socket. Every request has an 'op', and
+    any 'id' it has is sent back with its response, which is sent as soon as it's ready: requests on the same
+    connection are handled at the same time and can be answered out of order. The ops are:
+        load      {'name', 'path', 'mapped'?}: loads a saved grid or MovingAI map (see data.mapfile)
+        generate  {'name', 'layout', 'rows', 'cols', 'seed'?, 'diagonals'?}: makes a grid with data.generators
+        unload    {'name'}
+        grids     {}: the loaded grids, with their size and neighbors
+        path      {'grid', 'start', 'end', 'algorithm'?, 'heuristic'?}: a single query
+        batch     {'grid', 'queries': [[start, end], ...], 'algorithm'?, 'heuristic'?}: many queries at once
+        stats     {}: how many queries were solved and coalesced
+    Points are [x, y], of open cells of the grid. The algorithm is A* by default, with the default heuristic for the
+    grid's neighbors. Each query is answered with its 'path' (a list of [x, y], or null), 'cost', 'expanded' and
+    'time'. Requests that fail, e.g. with a point outside of the grid or on a wall, are answered with an 'error'
+    instead.
+
+    Searches run in a pool of worker processes, so the event loop keeps answering while they do, and the grids are
+    shared with the workers instead of sent with every query. A query that is asked again while it's being solved
+    isn't solved twice: every request asking for it waits for the same result
+    """
+
+    def __init__(self, workers: int = None):
+        self.grids = {}  # SharedGrids by name
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = self._newPool()
+
+        # Futures of the results of the queries being solved, by (memory name, start, end, algorithm, heuristic)
+        self._inFlight = {}
+
+        self.solved = self.coalesced = 0
+        self.ops = {'load': self.load, 'generate': self.generate, 'unload': self.unload, 'grids': self.listGrids,
+                    'path': self.path, 'batch': self.batch, 'stats': self.stats}
+
+    def _newPool(self):
+        # Workers are started as new processes rather than forked, or they would keep a copy of the connections open
+        #  at the time, which then never close
+        return ProcessPoolExecutor(self.workers, multiprocessing.get_context('spawn'))
+
+    def _replacePool(self, pool):
+        """
+        Replaces the pool once it broke, e.g. because a worker died, unless it was already replaced. A broken pool
+        fails every query sent to it from then on
+        """
+
+        if pool is self.pool:
+            self.pool = self._newPool()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        for grid in self.grids.values():
+            if not grid.retired:
+                grid.close()
+        self.grids.clear()
+
+    # -- Serving --
+
+    async def start(self, host='127.0.0.1', port=8765, path=None):
+        """
+        Starts answering requests on a TCP port of host, any free one if port is 0, or on a Unix socket at path if
+        given. Returns the asyncio Server
+        """
+
+        if path is not None:
+            return await asyncio.start_unix_server(self._connection, path, limit=MAX_LINE)
+        return await asyncio.start_server(self._connection, host, port, limit=MAX_LINE)
+
+    async def serve(self, host='127.0.0.1', port=8765, path=None):
+        """
+        Answers requests like start() until cancelled
+        """
+
+        async with await self.start(host, port, path) as server:
+            await server.serve_forever()
+
+    async def _connection(self, reader, writer):
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(self._answer(line, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass  # The client went away or sent a line too long to read, there's no one to answer
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def _answer(self, line, writer):
+        response = await self.handle(line)
+        try:
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def handle(self, line):
+        """
+        Returns the response to a request, given as a line of JSON
+        """
+
+        requestId = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('Requests are JSON objects')
+
+            requestId = request.get('id')
+            op = self.ops.get(request.get('op'))
+            if op is None:
+                raise ValueError(f"Unknown op {request.get('op')!r}, use one of {', '.join(self.ops)}")
+
+            response = await op(request)
+        except (ValueError, KeyError, TypeError, OSError, RuntimeError) as error:
+            response = {'error': str(error) if not isinstance(error, KeyError) else f'Missing or unknown {error}'}
+        except Exception as error:
+            # Every request is answered, even when something unexpected went wrong
+            response = {'error': f'Internal error: {error!r}'}
+
+        if requestId is not None:
+            response['id'] = requestId
+        return response
+
+    # -- Grids --
+
+    async def load(self, request):
+        mapped = bool(request.get('mapped', False))
+        grid = await asyncio.get_running_loop().run_in_executor(None, loadGrid, request['path'], mapped)
+        return self._addGrid(request['name'], grid)
+
+    async def generate(self, request):
+        layout, rows, cols = request['layout'], int(request['rows']), int(request['cols'])
+        if layout not in GENERATORS:
+            raise ValueError(f"Unknown layout {layout!r}, use one of {', '.join(GENERATORS)}")
+        if rows < 1 or cols < 1:
+            raise ValueError('Grids need at least one row and column')
+
+        rng = np.random.default_rng(request.get('seed'))
+        walls = await asyncio.get_running_loop().run_in_executor(None, GENERATORS[layout], rows, cols, rng)
+        grid = Grid.fromWalls(walls)
+        grid.diagonals = bool(request.get('diagonals', True))
+        return self._addGrid(request['name'], grid)
+
+    def _addGrid(self, name, grid):
+        if not isinstance(name, str):
+            raise ValueError('Grid names are strings')
+
+        old = self.grids.get(name)
+        self.grids[name] = SharedGrid(grid)
+        if old is not None:
+            old.retire()
+        return {'grid': name, **self.grids[name].info()}
+
+    async def unload(self, request):
+        self.grids.pop(request['name']).retire()
+        return {'grid': request['name']}
+
+    async def listGrids(self, request):
+        return {'grids': {name: grid.info() for name, grid in self.grids.items()}}
+
+    async def stats(self, request):
+        return {'solved': self.solved, 'coalesced': self.coalesced, 'inFlight': len(self._inFlight)}
+
+    # -- Queries --
+
+    async def path(self, request):
+        return (await self._solve(request, [(request['start'], request['end'])]))[0]
+
+    async def batch(self, request):
+        return {'results': await self._solve(request, request['queries'])}
+
+    async def _solve(self, request, queries):
+        """
+        Solves the (start, end) queries of a request, returning the response to each of them
+        """
+
+        grid = self.grids[request['grid']]
+        algorithm = request.get('algorithm', 'A*')
+        if algorithm not in algs.ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {algorithm!r}, use one of {', '.join(algs.ALGORITHMS)}")
+
+        heuristic = None
+        if algs.ALGORITHMS[algorithm]['heuristics']:
+            heuristic = request.get('heuristic') or algs.defaultHeuristic(grid.diagonals)
+            if heuristic not in algs.ALGORITHMS[algorithm]['heuristics']:
+                raise ValueError(f'{algorithm} has no heuristic {heuristic!r}')
+
+        points = [(self._point(grid, start), self._point(grid, end)) for start, end in queries]
+
+        # Queries already being solved are waited for, the others are sent to the workers in chunks
+        loop = asyncio.get_running_loop()
+        futures, pending = [], []
+        for start, end in points:
+            key = (grid.memory.name, start, end, algorithm, heuristic)
+            future = self._inFlight.get(key)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                future = self._inFlight[key] = loop.create_future()
+                pending.append((key, future))
+            futures.append(future)
+
+        for i in range(0, len(pending), CHUNK_SIZE):
+            chunk = pending[i:i + CHUNK_SIZE]
+            pool = self.pool
+            try:
+                solving = loop.run_in_executor(pool, _solveChunk, grid.shape, [key[1:3] for key, _ in chunk],
+                                               algorithm, heuristic)
+            except Exception as error:
+                # The pool broke or is shutting down: the queries not sent yet fail, rather than staying in flight
+                #  with no one to solve them
+                self._failed(pending[i:], error)
+                if isinstance(error, BrokenProcessPool):
+                    self._replacePool(pool)
+                break
+
+            grid.solving += 1
+            solving.add_done_callback(lambda solving, chunk=chunk, pool=pool: self._solved(solving, grid, chunk, pool))
+
+        results = await asyncio.gather(*futures)
+        return [self._response(result) for result in results]
+
+    def _solved(self, solving, grid, chunk, pool):
+        """
+        Gives the results of a chunk of queries on grid, sent to pool, to everyone waiting for them
+        """
+
+        grid.solving -= 1
+        if grid.retired and not grid.solving:
+            grid.close()
+
+        if solving.cancelled() or solving.exception() is not None:
+            error = solving.exception() if not solving.cancelled() else RuntimeError('The service is closing')
+            self._failed(chunk, error)
+            if isinstance(error, BrokenProcessPool):
+                self._replacePool(pool)
+            return
+
+        self.solved += len(chunk)
+        for (key, future), result in zip(chunk, solving.result()):
+            del self._inFlight[key]
+            if not future.done():
+                future.set_result(result)
+
+    def _failed(self, chunk, error):
+        """
+        Fails the (key, future) queries of a chunk with error, so that asking for them again solves them again
+        """
+
+        for key, future in chunk:
+            del self._inFlight[key]
+            if not future.done():
+                future.set_exception(error)
+
+    @staticmethod
+    def _point(grid, point):
+        x, y = map(int, point)
+        if not (0 <= x < grid.rows and 0 <= y < grid.cols):
+            raise ValueError(f'({x}, {y}) is outside of the grid')
+        # Algorithms disagree about paths from or to a wall, some start inside it and others find none
+        if grid.isWall(x, y):
+            raise ValueError(f'({x}, {y}) is a wall')
+        return x, y
+
+    @staticmethod
+    def _response(result):
+        return {'path': [list(point) for point in result.path] if result.path is not None else None,
+                'cost': result.cost, 'expanded': result.expanded, 'time': result.time}
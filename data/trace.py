@@ -0,0 +1,159 @@
+from array import array
+import json
+
+import numpy as np
+
+from data.algorithms import SEARCHED, IN_LIST, IN_PATH
+
+
+# Events are stored as a code per kind. A cell's state at some point of the search is the code of the last event on
+#  it so far, 0 if there was none
+CODES = {SEARCHED: 1, IN_LIST: 2, IN_PATH: 3}
+KINDS = (None, SEARCHED, IN_LIST, IN_PATH)  # By code
+
+KEYFRAME_EVENTS = 4096  # Fewest events between keyframes, there are more on big grids so keyframes stay small
+
+
+class SearchTrace:
+    """
+    The events of a search, kept compactly so the search can run at full speed and be replayed afterwards.
+    Every event is a byte for its kind and an int for its cell. Record a search by passing record() as its onEvent,
+    then look at it at any point with statesAt(), which starts from the closest keyframe, a copy of every cell's state
+    taken at regular intervals, so seeking anywhere only replays the events since it.
+    The trace keeps the walls, weights, start and end of the grid it was recorded on, and any info given, so it can be
+    saved and replayed later by itself
+    """
+
+    def __init__(self, walls, start, end, info=None, weights=None):
+        """
+        Makes an empty trace of a search from start to end on a grid with the given (rows, cols) walls and weights,
+        such as its wallView() and weightView(), which are copied. Without weights, every cell weighs 1
+        """
+
+        self.walls = np.array(walls, dtype=bool)
+        self.rows, self.cols = self.walls.shape
+        self.weights = np.array(weights, dtype=np.uint8) if weights is not None else np.ones(self.walls.shape, np.uint8)
+        self.start, self.end = tuple(start), tuple(end)
+        self.info = dict(info or {})  # Anything JSON can save, e.g. the algorithm's name
+
+        self._codes = array('B')
+        self._cells = array('i')  # x * cols + y
+
+        # States every _interval events, made when first needed, for the number of events in _keyframesLength
+        self._keyframes = None
+        self._keyframesLength = 0
+
+        # Keyframes take a byte per cell, spacing them by at least a quarter of that keeps them smaller than the events
+        self._interval = max(KEYFRAME_EVENTS, self.rows * self.cols // 4)
+
+    def record(self, event):
+        """
+        Adds a (kind, x, y) event, as passed to the onEvent of algorithms
+        """
+
+        kind, x, y = event
+        self._codes.append(CODES[kind])
+        self._cells.append(x * self.cols + y)
+
+    @property
+    def codes(self):
+        # The code of every event, as an array
+        return np.frombuffer(self._codes, dtype=np.uint8) if self._codes else np.zeros(0, np.uint8)
+
+    @property
+    def cells(self):
+        # The cell of every event as x * cols + y, as an array
+        return np.frombuffer(self._cells, dtype=np.int32) if self._cells else np.zeros(0, np.int32)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def eventAt(self, i):
+        """
+        Returns the i-th event as (kind, x, y)
+        """
+        return (KINDS[self._codes[i]], *divmod(self._cells[i], self.cols))
+
+    def events(self, begin=0, end=None):
+        """
+        Yields the events from begin up to end as (kind, x, y)
+        """
+
+        for i in range(begin, len(self) if end is None else end):
+            yield self.eventAt(i)
+
+    def statesAt(self, position):
+        """
+        Returns the state of every cell once the first position events happened, as a (rows, cols) array of codes
+        """
+
+        if self._keyframes is None or self._keyframesLength != len(self):
+            self._makeKeyframes()
+
+        keyframe = min(position, len(self)) // self._interval
+        states = self._keyframes[keyframe].copy()
+        self._apply(states, keyframe * self._interval, position)
+        return states.reshape(self.rows, self.cols)
+
+    def _apply(self, states, begin, end):
+        """
+        Sets flat states to what the events from begin to end leave them at
+        """
+
+        # Only the last event of each cell counts
+        cells, codes = self.cells[begin:end][::-1], self.codes[begin:end][::-1]
+        cells, last = np.unique(cells, return_index=True)
+        states[cells] = codes[last]
+
+    def _makeKeyframes(self):
+        states = np.zeros(self.rows * self.cols, dtype=np.uint8)
+        self._keyframes = [states.copy()]
+
+        for begin in range(0, len(self) - self._interval + 1, self._interval):
+            self._apply(states, begin, begin + self._interval)
+            self._keyframes.append(states.copy())
+
+        self._keyframesLength = len(self)
+
+    def firstDifference(self, other):
+        """
+        Returns the position of the first event that differs from another trace's, or None if they're the same.
+        If one is the start of the other, it's the length of the shortest
+        """
+
+        length = min(len(self), len(other))
+        differs = (self.codes[:length] != other.codes[:length]) | (self.cells[:length] != other.cells[:length])
+        if differs.any():
+            return int(np.argmax(differs))
+        return length if len(self) != len(other) else None
+
+    def save(self, path):
+        """
+        Saves the trace to a compressed NumPy file, which load() reads back
+        """
+
+        header = {'rows': self.rows, 'cols': self.cols, 'start': self.start, 'end': self.end, 'info': self.info}
+        with open(path, 'wb') as file:
+            np.savez_compressed(file, header=np.array(json.dumps(header)), walls=np.packbits(self.walls),
+                                weights=self.weights, codes=self.codes, cells=self.cells)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a trace saved with save(). Raises ValueError if the file isn't one
+        """
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                header = json.loads(str(data['header']))
+                rows, cols = header['rows'], header['cols']
+                walls = np.unpackbits(data['walls'], count=rows * cols).reshape(rows, cols)
+                weights = data['weights'] if 'weights' in data else None  # Traces saved before weights have none
+                codes, cells = data['codes'], data['cells']
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'{path} is not a search trace') from None
+
+        trace = cls(walls, header['start'], header['end'], header['info'], weights)
+        trace._codes.frombytes(codes.astype(np.uint8).tobytes())
+        trace._cells.frombytes(cells.astype(np.int32).tobytes())
+        return trace
@@ -0,0 +1,491 @@
+from PySide2.QtWidgets import QWidget, QSizePolicy
+from PySide2.QtGui import QColor, QPainter, QPixmap, QImage, QPen
+from PySide2.QtCore import Qt, QTimer, QRect, QRectF, QSize, Signal
+from time import perf_counter
+from array import array
+
+import numpy as np
+
+from data.grid import MAX_WEIGHT
+
+
+MAX_SCALED_PIXMAPS = 32  # Scaled icons kept at once, resizing the window past that many cell sizes starts over
+
+# Icons loaded from the resources, by path, and copies of them scaled to the sizes they're drawn at, by (path, width,
+#  height). Shared by every canvas and cursor, so that each icon is only decoded once and scaled once per cell size
+_pixmaps = {}
+_scaledPixmaps = {}
+
+
+def iconPixmap(path: str, size: QSize = None):
+    """
+    Returns the icon at a resource path as a QPixmap, scaled to size if given. Icons are loaded the first time they
+    are needed, then kept, as are their scaled copies
+    """
+
+    pixmap = _pixmaps.get(path)
+    if pixmap is None:
+        pixmap = _pixmaps[path] = QPixmap(path)
+    if size is None:
+        return pixmap
+
+    key = (path, size.width(), size.height())
+    scaled = _scaledPixmaps.get(key)
+    if scaled is None:
+        if len(_scaledPixmaps) >= MAX_SCALED_PIXMAPS:
+            _scaledPixmaps.clear()
+        scaled = _scaledPixmaps[key] = pixmap.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    return scaled
+
+
+def argb(color: QColor):
+    # The 32-bit ARGB value of a color, as stored in the pixel buffer
+    return np.uint32(color.rgba())
+
+
+def blend(fromColor: QColor, toColor: QColor, progress):
+    """
+    Returns the ARGB values of the colors between two colors at every progress from 0 to 1, blending every channel,
+    alpha included, as an array shaped like progress
+    """
+
+    fromChannels, toChannels = np.array(fromColor.getRgb()), np.array(toColor.getRgb())
+    channels = fromChannels + (toChannels - fromChannels) * np.asarray(progress)[..., None]
+    r, g, b, a = np.moveaxis(channels.astype(np.uint32), -1, 0)
+    return (a << 24) | (r << 16) | (g << 8) | b
+
+
+class GridCanvas(QWidget):
+    """
+    Draws the whole grid in a single widget.
+
+    What each cell shows is kept in a state buffer with one entry per cell, and its color in a pixel buffer with one
+    pixel per cell. Painting scales the part of the pixel buffer that needs repainting onto the widget, then adds the
+    icons on top. Changing a cell only repaints that cell's rectangle, and clearing the states only touches the cells
+    that were given one since the last clear
+    """
+
+    # States a cell can be in
+    EMPTY, SEARCHED, IN_LIST, PATH = range(4)
+
+    EMPTY_COLOR = QColor(0, 0, 0, 120)
+    SEARCHED_COLOR = QColor(0, 55, 165)
+    IN_LIST_COLOR = SEARCHED_COLOR.lighter(f=150)
+    PATH_COLOR = QColor(255, 255, 0)
+    WALL_COLOR = QColor(255, 255, 255, 150)
+
+    # Empty cells go from EMPTY_COLOR at a weight of 1 to this color at MAX_WEIGHT
+    HEAVY_COLOR = QColor(150, 100, 40, 230)
+
+    # Empty cells of the heatmap go from the near color at the goal to the far color at the farthest reachable cell
+    HEAT_NEAR_COLOR = QColor(230, 80, 40, 170)
+    HEAT_FAR_COLOR = QColor(40, 60, 140, 120)
+
+    AGENT_PATH_ALPHA = 140  # Opacity of the agents' colors on the cells of their paths
+
+    # Recently searched cells fade from this color to SEARCHED_COLOR
+    FADE_COLOR = QColor(131, 18, 165)
+    FADE_TIME = 1  # Seconds
+    FADE_INTERVAL = 33  # Milliseconds between animation frames
+
+    DIRTY_LIMIT = .25  # Fraction of the cells past which clearing them one by one is slower than clearing every cell
+
+    # Icons, see iconPixmap()
+    WALL_ICON = ':/icon/icons/wall.png'
+    START_ICON = ':/icon/icons/start.png'
+    END_ICON = ':/icon/icons/end.png'
+
+    MIN_ICON_SIZE = 6  # Smallest cell size, in pixels, that walls are drawn with an icon at
+    MIN_GAP_SIZE = 4  # Smallest cell size, in pixels, that cells are drawn apart from each other at
+
+    # Mouse interaction with the cells, as the x, y of the cell. Released gives -1, -1 outside of the grid
+    cellPressed = Signal(int, int)
+    cellDragged = Signal(int, int)  # Only sent when the mouse moves onto another cell
+    cellReleased = Signal(int, int)
+
+    def __init__(self, grid, parent=None):
+        QWidget.__init__(self, parent)
+
+        self.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)  # Allows the grid to adapt to window size
+
+        # Color of each state, indexed by state
+        self.stateColors = np.array([argb(c) for c in (self.EMPTY_COLOR, self.SEARCHED_COLOR, self.IN_LIST_COLOR,
+                                                       self.PATH_COLOR)], dtype=np.uint32)
+
+        # Color of empty cells, indexed by weight. Weights are blended on a log scale so that light ones show too
+        progress = np.log(np.arange(1, MAX_WEIGHT + 1)) / np.log(MAX_WEIGHT)
+        self.weightColors = np.concatenate(([argb(self.EMPTY_COLOR)], blend(self.EMPTY_COLOR, self.HEAVY_COLOR,
+                                                                            progress))).astype(np.uint32)
+
+        # Cells where the start and end icons are drawn, hidden while they're being moved
+        self.start = self.end = None
+
+        # The fade animation of searched cells is driven by a single timer
+        self.fadeTimer = QTimer(self)
+        self.fadeTimer.setInterval(self.FADE_INTERVAL)
+        self.fadeTimer.timeout.connect(self._animateFade)
+        self._newFades = []  # (time, x, y) of cells searched since the last frame
+        self._fades = np.empty((0, 3))  # Same, for all cells that are still fading
+
+        self._lastCell = None  # The last cell the mouse was dragged on
+
+        self.states = self.pixels = None
+        self._dirty = None  # Cells given a non-EMPTY state since the last clear, as x * cols + y, None if unknown
+        self.heatColors = None  # Color of every empty cell while the heatmap is shown, None otherwise
+
+        # Agents as (start, end, QColor), drawn as a dot where they are and a ring at their end
+        self.agents = []
+        self.agentPositions = []  # Cell each agent's dot is drawn at
+        self.agentColors = None  # Color of the empty cells on the agents' paths, 0 elsewhere, None without paths
+        self.setGrid(grid)
+
+    def setGrid(self, grid):
+        """
+        Shows the given grid, with every cell empty. Also used after the grid was resized
+        """
+
+        self.grid = grid
+
+        # The buffers are only replaced when the size changed
+        if self.states is None or self.states.shape != (grid.rows, grid.cols):
+            self.states = np.empty((grid.rows, grid.cols), dtype=np.uint8)
+            self.pixels = np.empty((grid.rows, grid.cols), dtype=np.uint32)
+            self.heatColors = None
+            self.agents, self.agentPositions, self.agentColors = [], [], None
+
+        self._dirty = None
+        self.clearStates()
+
+    # -- Geometry --
+
+    def cellSize(self):
+        """
+        Returns the width and height of a cell, in pixels
+        """
+        return self.width() / self.grid.cols, self.height() / self.grid.rows
+
+    def cellRect(self, x, y):
+        """
+        Returns the rectangle covered by the cell at x, y
+        """
+
+        width, height = self.cellSize()
+        left, top = int(y * width), int(x * height)
+        return QRect(left, top, int((y + 1) * width) - left + 1, int((x + 1) * height) - top + 1)
+
+    def cellAt(self, pos):
+        """
+        Returns the x, y of the cell at a position on the widget, or None if it's outside of the grid
+        """
+
+        width, height = self.cellSize()
+        x, y = int(pos.y() // height), int(pos.x() // width)
+        return (x, y) if (x, y) in self.grid else None
+
+    # -- Changing cells --
+
+    def refresh(self):
+        """
+        Recomputes the color of every cell and repaints the whole grid
+        """
+
+        self.pixels[:] = self.stateColors[self.states]
+        empty = self.states == self.EMPTY
+        if self.heatColors is not None:
+            self.pixels[empty] = self.heatColors[empty]
+        else:
+            self.pixels[empty] = self.weightColors[self.grid.weightView()[empty]]
+        if self.agentColors is not None:
+            onPath = empty & (self.agentColors != 0)
+            self.pixels[onPath] = self.agentColors[onPath]
+        self.pixels[self.grid.wallView()] = argb(self.WALL_COLOR)
+        self.update()
+
+    def refreshCell(self, x, y):
+        """
+        Recomputes the color of the cell at x, y and repaints it, e.g. once it became a wall
+        """
+
+        index = self.grid.index(x, y)
+        if self.grid.walls[index]:
+            self.pixels[x, y] = argb(self.WALL_COLOR)
+        elif self.states[x, y] == self.EMPTY:
+            if self.agentColors is not None and self.agentColors[x, y]:
+                self.pixels[x, y] = self.agentColors[x, y]
+            elif self.heatColors is not None:
+                self.pixels[x, y] = self.heatColors[x, y]
+            else:
+                self.pixels[x, y] = self.weightColors[self.grid.weights[index]]
+        else:
+            self.pixels[x, y] = self.stateColors[self.states[x, y]]
+        self.update(self.cellRect(x, y))
+
+    def refreshCells(self, xs, ys):
+        """
+        Recomputes the colors of the cells at the given arrays of x and y, and repaints the box around them
+        """
+
+        states = self.states[xs, ys]
+        colors = self.stateColors[states]
+        empty = states == self.EMPTY
+        if self.heatColors is not None:
+            colors[empty] = self.heatColors[xs[empty], ys[empty]]
+        else:
+            colors[empty] = self.weightColors[self.grid.weightView()[xs[empty], ys[empty]]]
+        if self.agentColors is not None:
+            onPath = empty & (self.agentColors[xs, ys] != 0)
+            colors[onPath] = self.agentColors[xs[onPath], ys[onPath]]
+        colors[self.grid.wallView()[xs, ys]] = argb(self.WALL_COLOR)
+
+        self.pixels[xs, ys] = colors
+        self.update(self.cellRect(xs.min(), ys.min()).united(self.cellRect(xs.max(), ys.max())))
+
+    def setHeatmap(self, distances):
+        """
+        Colors empty cells by their distance, from a (rows, cols) array of them where INF is out of reach. None hides
+        the heatmap
+        """
+
+        if distances is None:
+            self.heatColors = None
+            self.refresh()
+            return
+
+        reachable = np.isfinite(distances)
+        farthest = distances[reachable].max() if reachable.any() else 0
+
+        progress = np.divide(distances, farthest, out=np.zeros(distances.shape), where=reachable & (farthest > 0))
+        self.heatColors = blend(self.HEAT_NEAR_COLOR, self.HEAT_FAR_COLOR, progress)
+        self.heatColors[~reachable] = self.stateColors[self.EMPTY]
+        self.refresh()
+
+    def setAgents(self, agents, paths=None):
+        """
+        Shows agents given as (start, end, QColor), each as a dot at its start and a ring at its end, along with the
+        cells of their paths in their color if paths are given, None for agents without one. An empty list hides them
+        """
+
+        self.agents = list(agents)
+        self.agentPositions = [start for start, _, _ in self.agents]
+
+        if paths is None:
+            self.agentColors = None
+        else:
+            self.agentColors = np.zeros(self.states.shape, dtype=np.uint32)
+            for (_, _, color), path in zip(self.agents, paths):
+                if path:
+                    xs, ys = np.array(path).T
+                    self.agentColors[xs, ys] = argb(QColor(color.red(), color.green(), color.blue(),
+                                                           self.AGENT_PATH_ALPHA))
+        self.refresh()
+
+    def moveAgents(self, positions):
+        """
+        Moves the agents' dots to the given cells, one per agent, repainting only the cells they left and reached
+        """
+
+        for old, new in zip(self.agentPositions, positions):
+            if old != new:
+                self.update(self.cellRect(*old))
+                self.update(self.cellRect(*new))
+        self.agentPositions = list(positions)
+
+    def setState(self, x, y, state):
+        self.states[x, y] = state
+        self.refreshCell(x, y)
+
+        if state != self.EMPTY and self._dirty is not None:
+            self._dirty.append(x * self.grid.cols + y)
+            if len(self._dirty) > self.states.size * self.DIRTY_LIMIT:
+                self._dirty = None
+
+    def setStates(self, states):
+        """
+        Sets the state of every cell at once from a (rows, cols) array of them, and repaints the whole grid
+        """
+
+        self.states[:] = states
+        self._dirty = None
+        self.refresh()
+
+    def searched(self, x, y):
+        """
+        Marks the cell at x, y as searched, fading it in unless it holds the start or end icon
+        """
+
+        self.setState(x, y, self.SEARCHED)
+
+        if (x, y) != self.start and (x, y) != self.end:
+            self._newFades.append((perf_counter(), x, y))
+            self.fadeTimer.start()
+
+    def clearStates(self):
+        """
+        Sets every cell back to empty. Only the cells that were given a state since the last clear are recomputed and
+        repainted, so walls and weights edited directly since then need a refresh()
+        """
+
+        self.fadeTimer.stop()
+        self._newFades, self._fades = [], np.empty((0, 3))
+
+        if self._dirty is None:
+            self.states[:] = self.EMPTY
+            self.refresh()
+        elif self._dirty:
+            xs, ys = np.divmod(np.frombuffer(self._dirty, dtype=np.intc), self.grid.cols)
+            self.states[xs, ys] = self.EMPTY
+            self.refreshCells(xs, ys)
+
+        self._dirty = array('i')
+
+    def setMarkers(self, start, end):
+        """
+        Sets the cells the start and end icons are drawn at. Either can be None to hide it
+        """
+
+        for point in (self.start, self.end, start, end):
+            if point is not None:
+                self.update(self.cellRect(*point))
+
+        self.start, self.end = start, end
+
+    def _animateFade(self):
+        """
+        Moves every fading cell one frame closer to the searched color
+        """
+
+        if self._newFades:
+            self._fades = np.concatenate((self._fades, np.array(self._newFades)))
+            self._newFades = []
+
+        # Drop cells that are done fading, or were changed since they were searched
+        now = perf_counter()
+        done = now - self._fades[:, 0] >= self.FADE_TIME
+        fadingX, fadingY = self._fades[:, 1].astype(int), self._fades[:, 2].astype(int)
+        still = self.states[fadingX, fadingY] == self.SEARCHED
+        self.pixels[fadingX[done & still], fadingY[done & still]] = argb(self.SEARCHED_COLOR)
+
+        keep = ~done & still
+        self._fades, xs, ys = self._fades[keep], fadingX[keep], fadingY[keep]
+
+        # Blend every color channel from the fade color to the searched color
+        progress = ((now - self._fades[:, 0]) / self.FADE_TIME)[:, None]
+        fromColor = np.array(self.FADE_COLOR.getRgb()[:3])
+        toColor = np.array(self.SEARCHED_COLOR.getRgb()[:3])
+        r, g, b = (fromColor + (toColor - fromColor) * progress).astype(np.uint32).T
+        self.pixels[xs, ys] = 0xFF000000 | (r << 16) | (g << 8) | b
+
+        # Repaint the box around the cells that changed
+        changedX = np.concatenate((fadingX[done & still], xs))
+        changedY = np.concatenate((fadingY[done & still], ys))
+        if len(changedX):
+            self.update(self.cellRect(changedX.min(), changedY.min()).united(
+                self.cellRect(changedX.max(), changedY.max())))
+
+        if not len(self._fades):
+            self.fadeTimer.stop()
+
+    # -- Painting --
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = event.rect()
+        width, height = self.cellSize()
+
+        # Range of cells touched by the area to paint
+        top, left = int(rect.top() // height), int(rect.left() // width)
+        bottom = min(int(rect.bottom() // height) + 1, self.grid.rows)
+        right = min(int(rect.right() // width) + 1, self.grid.cols)
+        if top >= bottom or left >= right:
+            return
+
+        # Scale the pixels of those cells onto the widget, one pixel per cell
+        image = QImage(self.pixels.data, self.grid.cols, self.grid.rows, self.grid.cols * 4, QImage.Format_ARGB32)
+        painter.drawImage(QRectF(left * width, top * height, (right - left) * width, (bottom - top) * height),
+                          image, QRectF(left, top, right - left, bottom - top))
+
+        # Separate cells with lines of the background color when they're big enough to tell apart
+        if width >= self.MIN_GAP_SIZE and height >= self.MIN_GAP_SIZE:
+            painter.setPen(self.palette().window().color())
+            for x in range(top, bottom + 1):
+                painter.drawLine(int(left * width), int(x * height), int(right * width), int(x * height))
+            for y in range(left, right + 1):
+                painter.drawLine(int(y * width), int(top * height), int(y * width), int(bottom * height))
+
+        # Icons, drawn from copies already scaled to the cell size
+        if width >= self.MIN_ICON_SIZE and height >= self.MIN_ICON_SIZE:
+            xs, ys = np.nonzero(self.grid.wallView()[top:bottom, left:right])
+            self._paintIcons(painter, self.WALL_ICON, xs + top, ys + left)
+
+        if self.start is not None:
+            self._paintIcon(painter, self.START_ICON, *self.start)
+        if self.end is not None:
+            self._paintIcon(painter, self.END_ICON, *self.end)
+
+        if self.agents:
+            self._paintAgents(painter, width, height)
+
+    def _paintIcon(self, painter, path, x, y):
+        rect = self.cellRect(x, y)
+        painter.drawPixmap(rect.topLeft(), iconPixmap(path, rect.size()))
+
+    def _paintIcons(self, painter, path, xs, ys):
+        """
+        Draws an icon on every cell at the given arrays of x and y. Their rectangles, the same as cellRect()'s, are
+        found all at once, and since cells differ in size by a pixel at most, only a few scaled copies are used
+        """
+
+        width, height = self.cellSize()
+        lefts, tops = (ys * width).astype(int), (xs * height).astype(int)
+        widths = ((ys + 1) * width).astype(int) - lefts + 1
+        heights = ((xs + 1) * height).astype(int) - tops + 1
+
+        pixmaps = {}  # Scaled copies, by size
+        for left, top, size in zip(lefts.tolist(), tops.tolist(), zip(widths.tolist(), heights.tolist())):
+            pixmap = pixmaps.get(size)
+            if pixmap is None:
+                pixmap = pixmaps[size] = iconPixmap(path, QSize(*size))
+            painter.drawPixmap(left, top, pixmap)
+
+    def _paintAgents(self, painter, width, height):
+        """
+        Draws a ring at the end of every agent, then a dot where each of them is
+        """
+
+        painter.setRenderHint(QPainter.Antialiasing)
+        inset = min(width, height) / 5
+        ring = QPen()
+        ring.setWidthF(max(1., inset))
+
+        painter.setBrush(Qt.NoBrush)
+        for _, (x, y), color in self.agents:
+            ring.setColor(color)
+            painter.setPen(ring)
+            painter.drawEllipse(QRectF(y * width, x * height, width, height).adjusted(inset, inset, -inset, -inset))
+
+        inset /= 2
+        painter.setPen(Qt.NoPen)
+        for (_, _, color), (x, y) in zip(self.agents, self.agentPositions):
+            painter.setBrush(color)
+            painter.drawEllipse(QRectF(y * width, x * height, width, height).adjusted(inset, inset, -inset, -inset))
+
+    # -- Mouse interaction --
+
+    def mousePressEvent(self, event):
+        cell = self.cellAt(event.pos())
+        self._lastCell = cell
+
+        if cell is not None:
+            self.cellPressed.emit(*cell)
+
+    def mouseMoveEvent(self, event):
+        # Without mouse tracking, this only happens while a button is held down
+        cell = self.cellAt(event.pos())
+
+        if cell is not None and cell != self._lastCell:
+            self._lastCell = cell
+            self.cellDragged.emit(*cell)
+
+    def mouseReleaseEvent(self, event):
+        self._lastCell = None
+        self.cellReleased.emit(*(self.cellAt(event.pos()) or (-1, -1)))
@@ -0,0 +1,227 @@
+from PySide2.QtCore import QObject, Signal
+from threading import Event
+from time import perf_counter
+import traceback
+
+from data.profiling import profileSearch
+from data.trace import SearchTrace
+from data.cooperative import cooperativeAStar
+from data.fields import distanceField
+
+
+class SearchCancelled(Exception):
+    """
+    Raised from inside a running algorithm to stop it once the search was cancelled
+    """
+
+
+class SearchWorker(QObject):
+    """
+    Runs an algorithm outside of the GUI thread at full speed, recording its events in a SearchTrace to be replayed.
+    What the algorithm precomputes is made first by its prepare function, if any (see register()), which is stopped
+    as soon as the search is cancelled too, and whose time is added to the result's
+    """
+
+    # The SearchResult and SearchTrace (both None if cancelled) and whether the search was cancelled
+    finished = Signal(object, object, bool)
+    # What went wrong, when the search raised anything else than SearchCancelled. finished isn't emitted then
+    failed = Signal(str)
+
+    def __init__(self, algorithm, grid, start, end, heuristic, info=None, profile=False, prepare=None):
+        QObject.__init__(self)
+
+        self.algorithm = algorithm
+        self.grid = grid
+        self.start = start
+        self.end = end
+        self.heuristic = heuristic
+        self.profile = profile  # Whether to profile the search, see profileSearch()
+        self.prepare = prepare
+
+        self.trace = SearchTrace(grid.wallView(), start, end, info, grid.weightView())
+        self._cancelled = Event()
+
+    def run(self):
+        """
+        Runs the search, meant to be connected to the started signal of the QThread this worker was moved to
+        """
+
+        result, trace, cancelled = None, None, False
+
+        try:
+            prepareTime = 0
+            if self.prepare is not None:
+                prepareStart = perf_counter()
+                self.prepare(self.grid, self.start, self.end, self._checkCancelled)
+                prepareTime = perf_counter() - prepareStart
+
+            if self.profile:
+                result = profileSearch(self.algorithm, self.grid, self.start, self.end, self.heuristic, self._onEvent)
+            else:
+                result = self.algorithm(self.grid, self.start, self.end, self.heuristic, onEvent=self._onEvent)
+            result.time += prepareTime
+            trace = self.trace
+        except SearchCancelled:
+            cancelled = True
+        except Exception as error:
+            traceback.print_exc()
+            self.failed.emit(f'{type(error).__name__}: {error}')
+            return
+
+        self.finished.emit(result, trace, cancelled)
+
+    def cancel(self):
+        """
+        Makes the search stop at its next event, or its next step while preparing. Safe to call from any thread
+        """
+        self._cancelled.set()
+
+    def _checkCancelled(self):
+        if self._cancelled.is_set():
+            raise SearchCancelled
+
+    def _onEvent(self, event):
+        self._checkCancelled()
+        self.trace.record(event)
+
+
+class AgentWorker(QObject):
+    """
+    Plans the paths of agents with Cooperative A* outside of the GUI thread
+    """
+
+    # A SearchResult per agent (None if cancelled) and whether planning was cancelled
+    finished = Signal(object, bool)
+    # What went wrong, when planning raised anything else than SearchCancelled. finished isn't emitted then
+    failed = Signal(str)
+
+    def __init__(self, grid, agents):
+        QObject.__init__(self)
+
+        self.grid = grid
+        self.agents = agents  # (start, end) of every agent, see cooperativeAStar()
+        self._cancelled = Event()
+
+    def run(self):
+        """
+        Plans the paths, meant to be connected to the started signal of the QThread this worker was moved to
+        """
+
+        results, cancelled = None, False
+
+        try:
+            results = cooperativeAStar(self.grid, self.agents, onProgress=self._checkCancelled)
+        except SearchCancelled:
+            cancelled = True
+        except Exception as error:
+            traceback.print_exc()
+            self.failed.emit(f'{type(error).__name__}: {error}')
+            return
+
+        self.finished.emit(results, cancelled)
+
+    def cancel(self):
+        """
+        Makes planning stop at its next agent, or soon within the search of the current one. Safe to call from any
+        thread
+        """
+        self._cancelled.set()
+
+    def _checkCancelled(self):
+        if self._cancelled.is_set():
+            raise SearchCancelled
+
+
+class FieldWorker(QObject):
+    """
+    Computes the distances of every cell to a goal outside of the GUI thread, for the heatmap (see distanceField())
+    """
+
+    # The distances (None if cancelled) and whether computing them was cancelled
+    finished = Signal(object, bool)
+    # What went wrong, when computing raised anything else than SearchCancelled. finished isn't emitted then
+    failed = Signal(str)
+
+    def __init__(self, grid, goal):
+        QObject.__init__(self)
+
+        self.grid = grid
+        self.goal = goal
+        self._cancelled = Event()
+
+    def run(self):
+        """
+        Computes the distances, meant to be connected to the started signal of the QThread this worker was moved to
+        """
+
+        distances, cancelled = None, False
+
+        try:
+            distances = distanceField(self.grid, self.goal, onProgress=self._checkCancelled)
+        except SearchCancelled:
+            cancelled = True
+        except Exception as error:
+            traceback.print_exc()
+            self.failed.emit(f'{type(error).__name__}: {error}')
+            return
+
+        self.finished.emit(distances, cancelled)
+
+    def cancel(self):
+        """
+        Makes computing stop after its current band of distances. Safe to call from any thread
+        """
+        self._cancelled.set()
+
+    def _checkCancelled(self):
+        if self._cancelled.is_set():
+            raise SearchCancelled
+
+
+class PlanWorker(QObject):
+    """
+    Makes a plan of a DStarLite planner outside of the GUI thread, for when it starts its search over
+    """
+
+    # The SearchResult and the events of the plan (both None if cancelled) and whether planning was cancelled
+    finished = Signal(object, object, bool)
+    # What went wrong, when planning raised anything else than SearchCancelled. finished isn't emitted then
+    failed = Signal(str)
+
+    def __init__(self, planner):
+        QObject.__init__(self)
+
+        self.planner = planner
+        self.events = []
+        self._cancelled = Event()
+
+    def run(self):
+        """
+        Makes the plan, meant to be connected to the started signal of the QThread this worker was moved to
+        """
+
+        result, events, cancelled = None, None, False
+
+        try:
+            result = self.planner.plan(self._onEvent)
+            events = self.events
+        except SearchCancelled:
+            cancelled = True
+        except Exception as error:
+            traceback.print_exc()
+            self.failed.emit(f'{type(error).__name__}: {error}')
+            return
+
+        self.finished.emit(result, events, cancelled)
+
+    def cancel(self):
+        """
+        Makes planning stop at its next event, after which the planner starts over on its next plan. Safe to call
+        from any thread
+        """
+        self._cancelled.set()
+
+    def _onEvent(self, event):
+        if self._cancelled.is_set():
+            raise SearchCancelled
+        self.events.append(event)
@@ -0,0 +1,159 @@
+from PySide2.QtCore import QObject, QTimer, Signal
+from time import perf_counter
+
+import numpy as np
+
+from gui.gridcanvas import GridCanvas
+import data.algorithms as algs
+
+
+class TracePlayer(QObject):
+    """
+    Replays a SearchTrace on a GridCanvas, at a speed of its own that doesn't slow the search down.
+
+    Expanding a node takes slowdown seconds to replay, a node of the path three times that, and adding a node to the
+    open list happens with the expansion before it. Moving forward a little draws every event, as the search would
+    have; seeking anywhere else sets the whole grid at once from the trace
+    """
+
+    FRAME_INTERVAL = 16  # Milliseconds between frames
+    MAX_DRAWN_EVENTS = 5000  # Moving further than this in one go sets the grid at once instead of drawing each event
+
+    # How long each event takes to replay, in units of slowdown, and the canvas state it leaves its cell in, by the
+    #  code of the event in the trace (see data.trace.CODES)
+    WEIGHTS = np.array([0, 1, 0, 3])
+    STATES = np.array([GridCanvas.EMPTY, GridCanvas.SEARCHED, GridCanvas.IN_LIST, GridCanvas.PATH], dtype=np.uint8)
+
+    positionChanged = Signal(int)  # Number of events replayed
+    playingChanged = Signal(bool)
+    finished = Signal()  # Playing reached the end of the trace
+
+    def __init__(self, canvas, parent=None):
+        QObject.__init__(self, parent)
+
+        self.canvas = canvas
+        self.trace = None
+        self.position = 0
+        self.slowdown = .01  # Seconds to replay an expanded node
+        self.drawTime = 0  # Seconds spent drawing the trace since it was loaded
+
+        self._times = None  # Time each event is replayed at, in units of slowdown
+        self._clock = 0  # Time replayed so far, in units of slowdown
+        self._lastFrame = 0
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.FRAME_INTERVAL)
+        self.timer.timeout.connect(self._nextFrame)
+
+    def load(self, trace):
+        """
+        Clears the canvas and gets ready to replay trace from its start
+        """
+
+        self.pause()
+        self.trace = trace
+        self._times = np.cumsum(self.WEIGHTS[trace.codes])
+        self.drawTime = 0
+
+        self.canvas.clearStates()
+        self._setPosition(0)
+
+    def clear(self):
+        """
+        Stops replaying and forgets the trace, leaving the canvas as it is
+        """
+
+        self.pause()
+        self.trace = self._times = None
+        self._setPosition(0)
+
+    def isPlaying(self):
+        return self.timer.isActive()
+
+    def play(self):
+        if self.trace is None:
+            return
+
+        if self.position == len(self.trace):
+            self.seek(0)
+
+        self._lastFrame = perf_counter()
+        self.timer.start()
+        self.playingChanged.emit(True)
+
+    def pause(self):
+        if self.timer.isActive():
+            self.timer.stop()
+            self.playingChanged.emit(False)
+
+    def step(self):
+        """
+        Pauses and moves to the next expansion, along with the nodes it adds to the open list
+        """
+
+        self.pause()
+        if self.trace is None or self.position == len(self.trace):
+            return
+
+        # The next event that takes time, then every event up to the one after it
+        following = np.searchsorted(self._times, self._clock, side='right')
+        if following == len(self.trace):
+            self.moveTo(len(self.trace))
+        else:
+            self.moveTo(int(np.searchsorted(self._times, self._times[following], side='right')))
+
+    def seek(self, position):
+        """
+        Shows the trace after its first position events, setting the whole grid at once
+        """
+
+        if self.trace is None:
+            return
+
+        startTime = perf_counter()
+        self.canvas.setStates(self.STATES[self.trace.statesAt(position)])
+        self.drawTime += perf_counter() - startTime
+
+        self._setPosition(position)
+
+    def moveTo(self, position):
+        """
+        Replays the events up to position, drawing each of them if there are few enough, otherwise seeks
+        """
+
+        if position < self.position or position - self.position > self.MAX_DRAWN_EVENTS:
+            self.seek(position)
+            return
+
+        startTime = perf_counter()
+        for kind, x, y in self.trace.events(self.position, position):
+            if kind == algs.SEARCHED:
+                self.canvas.searched(x, y)
+            elif kind == algs.IN_LIST:
+                self.canvas.setState(x, y, GridCanvas.IN_LIST)
+            elif kind == algs.IN_PATH:
+                self.canvas.setState(x, y, GridCanvas.PATH)
+        self.drawTime += perf_counter() - startTime
+
+        self._setPosition(position)
+
+    def _setPosition(self, position):
+        self.position = position
+        self._clock = self._times[position - 1] if position else 0
+        self.positionChanged.emit(position)
+
+    def _nextFrame(self):
+        """
+        Replays the events whose time came since the last frame
+        """
+
+        now = perf_counter()
+        clock = self._clock + (now - self._lastFrame) / self.slowdown if self.slowdown else np.inf
+        self._lastFrame = now
+
+        self.moveTo(int(np.searchsorted(self._times, clock, side='right')))
+        self._clock = min(clock, self._times[-1] if len(self._times) else 0)
+
+        if self.position == len(self.trace):
+            self.pause()
+            self.finished.emit()
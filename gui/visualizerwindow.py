@@ -1,10 +1,43 @@
-from PySide2.QtWidgets import QMainWindow, QApplication, QMessageBox
-from PySide2.QtGui import QIcon
+from PySide2.QtWidgets import QMainWindow, QApplication, QMessageBox, QFileDialog, QInputDialog
+from PySide2.QtGui import QIcon, QCursor, QColor
+from PySide2.QtCore import QThread, QTimer, QSize, QEvent
+
+import numpy as np
 
 from gui.ui.ui_mainwindow import Ui_MainWindow
-from gui.cell import Cell
+from gui.gridcanvas import GridCanvas, iconPixmap
+from gui.searchworker import SearchWorker, AgentWorker, FieldWorker, PlanWorker
+from gui.traceplayer import TracePlayer
 from data.node import Node
+from data.grid import Grid
+from data.cache import PathCache
+from data.trace import SearchTrace
+from data.incremental import DStarLite
+from data.generators import GENERATORS, cornerPoints
 import data.algorithms as algs
+import data.mapfile as mapfile
+
+
+# File types offered when opening and saving grids
+GRID_FILTER = 'Grids (*.grid)'
+OPEN_FILTERS = f'{GRID_FILTER};;MovingAI maps (*.map);;All files (*)'
+TRACE_FILTER = 'Search traces (*.trace)'
+
+WEIGHT_BRUSH = 1  # Index of the weight brush in the brush dropdown, the other one paints walls
+
+AGENT_STEP_TIME = 150  # Milliseconds each time step of the agents' plan is shown for
+
+MIN_SIZE, MAX_SIZE = 2, 5000  # Rows and columns a grid can have, the range of the size boxes in mainwindow.ui
+
+
+def checkSize(rows, cols):
+    """
+    Raises a ValueError if a grid of rows by cols doesn't fit in the size boxes, which would resize it on their
+    next change
+    """
+
+    if not (MIN_SIZE <= rows <= MAX_SIZE and MIN_SIZE <= cols <= MAX_SIZE):
+        raise ValueError(f'The grid is {rows}x{cols}, rows and columns must be from {MIN_SIZE} to {MAX_SIZE}')
 
 
 class VisualizerWindow(QMainWindow):
@@ -14,7 +47,7 @@ class VisualizerWindow(QMainWindow):
 
     instance = None
 
-    def __init__(self):
+    def __init__(self, grid: Grid = None):
 
         # Initialize superclass
         QMainWindow.__init__(self)
@@ -24,14 +57,34 @@ class VisualizerWindow(QMainWindow):
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
 
-        # Generate the grid that will be interacted with
-        self.numRows = 29  # Odd so that starting points are vertically centered
-        self.numCols = 60
-        self._setupGrid()
-
-        # Define the start and end nodes
-        self.start = Node.GRID[round(self.numRows/2)][8]
-        self.end = Node.GRID[round(self.numRows/2)][-8]
+        # Generate the grid that will be interacted with, unless one was given
+        self.canvas = None
+        self.pathCache = None
+        self.planner = None  # Repairs the path as the grid is edited, while auto-replan is on
+
+        # The heatmap is recomputed once edits stop coming in, rather than after each of them
+        self.heatmapTimer = QTimer(self)
+        self.heatmapTimer.setSingleShot(True)
+        self.heatmapTimer.setInterval(50)
+        self.heatmapTimer.timeout.connect(self.drawHeatmap)
+
+        # Agents planned together with Cooperative A*, as (start, end), and the path of each from the last plan, None
+        #  for those that couldn't be routed. Once planned, they are moved along their paths a time step at a time
+        self.agents = []
+        self.agentPaths = None
+        self.agentTime = 0
+        self.agentTimer = QTimer(self)
+        self.agentTimer.setInterval(AGENT_STEP_TIME)
+        self.agentTimer.timeout.connect(self.stepAgents)
+
+        if grid is None:
+            grid = Grid(29, 60)  # Odd number of rows so that starting points are vertically centered
+        self._setupGrid(grid)
+
+        # Define the start and end nodes, keeping the grid's own if it has them
+        defaultStart, defaultEnd = self.defaultPoints()
+        self.start = self.grid.node(*(self.grid.start or defaultStart))
+        self.end = self.grid.node(*(self.grid.end or defaultEnd))
         self.setStartNode(self.start)
         self.setEndNode(self.end)
 
@@ -41,6 +94,17 @@ class VisualizerWindow(QMainWindow):
         self.changingEnd = False  # Changing end node
         self.drawingWall = False  # Drawing a new wall
         self.erasingWall = False  # Deleting walls
+        self.paintingWeight = None  # Weight being painted, 1 when erasing weights
+
+        # -- Search variables --
+        # Searches run on their own thread at full speed, then their trace is replayed at the speed of the slider
+        self.searchThread = None
+        self.searchWorker = None
+        self.searchName = ''
+        self.searchQuery = None  # (start, end, algorithm, heuristic) of the search, as cached
+        self.searchVersion = 0  # Version of the grid the search started at
+        self.player = TracePlayer(self.canvas, self)
+        self.replayResult = None  # Result of the search being replayed, shown once the replay first ends
 
         # Connecting button signals to functions
         self.connectSignals()
@@ -56,89 +120,538 @@ class VisualizerWindow(QMainWindow):
         Resets the grid to its original state
         """
 
-        for x in range(self.numRows):
-            for y in range(self.numCols):
-                cell = Node.GRID[x][y].cell
-                cell.clear()
-                cell.setWall(False)
+        self.cancelSearch()
+        self.player.clear()
+        self.clearAgents()
 
-        self.start.cell.clear()
-        self.end.cell.clear()
-        self.start.isStart = False
-        self.end.isEnd = False
+        self.grid.weightView()[:] = 1
+        self.grid.setWalls(False)
+        self.canvas.clearStates()
+        self.canvas.refresh()
 
-        self.start = Node.GRID[round(self.numRows / 2)][8]
-        self.end = Node.GRID[round(self.numRows / 2)][-8]
+        self.grid.start = self.grid.end = None
+
+        defaultStart, defaultEnd = self.defaultPoints()
+        self.start = self.grid.node(*defaultStart)
+        self.end = self.grid.node(*defaultEnd)
         self.setStartNode(self.start)
         self.setEndNode(self.end)
 
-    def _setupGrid(self):
+    def defaultPoints(self):
+        """
+        Returns where the start and end nodes go by default: vertically centered, a bit in from either side
         """
-        Generates the grid of Cells along with the underlying Nodes that are used to visualize the selected algorithm
+
+        x = round(self.numRows / 2)
+        return (x, min(8, self.numCols // 4)), (x, self.numCols - 1 - min(7, self.numCols // 4))
+
+    def resizeGrid(self):
+        """
+        Resizes the grid to the size set in the size boxes, keeping the walls that still fit
+        """
+
+        rows, cols = self.ui.rowsBox.value(), self.ui.colsBox.value()
+        if (rows, cols) == (self.numRows, self.numCols):
+            return
+
+        self.cancelSearch()
+        self.player.clear()
+        self.clearAgents()
+
+        self.grid.resize(rows, cols)
+        self.numRows, self.numCols = rows, cols
+
+        # Keep the start and end nodes if they're still on the grid, otherwise put them back in their default spot
+        defaultStart, defaultEnd = self.defaultPoints()
+        if self.grid.start is None:
+            self.grid.start = defaultStart if defaultStart != self.grid.end else defaultEnd
+        if self.grid.end is None:
+            self.grid.end = defaultEnd if defaultEnd != self.grid.start else defaultStart
+
+        self.start, self.end = self.grid.node(*self.grid.start), self.grid.node(*self.grid.end)
+        self.grid.setWall(*self.grid.start, False)
+        self.grid.setWall(*self.grid.end, False)
+
+        self.canvas.setGrid(self.grid)
+        self.canvas.setMarkers(self.grid.start, self.grid.end)
+        self.autoReplan()
+        self.updateHeatmap()
+
+    def openGrid(self):
+        """
+        Asks for a saved grid or a MovingAI map and shows it
+        """
+
+        path, _ = QFileDialog.getOpenFileName(self, 'Open Grid', '', OPEN_FILTERS)
+        if not path:
+            return
+
+        try:
+            grid = mapfile.loadGrid(path)
+            checkSize(grid.rows, grid.cols)
+        except (OSError, ValueError) as error:
+            QMessageBox.warning(self, 'Open Failed', f'Could not open {path}:\n{error}')
+            return
+
+        self.showGrid(grid)
+
+    def saveGrid(self):
         """
+        Asks for a file and saves the grid to it, walls, start, end and neighbors included
+        """
+
+        path, _ = QFileDialog.getSaveFileName(self, 'Save Grid', '', GRID_FILTER)
+        if not path:
+            return
+        if not path.lower().endswith('.grid'):
+            path += '.grid'
+
+        try:
+            mapfile.saveGrid(self.grid, path)
+        except OSError as error:
+            QMessageBox.warning(self, 'Save Failed', f'Could not save {path}:\n{error}')
+            return
+
+        self.statusBar().showMessage(f'Saved {path}')
+
+    def generate(self, name: str, seed: int = None):
+        """
+        Replaces the walls with ones made by the named generator of data.generators, from a random seed unless one is
+        given, and clears the weights. The grid is written and drawn all at once, and the start and end go in opposite
+        corners
+        """
+
+        self.cancelSearch()
+        self.player.clear()
+        self.clearAgents()
+
+        if seed is None:
+            seed = int(np.random.default_rng().integers(2 ** 31))
+        walls = GENERATORS[name](self.numRows, self.numCols, np.random.default_rng(seed))
+
+        self.grid.weightView()[:] = 1
+        self.grid.setWalls(walls)
+        self.canvas.clearStates()
+        self.canvas.refresh()
+
+        # With fewer than two open cells, the start and end go back to their default spots, which are opened
+        points = cornerPoints(walls)
+        self.grid.start, self.grid.end = points or self.defaultPoints()
+        self.start, self.end = self.grid.node(*self.grid.start), self.grid.node(*self.grid.end)
+        self.grid.setWall(*self.grid.start, False)
+        self.grid.setWall(*self.grid.end, False)
+
+        self.setStartNode(self.start)
+        self.setEndNode(self.end)
+        message = f'Generated {name} with seed {seed}'
+        if points is None:
+            message += ', which left fewer than two open cells: the start and end were opened at their default spots'
+        self.statusBar().showMessage(message)
+
+    def showGrid(self, grid: Grid):
+        """
+        Replaces the grid with another one, such as one loaded from a file. Its start and end are kept if it has them,
+        otherwise they go in opposite corners
+        """
+
+        self.cancelSearch()
+        self.player.clear()
+        self.clearAgents()
+
+        # Setting the controls to the new grid's would change the old grid
+        controls = (self.ui.rowsBox, self.ui.colsBox, self.ui.allowDiagonals)
+        for control in controls:
+            control.blockSignals(True)
+        self.ui.allowDiagonals.setChecked(grid.diagonals)
+        self._setupGrid(grid)
+        for control in controls:
+            control.blockSignals(False)
+
+        points = cornerPoints(grid.wallView()) or self.defaultPoints()
+        if grid.start is None or grid.end is None or grid.start == grid.end:
+            grid.start, grid.end = points
+
+        self.start, self.end = grid.node(*grid.start), grid.node(*grid.end)
+        grid.setWall(*grid.start, False)
+        grid.setWall(*grid.end, False)
+
+        self.canvas.refresh()
+        self.setStartNode(self.start)
+        self.setEndNode(self.end)
+
+    def _setupGrid(self, grid: Grid):
+        """
+        Shows the given grid on the canvas, whose Nodes are used to visualize the selected algorithm
+        """
+
+        # A planner only follows the grid it was made for
+        self.ui.autoReplan.setChecked(False)
+
+        # Paths found before on the grid are shown again without searching
+        if self.pathCache is not None:
+            self.grid.removeListener(self.pathCache)
+        self.pathCache = PathCache(grid)
+
+        self.grid = grid
+        self.numRows = grid.rows
+        self.numCols = grid.cols
 
-        # First, generate the grid
-        for x in range(self.numRows):
-            for y in range(self.numCols):
+        self.ui.rowsBox.setValue(grid.rows)
+        self.ui.colsBox.setValue(grid.cols)
 
-                # Make the visual Cell representing the Node at x, y, then add it visually at those coordinates
-                cell = Cell(Node(x, y), self)
-                self.ui.gridLayout.addWidget(cell, x, y)
+        # The whole grid is drawn by a single widget
+        if self.canvas is None:
+            self.canvas = GridCanvas(grid, self)
+            self.ui.gridLayout.addWidget(self.canvas, 0, 0)
 
-        # Then reiterate and populate the neighbors, with diagonals enabled by default
-        self.populateNeighbors()
+            self.canvas.cellPressed.connect(self.cellPressed)
+            self.canvas.cellDragged.connect(self.cellDragged)
+            self.canvas.cellReleased.connect(self.cellReleased)
+        else:
+            self.canvas.setGrid(grid)
+
+        # Then set the neighbors, with diagonals enabled by default
+        self.populateNeighbors(self.ui.allowDiagonals.isChecked())
 
     def populateNeighbors(self, withDiagonals: bool = True):
         """
-        Populates all Nodes' neighbors
+        Sets whether diagonal Nodes are neighbors. Neighbors are found from the grid's layout, so nothing is stored.
+        The heuristics are reloaded, since which of them are admissible depends on it
         """
 
-        for x in range(self.numRows):
-            for y in range(self.numCols):
-                Node.GRID[x][y].populateNeighbors(withDiagonals)
+        self.grid.diagonals = withDiagonals
+
+        if self.ui.algorithmBox.count():
+            self.loadHeuristics()
+
+        self.autoReplan()
+        self.updateHeatmap()
 
     def setStartNode(self, node: Node):
         """
         Sets node as the start node and updates the GUI with it too
         """
         if not node.isEnd:
-            self.start.isStart = False
-            node.isStart = True
+            self.grid.start = (node.x, node.y)
 
-            self.start.cell.draw(Cell.EMPTY)
+            self.canvas.setState(self.start.x, self.start.y, GridCanvas.EMPTY)
 
             self.start = node
-            node.cell.setStart()
+            self.canvas.setMarkers(self.grid.start, self.grid.end)
+
+        self.autoReplan()
 
     def setEndNode(self, node: Node):
         """
         Sets node as the end node and updates the GUI with it too
         """
         if not node.isStart:
-            self.end.isEnd = False
-            node.isEnd = True
+            self.grid.end = (node.x, node.y)
 
-            self.end.cell.draw(Cell.EMPTY)
+            self.canvas.setState(self.end.x, self.end.y, GridCanvas.EMPTY)
 
             self.end = node
-            node.cell.setEnd()
+            self.canvas.setMarkers(self.grid.start, self.grid.end)
 
-    def mouseReleaseEvent(self, event):
+        self.autoReplan()
+        self.updateHeatmap()
+
+    def setWall(self, x, y, wall: bool):
         """
-        Performs the actions necessary depending on what the user was doing with their click.
-        NOTE: The mouse press events are handled by the Cells
+        Makes the cell at x, y a wall or not and redraws it empty
+        """
+
+        self.stopBackgroundWork()
+        self.grid.setWall(x, y, wall)
+        self.canvas.setState(x, y, GridCanvas.EMPTY)
+        self.dropAgentPaths()
+        self.autoReplan()
+        self.updateHeatmap()
+
+    def setWeight(self, x, y, weight: int):
+        """
+        Sets the weight of the cell at x, y and redraws it empty
+        """
+
+        self.stopBackgroundWork()
+        self.grid.setWeight(x, y, weight)
+        self.canvas.setState(x, y, GridCanvas.EMPTY)
+        self.dropAgentPaths()
+        self.autoReplan()
+        self.updateHeatmap()
+
+    def setAutoReplan(self, enabled: bool):
+        """
+        Starts or stops keeping the path up to date while the grid is edited
+        """
+
+        self.stopBackgroundWork()
+        if self.planner is not None:
+            self.planner.close()
+            self.planner = None
+
+        if enabled:
+            self.planner = DStarLite(self.grid, (self.start.x, self.start.y), (self.end.x, self.end.y))
+            self.autoReplan()
+
+    def autoReplan(self):
+        """
+        Repairs the path after an edit when auto-replan is on, showing the path and the nodes the repair expanded.
+        Planning from scratch, at first or once the end or the neighbors changed, is done by a PlanWorker like a
+        search, which editing the grid cancels
+        """
+
+        if self.planner is None:
+            return
+        self.stopBackgroundWork()
+        if self.isSearching():
+            return
+
+        start, end = (self.start.x, self.start.y), (self.end.x, self.end.y)
+        if start != self.planner.start:
+            self.planner.moveStart(start)
+        if end != self.planner.end:
+            self.planner.moveEnd(end)
+
+        if self.planner.stale:
+            self.startWorker(PlanWorker(self.planner), self.replanned)
+            self.statusBar().showMessage('D* Lite: planning...')
+            return
+
+        events = []
+        result = self.planner.plan(events.append)
+        self.showPlan(result, events)
+
+    def replanned(self, result, events, cancelled):
+        """
+        Shows the plan the worker made
+        """
+
+        if not self.isSearching() or self.sender() is not self.searchWorker:
+            return
+
+        self._endSearch()
+
+        if not cancelled:
+            self.showPlan(result, events)
+
+    def showPlan(self, result, events):
+        """
+        Shows the path of a plan of auto-replan and the nodes it expanded
+        """
+
+        self.player.clear()
+        self.canvas.clearStates()
+        for kind, x, y in events:
+            if kind == algs.SEARCHED:
+                self.canvas.setState(x, y, GridCanvas.SEARCHED)
+            elif kind == algs.IN_PATH:
+                self.canvas.setState(x, y, GridCanvas.PATH)
+
+        found = 'path' if result.path is not None else 'no path'
+        self.statusBar().showMessage(f'D* Lite: {found} after {result.expanded} nodes expanded in '
+                                     f'{result.time * 1000:.1f} ms')
+        self.showStats('D* Lite (auto-replan)', result)
+
+    def updateHeatmap(self):
+        """
+        Redraws the heatmap soon if it's shown, once the grid stopped changing
+        """
+
+        if self.ui.showHeatmap.isChecked():
+            self.heatmapTimer.start()
+
+    def drawHeatmap(self):
+        """
+        Colors every cell by its distance to the end, or removes the colors if the heatmap is hidden. The distances
+        are computed by a FieldWorker like a search, which editing the grid cancels
+        """
+
+        if not self.ui.showHeatmap.isChecked():
+            self.stopBackgroundWork()
+            self.canvas.setHeatmap(None)
+            return
+
+        # The grid can't change while a search runs, the heatmap is drawn once it's over
+        if self.isSearching():
+            self.heatmapTimer.start()
+            return
+
+        self.startWorker(FieldWorker(self.grid, (self.end.x, self.end.y)), self.heatmapComputed)
+
+    def heatmapComputed(self, distances, cancelled):
+        """
+        Colors the cells by the distances the worker computed
         """
 
-        cell = self.childAt(event.pos())  # Not guaranteed that this is actually a cell yet
+        if not self.isSearching() or self.sender() is not self.searchWorker:
+            return
+
+        self._endSearch()
+
+        if cancelled or not self.ui.showHeatmap.isChecked():
+            return
+
+        self.canvas.setHeatmap(self.grid.view(distances))
+
+    # -- Agents --
+
+    def addAgents(self):
+        """
+        Asks how many agents to add and puts them at random open cells, each going to a random goal. Agents never
+        share a start or a goal with each other, nor use the start and end nodes
+        """
+
+        count, accepted = QInputDialog.getInt(self, 'Add Agents', 'Agents to add:', 20, 1, 10000)
+        if not accepted:
+            return
+
+        taken = {point for agent in self.agents for point in agent} | {self.grid.start, self.grid.end}
+        free = [(int(x), int(y)) for x, y in np.argwhere(~self.grid.wallView()) if (x, y) not in taken]
+        count = min(count, len(free) // 2)
+
+        picked = np.random.default_rng().choice(len(free), 2 * count, replace=False)
+        points = [free[i] for i in picked]
+        self.agents += zip(points[:count], points[count:])
+
+        self.showAgents()
+        self.statusBar().showMessage(f'{len(self.agents)} agents')
+
+    def planAgents(self):
+        """
+        Plans paths for every agent that never collide with Cooperative A*, then moves the agents along them
+        """
+
+        self.stopBackgroundWork()
+        if not self.agents or self.isSearching():
+            return
+
+        self.player.clear()
+        self.showAgents()
+        self.startWorker(AgentWorker(self.grid, list(self.agents)), self.agentsPlanned)
+        self.statusBar().showMessage(f'Cooperative A*: planning {len(self.agents)} agents...')
+
+    def agentsPlanned(self, results, cancelled):
+        """
+        Moves the agents along the paths planned for them, once the worker is done with them
+        """
+
+        # Paths planned for agents that were cancelled can still arrive, they are ignored
+        if not self.isSearching() or self.sender() is not self.searchWorker:
+            return
+
+        self._endSearch()
+
+        if cancelled:
+            return
+
+        paths = [result.path for result in results]
+        self.showAgents(paths)
+        self.agentTimer.start()
+
+        routed = sum(path is not None for path in paths)
+        steps = max((len(path) - 1 for path in paths if path is not None), default=0)
+        expanded = sum(result.expanded for result in results)
+        time = sum(result.time for result in results)
+        self.statusBar().showMessage(f'Cooperative A*: {routed} of {len(paths)} agents routed in {steps} time steps, '
+                                     f'{expanded:,} nodes expanded in {time * 1000:.1f} ms')
+
+    def showAgents(self, paths=None):
+        """
+        Shows the agents at their starts, each in its own color, with their paths if given
+        """
+
+        self.agentTimer.stop()
+        self.agentPaths, self.agentTime = paths, 0
+
+        # Hues a golden ratio apart tell neighboring agents apart, however many there are
+        colors = [QColor.fromHsvF(i * .618034 % 1, .75, 1) for i in range(len(self.agents))]
+        self.canvas.setAgents([(start, end, color) for (start, end), color in zip(self.agents, colors)], paths)
+
+        self.ui.actionPlanAgents.setEnabled(bool(self.agents) and not self.isSearching())
+        self.ui.actionClearAgents.setEnabled(bool(self.agents) and not self.isSearching())
+
+    def stepAgents(self):
+        """
+        Moves every agent to where its path has it at the next time step, until they all reached their ends
+        """
+
+        self.agentTime += 1
+        positions, moving = [], False
+        for (start, _), path in zip(self.agents, self.agentPaths):
+            if path is None:
+                positions.append(start)
+            else:
+                positions.append(path[min(self.agentTime, len(path) - 1)])
+                moving = moving or self.agentTime < len(path) - 1
+
+        self.canvas.moveAgents(positions)
+        if not moving:
+            self.agentTimer.stop()
+
+    def dropAgentPaths(self):
+        """
+        Hides the agents' paths once the grid was edited, since they may no longer be free
+        """
+
+        if self.agentPaths is not None:
+            self.showAgents()
+
+    def clearAgents(self):
+        self.agents = []
+        self.showAgents()
+
+    def cellPressed(self, x, y):
+        """
+        Determines if the pressed cell is the start or end node or neither, and updates things accordingly
+        """
+
+        # The grid can't be edited while a search is reading it, and editing it ends the replay
+        self.stopBackgroundWork()
+        if self.isSearching():
+            return
+        self.player.clear()
+
+        node = self.grid.node(x, y)
+        cellHeight = int(self.canvas.cellSize()[1])
+
+        if node.isStart:
+            QApplication.setOverrideCursor(QCursor(iconPixmap(GridCanvas.START_ICON, QSize(cellHeight, cellHeight))))
+            self.canvas.setState(x, y, GridCanvas.EMPTY)
+            self.canvas.setMarkers(None, self.grid.end)
+            self.changingStart = True
+        elif node.isEnd:
+            QApplication.setOverrideCursor(QCursor(iconPixmap(GridCanvas.END_ICON, QSize(cellHeight, cellHeight))))
+            self.canvas.setState(x, y, GridCanvas.EMPTY)
+            self.canvas.setMarkers(self.grid.start, None)
+            self.changingEnd = True
+        elif self.ui.brushBox.currentIndex() == WEIGHT_BRUSH:
+            # Painting over a cell of the brush's weight erases weights instead
+            weight = self.ui.weightBox.value()
+            self.paintingWeight = 1 if node.weight == weight else weight
+            self.setWeight(x, y, self.paintingWeight)
+        elif node.wall:
+            self.erasingWall = True
+            self.setWall(x, y, False)
+        else:
+            self.drawingWall = True
+            self.setWall(x, y, True)
+
+    def cellReleased(self, x, y):
+        """
+        Performs the actions necessary depending on what the user was doing with their click.
+        x, y are -1 if the mouse was released outside of the grid
+        """
 
         if self.changingStart:
             QApplication.restoreOverrideCursor()
             self.changingStart = False
 
             # Check that it is a cell and that it isn't either of the start or end nodes
-            if isinstance(cell, Cell) and not (cell.node.isEnd or cell.node.isStart):
-                cell.setWall(False)
-                self.setStartNode(cell.node)
+            node = self.grid.node(x, y) if (x, y) in self.grid else None
+            if node is not None and not (node.isEnd or node.isStart):
+                self.setWall(x, y, False)
+                self.setStartNode(node)
             else:
                 self.setStartNode(self.start)
 
@@ -147,9 +660,10 @@ class VisualizerWindow(QMainWindow):
             self.changingEnd = False
 
             # Check that it is a cell and that it isn't either of the start or end nodes
-            if isinstance(cell, Cell) and not (cell.node.isEnd or cell.node.isStart):
-                cell.setWall(False)
-                self.setEndNode(cell.node)
+            node = self.grid.node(x, y) if (x, y) in self.grid else None
+            if node is not None and not (node.isEnd or node.isStart):
+                self.setWall(x, y, False)
+                self.setEndNode(node)
             else:
                 self.setEndNode(self.end)
 
@@ -159,51 +673,42 @@ class VisualizerWindow(QMainWindow):
         elif self.drawingWall:
             self.drawingWall = False
 
-    def mouseMoveEvent(self, event):
+        elif self.paintingWeight is not None:
+            self.paintingWeight = None
+
+    def cellDragged(self, x, y):
         """
-        Determines if the dragging is to make a wall or to remove it
+        Determines if the dragging is to make a wall, to remove it or to paint a weight
         """
 
-        if self.drawingWall:
-            # Get widget at that position
-            cell = self.childAt(event.pos())
+        node = self.grid.node(x, y)
 
-            # Check that it is a cell and that it isn't either of the start or end nodes
-            if isinstance(cell, Cell) and not (cell.node.isEnd or cell.node.isStart):
-                cell.setWall(True)
+        # Check that it isn't either of the start or end nodes
+        if node.isEnd or node.isStart:
+            return
 
+        if self.drawingWall:
+            self.setWall(x, y, True)
         elif self.erasingWall:
-            # Similar to above
-            cell = self.childAt(event.pos())
-            if isinstance(cell, Cell) and not (cell.node.isEnd or cell.node.isStart):
-                cell.setWall(False)
+            self.setWall(x, y, False)
+        elif self.paintingWeight is not None:
+            self.setWeight(x, y, self.paintingWeight)
 
     def clearPastVisual(self):
         """
         Clears the visual that was last run
         """
+        self.canvas.clearStates()
 
-        for x in range(self.numRows):
-            for y in range(self.numCols):
-                node = Node.GRID[x][y]
-
-                # A*
-                node.f = node.g = node.h = None
-
-                if node.wall:
-                    continue
-                node.cell.draw(Cell.EMPTY)
-
-                if node.isStart:
-                    node.cell.setStart()
-                elif node.isEnd:
-                    node.cell.setEnd()
-
-    def loadHeuristics(self, algIndex: int):
+    def loadHeuristics(self, algIndex: int = None):
         """
-        Loads the heuristics dropdown with appropriate heuristics
+        Loads the heuristics dropdown with appropriate heuristics, selecting the best admissible one for the current
+        neighbors. Heuristics that may not find the shortest path with the current neighbors are labeled as such
         """
 
+        if algIndex is None:
+            algIndex = self.ui.algorithmBox.currentIndex()
+
         # Clear heuristics box
         box = self.ui.heuristicBox
         box.clear()
@@ -211,59 +716,345 @@ class VisualizerWindow(QMainWindow):
         # Get applicable heuristics
         heuristics = self.ui.algorithmBox.itemData(algIndex)['heuristics']
 
-        # Repopulate heuristic dropdown
+        # Repopulate heuristic dropdown, which is disabled for algorithms without heuristics
         for h in heuristics:
-            box.addItem(h, algs.HEURISTICS.get(h, None))
+            bound = algs.suboptimality(h, self.grid.diagonals)
+            label = h if bound is not None else f'{h} (inadmissible)'
+            box.addItem(label, algs.HEURISTICS.get(h, None))
+        box.setEnabled(bool(heuristics))
+
+        default = algs.defaultHeuristic(self.grid.diagonals)
+        if default in heuristics:
+            box.setCurrentIndex(heuristics.index(default))
 
     def runSelectedAlgorithm(self):
         """
-        Runs the algorithm currently selected in the dropdown menu
+        Starts the algorithm currently selected in the dropdown menu on a separate thread
         """
 
+        self.stopBackgroundWork()
+        if self.isSearching():
+            return
+
+        self.player.clear()
         self.clearPastVisual()
 
-        algorithm = self.ui.algorithmBox.currentData()['algorithm']
+        selected = self.ui.algorithmBox.currentData()
+        algorithm, prepare = selected['algorithm'], selected['prepare']
         heuristic = self.ui.heuristicBox.currentData()
 
-        pathFound = algorithm(self.start, self.end, heuristic)
+        # Describes the search in the status bar once it's done
+        self.searchName = self.ui.algorithmBox.currentText()
+        if heuristic is not None:
+            self.searchName += f' with {self.ui.heuristicBox.currentText()}'
+
+        # Nothing changed since the same search last ran, show its result again
+        start, end = (self.start.x, self.start.y), (self.end.x, self.end.y)
+        self.searchQuery = (start, end, self.ui.algorithmBox.currentText(), heuristic)
+        self.searchVersion = self.grid.version
+
+        cached = self.pathCache.get(*self.searchQuery)
+        if cached is not None:
+            for x, y in cached.path or ():
+                self.canvas.setState(x, y, GridCanvas.PATH)
+            self.showResult(cached, cached=True)
+            return
+
+        info = {'algorithm': self.ui.algorithmBox.currentText(), 'heuristic': self.ui.heuristicBox.currentText(),
+                'diagonals': self.grid.diagonals}
+        worker = SearchWorker(algorithm, self.grid, start, end, heuristic, info, self.ui.profileSearches.isChecked(),
+                              prepare)
+        self.startWorker(worker, self.searchFinished)
+        self.statusBar().showMessage(f'{self.searchName}: searching...')
+
+    def startWorker(self, worker, finished):
+        """
+        Runs a worker, such as a SearchWorker, on a new thread as the running search, which cancelSearch() stops.
+        finished is connected to its finished signal, and workerFailed() to its failed signal
+        """
+
+        thread = QThread(self)
+        worker.moveToThread(thread)
+
+        worker.finished.connect(finished)
+        worker.failed.connect(self.workerFailed)
+        thread.started.connect(worker.run)
+
+        self.searchWorker, self.searchThread = worker, thread
+        self.setSearchControls(searching=True)
+
+        thread.start()
+
+    def isSearching(self):
+        return self.searchWorker is not None
+
+    def cancelSearch(self):
+        """
+        Stops the running search, if any, and waits for its thread to end
+        """
+
+        if not self.isSearching():
+            return
+
+        self.searchWorker.cancel()
+        self._endSearch()
+        self.statusBar().showMessage('Search cancelled')
+
+    def stopBackgroundWork(self):
+        """
+        Cancels computing the heatmap or planning from scratch for auto-replan if either is running, to edit the grid
+        or search it instead. The heatmap is computed again once the grid stopped changing and the search is over, and
+        the plan is made again by the next autoReplan()
+        """
+
+        if isinstance(self.searchWorker, (FieldWorker, PlanWorker)):
+            self.searchWorker.cancel()
+            self._endSearch()
+            self.updateHeatmap()
+
+    def _endSearch(self):
+        """
+        Waits for the search thread to end and returns the window to its idle state
+        """
+
+        self.searchThread.quit()
+        self.searchThread.wait()
+        # Signals the worker sent before it stopped, such as a cancelled finished, would arrive once the next worker
+        #  runs. Freed by then, the worker could even be taken for the next one by sender()
+        QApplication.removePostedEvents(self, QEvent.MetaCall)
+
+        self.searchWorker = self.searchThread = None
+        self.setSearchControls(searching=False)
+
+    def workerFailed(self, message):
+        """
+        Returns the window to its idle state when the running search raised an error, and shows it
+        """
+
+        if not self.isSearching() or self.sender() is not self.searchWorker:
+            return
+
+        self._endSearch()
+        self.statusBar().showMessage('Search failed')
+        QMessageBox.warning(self, 'Search Failed', f'The search stopped with an error:\n{message}')
+
+    def searchFinished(self, result, trace, cancelled):
+        """
+        Starts replaying the search once the worker is done with it
+        """
+
+        # Results of a cancelled search can still arrive, they are ignored
+        if not self.isSearching() or self.sender() is not self.searchWorker:
+            return
+
+        self._endSearch()
+
+        if cancelled:
+            return
+
+        self.pathCache.put(*self.searchQuery, result, self.searchVersion)
 
-        if not pathFound:
+        self.statusBar().showMessage(f'{self.searchName}: {result.expanded} nodes expanded in '
+                                     f'{result.time * 1000:.1f} ms, replaying')
+        self.showStats(self.searchName, result)
+
+        self.replayResult = result
+        self.player.load(trace)
+        self.player.play()
+
+    def replayFinished(self):
+        """
+        Shows the result of the search once its replay first gets to the end
+        """
+
+        if self.replayResult is not None:
+            result, self.replayResult = self.replayResult, None
+            self.showResult(result)
+
+    def showResult(self, result, cached: bool = False):
+        """
+        Describes the result of a search in the status bar, warning if no path was found
+        """
+
+        if cached:
+            self.statusBar().showMessage(f'{self.searchName}: cached result')
+            self.showStats(f'{self.searchName} (cached)', result)
+        else:
+            self.statusBar().showMessage(f'{self.searchName}: {result.expanded} nodes expanded in '
+                                         f'{result.time * 1000:.1f} ms')
+            self.showStats(self.searchName, result, self.player.drawTime)
+
+        if result.path is None:
             QMessageBox.warning(self, 'No Path Found', 'No paths were found.')
 
+    def showStats(self, title: str, result, drawTime: float = None):
+        """
+        Shows what a search took in the statistics panel, along with its profile if it was profiled. drawTime is the
+        seconds spent drawing its events, if known
+        """
+
+        def number(value, unit='', scale=1, digits=0):
+            return '–' if value is None else f'{value * scale:,.{digits}f}{unit}'
+
+        rows = [
+            ('Path', 'found' if result.path is not None else 'none'),
+            ('Length', number(result.length, ' nodes')),
+            ('Cost', number(result.cost, digits=2)),
+            ('Expanded', number(result.expanded)),
+            ('Pushed', number(result.pushed)),
+            ('Peak open list', number(result.peakOpen)),
+            ('Re-opened', number(result.reopened)),
+            ('Total time', number(result.time, ' ms', 1000, 1)),
+            ('Searching', number(result.searchTime, ' ms', 1000, 1)),
+            ('Recording events', number(result.eventTime, ' ms', 1000, 1)),
+            ('Drawing', number(drawTime, ' ms', 1000, 1)),
+            ('Peak memory', number(result.peakMemory, ' KB', 1 / 1024)),
+        ]
+
+        cells = ''.join(f'<tr><td>{name}</td><td align="right">&nbsp;&nbsp;{value}</td></tr>' for name, value in rows)
+        self.ui.statsLabel.setText(f'<b>{title}</b><table>{cells}</table>')
+        self.ui.profileText.setPlainText(result.profile or '')
+
+    # -- Replay --
+
+    def replayPositionChanged(self, position):
+        """
+        Moves the timeline along with the replay
+        """
+
+        length = len(self.player.trace) if self.player.trace is not None else 0
+        for control in (self.ui.playButton, self.ui.stepButton, self.ui.timeline, self.ui.actionSaveTrace):
+            control.setEnabled(bool(length))
+
+        self.ui.timeline.blockSignals(True)
+        self.ui.timeline.setMaximum(length)
+        self.ui.timeline.setValue(position)
+        self.ui.timeline.blockSignals(False)
+
+        self.ui.positionLabel.setText(f'{position:,} / {length:,} events' if length else '')
+
+    def togglePlaying(self):
+        if self.player.isPlaying():
+            self.player.pause()
+        else:
+            self.player.play()
+
+    def openTrace(self):
+        """
+        Asks for a saved trace and replays it on the grid it was recorded on
+        """
+
+        path, _ = QFileDialog.getOpenFileName(self, 'Open Trace', '', TRACE_FILTER)
+        if not path:
+            return
+
+        try:
+            trace = SearchTrace.load(path)
+        except (OSError, ValueError) as error:
+            QMessageBox.warning(self, 'Open Failed', f'Could not open {path}:\n{error}')
+            return
+
+        grid = Grid.fromWalls(trace.walls, trace.weights)
+        grid.start, grid.end = trace.start, trace.end
+        grid.diagonals = trace.info.get('diagonals', True)
+        self.showGrid(grid)
+
+        self.statusBar().showMessage(f'Replaying {trace.info.get("algorithm", "search")} from {path}')
+        self.player.load(trace)
+        self.player.play()
+
+    def saveTrace(self):
+        """
+        Asks for a file and saves the trace of the last search to it
+        """
+
+        if self.player.trace is None:
+            return
+
+        path, _ = QFileDialog.getSaveFileName(self, 'Save Trace', '', TRACE_FILTER)
+        if not path:
+            return
+        if not path.lower().endswith('.trace'):
+            path += '.trace'
+
+        try:
+            self.player.trace.save(path)
+        except OSError as error:
+            QMessageBox.warning(self, 'Save Failed', f'Could not save {path}:\n{error}')
+            return
+
+        self.statusBar().showMessage(f'Saved {path}')
+
+    def setSearchControls(self, searching: bool):
+        """
+        Enables the controls that make sense while a search is (or isn't) running
+        """
+
+        self.ui.goButton.setEnabled(not searching)
+        self.ui.cancelButton.setEnabled(searching)
+        self.ui.allowDiagonals.setEnabled(not searching)  # Neighbors can't change under a running search
+
+        # Agents can't change while they're planned
+        self.ui.actionAddAgents.setEnabled(not searching)
+        self.ui.actionPlanAgents.setEnabled(bool(self.agents) and not searching)
+        self.ui.actionClearAgents.setEnabled(bool(self.agents) and not searching)
+
+    def closeEvent(self, event):
+        self.cancelSearch()
+        QMainWindow.closeEvent(self, event)
+
     def populateDropdown(self):
         """
         Populates the dropdown with the list of supported algorithms
 
         Each algorithm will have associated data of the form:
-        { 'algorithm': algorithmFunction, 'heuristics': [h1Name, h2Name, ...] }
+        { 'algorithm': algorithmFunction, 'heuristics': [h1Name, h2Name, ...], 'prepare': prepareFunction or None }
         """
 
         icon = QIcon(":/icon/icons/app.ico")
 
-        # A Star
-        self.ui.algorithmBox.addItem(
-            icon, "A*",
-            userData=
-            {
-                'algorithm': algs.aStar,
-                'heuristics': ['Manhattan']
-            }
-        )
+        # Every algorithm registered in data.algorithms
+        for name, data in algs.ALGORITHMS.items():
+            self.ui.algorithmBox.addItem(icon, name, userData=data)
 
     def connectSignals(self):
         """
         Connects all necessary signals from GUI elements to their respective functions
         """
 
+        self.ui.actionOpen.triggered.connect(self.openGrid)
+        self.ui.menuView.addAction(self.ui.statsDock.toggleViewAction())
+        self.ui.actionSave.triggered.connect(self.saveGrid)
+        self.ui.actionOpenTrace.triggered.connect(self.openTrace)
+        self.ui.actionSaveTrace.triggered.connect(self.saveTrace)
+        for name in GENERATORS:
+            action = self.ui.menuGenerate.addAction(name)
+            action.triggered.connect(lambda checked=False, name=name: self.generate(name))
+        self.ui.actionAddAgents.triggered.connect(self.addAgents)
+        self.ui.actionPlanAgents.triggered.connect(self.planAgents)
+        self.ui.actionClearAgents.triggered.connect(self.clearAgents)
+        self.ui.brushBox.currentIndexChanged.connect(lambda i: self.ui.weightBox.setEnabled(i == WEIGHT_BRUSH))
         self.ui.resetButton.clicked.connect(self.reset)
         self.ui.allowDiagonals.toggled.connect(self.populateNeighbors)
+        self.ui.autoReplan.toggled.connect(self.setAutoReplan)
+        self.ui.showHeatmap.toggled.connect(self.drawHeatmap)
+        self.ui.rowsBox.valueChanged.connect(self.resizeGrid)
+        self.ui.colsBox.valueChanged.connect(self.resizeGrid)
 
         def changeSpeed(val):
-            # val ranges from 0 to 99. at 99, slowdown is .001, and at 0, .1
-            algs.slowdown = .5 / (val+1)
+            # val ranges from 0 to 99. at 99, an expanded node takes .005 seconds to replay, and at 0, .5
+            self.player.slowdown = .5 / (val+1)
 
         self.ui.speedSlider.valueChanged.connect(changeSpeed)
 
+        self.player.positionChanged.connect(self.replayPositionChanged)
+        self.player.playingChanged.connect(lambda playing: self.ui.playButton.setText('Pause' if playing else 'Play'))
+        self.player.finished.connect(self.replayFinished)
+        self.ui.playButton.clicked.connect(self.togglePlaying)
+        self.ui.stepButton.clicked.connect(self.player.step)
+        self.ui.timeline.valueChanged.connect(self.player.seek)
+
         self.ui.algorithmBox.currentIndexChanged.connect(self.loadHeuristics)
         self.ui.goButton.clicked.connect(self.runSelectedAlgorithm)
+        self.ui.cancelButton.clicked.connect(self.cancelSearch)
 
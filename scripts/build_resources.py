@@ -1,12 +1,14 @@
 import os
+import shutil
 import subprocess
 import sys
 
-src_dir = os.path.abspath("../")
-icons_dir = os.path.abspath("../icons")
-qrc = os.path.abspath("../icons.qrc")
-out = os.path.abspath("../gui/rc/icons_rc.py")
-ui_folder = os.path.abspath("../gui/ui/")
+# Paths are found from this script, so it can be run from any folder
+src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+icons_dir = os.path.join(src_dir, "icons")
+qrc = os.path.join(src_dir, "icons.qrc")
+out = os.path.join(src_dir, "gui", "rc", "icons_rc.py")
+ui_folder = os.path.join(src_dir, "gui", "ui")
 python = sys.executable
 
 wrapper = """
@@ -22,13 +24,39 @@ file_list_item = """
 """
 
 
+def find_tool(name):
+    """
+    Returns the path of a PySide2 tool such as pyside2-rcc, looking next to this Python first (bin, or Scripts on
+    Windows, where pip installs them), then on the PATH. shutil.which adds .exe on Windows
+    """
+
+    python_dir = os.path.dirname(python)
+    for folder in (python_dir, os.path.join(python_dir, "Scripts"), None):
+        tool = shutil.which(name, path=folder)
+        if tool:
+            return tool
+
+    sys.exit(f"Could not find {name}, install PySide2 (pip install -r requirements.txt) in this Python's environment")
+
+
+def run(args):
+    result = subprocess.run(args)
+    if result.returncode:
+        sys.exit(f"{os.path.basename(args[0])} failed with exit code {result.returncode}")
+
+
 if __name__ == "__main__":
 
+    rcc = find_tool("pyside2-rcc")
+    uic = find_tool("pyside2-uic")
+
     print("Compiling icons.qrc file")
 
     file_list = ""
     for root, dirs, files in os.walk(icons_dir):
-        for file in files:
+        for file in sorted(files):
+            if file.endswith(".md"):
+                continue  # Notes about the icons, not icons
             fpath = os.path.join(root, file)
             from_src = os.path.relpath(fpath, src_dir)
             file_list += file_list_item.format(alias=from_src, filepath=from_src)
@@ -40,15 +68,8 @@ if __name__ == "__main__":
 
     print("Compiling Resource Files... ")
 
-    d = os.path.dirname(out)
-    if not os.path.exists(d):
-        os.makedirs(d)
-
-    rcc = python[:-len('python.exe')] + os.path.join('pyside2-rcc.exe')
-
-    with open(out, 'w') as fout:
-        proc = subprocess.Popen([rcc, qrc], stdout=fout)
-        return_code = proc.wait()
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    run([rcc, qrc, "-o", out])
 
     print("Reworking Resource Files...")
     # read in all lines from the rc file
@@ -61,8 +82,6 @@ if __name__ == "__main__":
             if line.strip():
                 f.write(line)
 
-    uic = python[:-len('python.exe')] + os.path.join('pyside2-uic.exe')
-
     print("Removing existing compiled UI files...")
     for file in os.listdir(ui_folder):
         if file.startswith("ui_") and file.endswith(".py"):
@@ -76,13 +95,7 @@ if __name__ == "__main__":
             dstFile = os.path.join(ui_folder, "ui_{}.py".format(file[:-3]))
             print("\t" + file)
 
-            with open(dstFile, 'w') as fout:
-                if python:
-                    args = [python, uic, srcFile]
-                else:
-                    args = [uic, srcFile]
-                proc = subprocess.Popen(args, stdout=fout)
-                return_code = proc.wait()
+            run([uic, srcFile, "-o", dstFile])
 
             with open(dstFile, 'r') as fin:
                 contents = fin.read()
@@ -0,0 +1,36 @@
+from argparse import ArgumentParser
+import asyncio
+import signal
+
+from data.service import PathService
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Serves path queries as JSON lines over TCP or a Unix socket, without Qt')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port to listen on (default: %(default)s)')
+    parser.add_argument('--unix', metavar='PATH', help='Unix socket to listen on instead of TCP')
+    parser.add_argument('--workers', type=int, help='worker processes solving queries (default: one per CPU)')
+    parser.add_argument('--load', nargs=2, action='append', metavar=('NAME', 'FILE'), default=[],
+                        help='saved grid or MovingAI .map file to load under NAME, can be given more than once')
+    args = parser.parse_args()
+
+    # Stopping the service either way frees the grids' shared memory
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    service = PathService(args.workers)
+
+    async def main():
+        for name, path in args.load:
+            response = await service.load({'name': name, 'path': path})
+            print(f"Loaded {name}: {response['rows']}x{response['cols']}")
+
+        where = args.unix or f'{args.host}:{args.port}'
+        print(f'Serving on {where}')
+        await service.serve(args.host, args.port, args.unix)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -1,19 +1,59 @@
 from PySide2.QtWidgets import QApplication
 from qtmodern.styles import dark
+from argparse import ArgumentParser, ArgumentTypeError
+import sys
 
-from gui.visualizerwindow import VisualizerWindow
+from gui.visualizerwindow import VisualizerWindow, MIN_SIZE, MAX_SIZE, checkSize
+from data.grid import Grid
+from data.mapfile import loadGrid
 import gui.rc.icons_rc as icons_rc  # Although this doesn't seem to be used, it is necessary for icons to show up
 
 
-if __name__ == '__main__':
+def gridSize(text):
+    # Rows or columns of the grid, in the range of the window's size boxes
+    size = int(text)
+    if not MIN_SIZE <= size <= MAX_SIZE:
+        raise ArgumentTypeError(f'must be from {MIN_SIZE} to {MAX_SIZE}, not {size}')
+    return size
+
+
+def parseArgs(argv=None):
+    parser = ArgumentParser(description='Visualizes pathfinding algorithms on a grid')
+    parser.add_argument('--rows', type=gridSize, default=29, help='number of rows of the grid (default: %(default)s)')
+    parser.add_argument('--cols', type=gridSize, default=60,
+                        help='number of columns of the grid (default: %(default)s)')
+    parser.add_argument('--open', metavar='FILE', help='saved grid or MovingAI .map file to show instead')
+    return parser.parse_args(argv)
+
+
+def launch(args):
+    """
+    Creates the application and shows its window, returning both. Nothing is painted until the event loop runs.
+    Exits if the grid to open can't be loaded or is too small or too big to show
+    """
+
+    opened = None
+    if args.open:
+        try:
+            opened = loadGrid(args.open)
+            checkSize(opened.rows, opened.cols)
+        except (OSError, ValueError) as error:
+            sys.exit(f'Could not open {args.open}: {error}')
+
     app = QApplication()
     dark(app)
 
-    window = VisualizerWindow()
+    window = VisualizerWindow(Grid(args.rows, args.cols))
+    if opened is not None:
+        window.showGrid(opened)
 
     size = app.desktop().size()
     window.setMinimumSize(size.width()*2/3, size.height()*2/3)
 
     window.showMaximized()
+    return app, window
 
+
+if __name__ == '__main__':
+    app, window = launch(parseArgs())
     exit(app.exec_())